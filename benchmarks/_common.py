@@ -0,0 +1,194 @@
+"""
+Shared setup for the benchmark scripts.
+
+Unless DATABASE_URL is set, every run gets a fresh SQLite file and vector index in a temporary
+directory, so benchmarks never touch the project database.
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Deployment profiles, started with start_server(command + ['--bind', ...])
+SERVER_COMMANDS = {
+    "wsgi": ['gunicorn', 'hng1project.wsgi'],
+    "asgi": ['gunicorn', 'hng1project.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+def setup_django(migrate=True):
+    sys.path.insert(0, str(PROJECT_DIR))
+    if not os.getenv('DATABASE_URL'):
+        workdir = Path(tempfile.mkdtemp(prefix='string-analyzer-bench-'))
+        os.environ['DATABASE_URL'] = f'sqlite:///{workdir / "bench.sqlite3"}'
+        # the vector index belongs to the database it was built from
+        os.environ.setdefault('STRING_VECTOR_INDEX_DIR', str(workdir / 'vector_index'))
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hng1project.settings')
+
+    import django
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+
+def random_text(length, rng=random):
+    alphabet = string.ascii_letters + string.digits + "     .,!?"
+    return "".join(rng.choices(alphabet, k=length))
+
+
+def seed_strings(count, length=32, rng=random, batch_size=5000):
+    """
+    Inserts count random strings through the bulk write path, returns their values.
+    length is a fixed length, a (min, max) range or a function of rng.
+    """
+    from string_analyzer.analysis import analyze
+    from string_analyzer.models import AnalyzedString
+
+    values = []
+    for start in range(0, count, batch_size):
+        batch = [
+            random_text(pick_length(length, rng), rng)
+            for _ in range(min(batch_size, count - start))
+        ]
+        AnalyzedString.objects.bulk_create_analyzed(
+            [{"value": value, **analyze(value)} for value in batch], batch_size=batch_size
+        )
+        values.extend(batch)
+    return values
+
+
+def pick_length(length, rng=random):
+    if isinstance(length, int):
+        return length
+    if callable(length):
+        return length(rng)
+    return rng.randint(*length)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed, statuses=None):
+    """
+    Request count, errors, requests per second and latency percentiles in ms
+    """
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if latencies else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1e3 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1e3 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1e3 if latencies else None,
+    }
+    if statuses is not None:
+        result["statuses"] = {str(code): count for code, count in sorted(statuses.items())}
+    return result
+
+
+def http_load(base_url, paths, concurrency=16, duration=10.0):
+    """
+    Sends GET requests for paths round-robin from concurrency threads, each on
+    its own keep-alive connection, for duration seconds. Returns summarize().
+    """
+    import itertools
+
+    counter = itertools.count()
+    return http_run(
+        base_url, lambda: ('GET', paths[next(counter) % len(paths)], None, {}),
+        concurrency=concurrency, duration=duration,
+    )
+
+
+def http_run(base_url, next_request, concurrency=16, duration=10.0):
+    """
+    Like http_load, with next_request() returning (method, path, body, headers)
+    for every request. It is called from several threads.
+    """
+    import http.client
+    import threading
+    import time
+    from collections import Counter
+    from urllib.parse import urlsplit
+
+    target = urlsplit(base_url)
+    latencies = []
+    errors = [0]
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        local_latencies, local_errors, local_statuses = [], 0, Counter()
+        while time.perf_counter() < deadline:
+            method, path, body, headers = next_request()
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                local_statuses[response.status] += 1
+                if response.status >= 500:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+                continue
+            local_latencies.append(time.perf_counter() - start)
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+            statuses.update(local_statuses)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started, statuses)
+
+
+def start_server(command, port, env=None, timeout=30.0):
+    """
+    Starts a server subprocess from PROJECT_DIR and waits until the port answers
+    """
+    import socket
+    import subprocess
+    import time
+
+    process = subprocess.Popen(
+        command, cwd=PROJECT_DIR, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited early: {' '.join(command)}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not start on port {port}: {' '.join(command)}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except Exception:
+        process.kill()
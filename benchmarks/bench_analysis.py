@@ -0,0 +1,69 @@
+"""
+Compares string_analyzer.analysis.analyze with the analysis that used to be
+written inline in the POST handler.
+
+    python benchmarks/bench_analysis.py
+"""
+import hashlib
+import random
+import string
+import sys
+import timeit
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from string_analyzer.analysis import analyze, analyze_many  # noqa: E402
+
+
+def inline_analysis(value):
+    sha256_hash = hashlib.sha256(value.encode()).hexdigest()
+    length = len(value)
+    is_palindrome = value.lower() == value.lower()[::-1]
+    unique_characters = len(set(value))
+    word_count = len(value.split())
+    character_frequency_map = dict(Counter(value))
+    return {
+        "length": length,
+        "is_palindrome": is_palindrome,
+        "unique_characters": unique_characters,
+        "word_count": word_count,
+        "sha256_hash": sha256_hash,
+        "character_frequency_map": character_frequency_map
+    }
+
+
+def random_text(length, rng):
+    alphabet = string.ascii_letters + string.digits + "     .,!?"
+    return "".join(rng.choices(alphabet, k=length))
+
+
+def best_of(func, value, number):
+    return min(timeit.repeat(lambda: func(value), number=number, repeat=5)) / number
+
+
+def main():
+    rng = random.Random(0)
+    cases = [
+        ("short (16 chars)", random_text(16, rng), 20000),
+        ("medium (2 KB)", random_text(2048, rng), 2000),
+        ("large (4 MB)", random_text(4 * 1024 * 1024, rng), 3),
+    ]
+
+    print(f"{'case':<20}{'inline':>14}{'analyze':>14}{'speedup':>10}")
+    for label, value, number in cases:
+        assert analyze(value) == inline_analysis(value)
+        before = best_of(inline_analysis, value, number)
+        after = best_of(analyze, value, number)
+        print(f"{label:<20}{before * 1e6:>12.1f}us{after * 1e6:>12.1f}us{before / after:>9.2f}x")
+
+    values = [random_text(512 * 1024, rng) for _ in range(32)]
+    for processes in (1, None):
+        elapsed = min(timeit.repeat(lambda: analyze_many(values, processes=processes), number=1, repeat=3))
+        label = "in-process" if processes == 1 else "process pool"
+        print(f"analyze_many 32 x 512 KB, {label}: {elapsed * 1e3:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
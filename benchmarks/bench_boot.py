@@ -0,0 +1,174 @@
+"""
+Worker boot time, memory per worker and per-request overhead of the default
+deployment (gunicorn hng1project.wsgi with settings.py, every worker loading
+the app itself) against the API-only profile (gunicorn.conf.py: settings_api.py,
+the app preloaded in the master and the workers forked from it).
+
+- boot: from gunicorn forking a worker until the worker has loaded the app
+  and warmed up, the median over all workers, and from starting gunicorn
+  until every worker is up
+- memory: RSS, PSS and private (USS) memory per worker after a short load
+  test; what the workers share copy-on-write only counts once in PSS and
+  not at all in USS (Linux only)
+- request: the Django handler called directly with a WSGI environ, no
+  server and no socket, so the difference is the middleware and DRF setup
+
+    python benchmarks/bench_boot.py [--workers 4] [--requests 5000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import _common
+
+PROFILES = {
+    "settings.py": {'settings': 'hng1project.settings', 'config': None},
+    "settings_api.py + preload": {'settings': 'hng1project.settings_api', 'config': _common.PROJECT_DIR / 'gunicorn.conf.py'},
+}
+
+# Appended to the profile's gunicorn config: when each worker was forked and
+# when it was ready, written to BOOT_LOG
+TIMING_HOOKS = '''
+import time as _time
+
+_profile_hooks = {name: globals().get(name) for name in ('pre_fork', 'post_worker_init')}
+
+
+def pre_fork(server, worker):
+    worker.forked_at = _time.monotonic()
+    if _profile_hooks['pre_fork']:
+        _profile_hooks['pre_fork'](server, worker)
+
+
+def post_worker_init(worker):
+    if _profile_hooks['post_worker_init']:
+        _profile_hooks['post_worker_init'](worker)
+    with open(BOOT_LOG, 'a') as log:
+        log.write(f"{worker.pid} {_time.monotonic() - worker.forked_at} {_time.monotonic()}\\n")
+'''
+
+REQUEST_PATHS = ['/cache/stats', '/strings/stats']
+
+
+def memory(pid):
+    """
+    (rss, pss, uss) in bytes from /proc/<pid>/smaps_rollup
+    """
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return fields['Rss'], fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def boot(profile, workers, port, duration):
+    workdir = Path(tempfile.mkdtemp(prefix='string-analyzer-boot-'))
+    boot_log = workdir / 'boot.log'
+    config = workdir / 'gunicorn.conf.py'
+    source = profile['config'].read_text() if profile['config'] else ''
+    config.write_text(f"{source}\nBOOT_LOG = {str(boot_log)!r}\n{TIMING_HOOKS}")
+
+    command = _common.SERVER_COMMANDS['wsgi'] + [
+        '--config', str(config), '--workers', str(workers), '--bind', f'127.0.0.1:{port}'
+    ]
+    started = time.monotonic()
+    process = _common.start_server(command, port, env={'DJANGO_SETTINGS_MODULE': profile['settings']})
+    try:
+        lines = []
+        deadline = time.monotonic() + 60
+        while len(lines) < workers and time.monotonic() < deadline:
+            time.sleep(0.05)
+            lines = boot_log.read_text().splitlines() if boot_log.exists() else []
+        if len(lines) < workers:
+            raise RuntimeError(f"only {len(lines)} of {workers} workers booted")
+        booted = [line.split() for line in lines]
+        worker_boot = statistics.median(float(seconds) for _, seconds, _ in booted)
+        all_up = max(float(ready) for _, _, ready in booted) - started
+
+        load = _common.http_load(f'http://127.0.0.1:{port}', REQUEST_PATHS, concurrency=workers, duration=duration)
+        usage = [memory(int(pid)) for pid, _, _ in booted]
+    finally:
+        _common.stop_server(process)
+    return worker_boot, all_up, load, [statistics.mean(column) for column in zip(*usage)]
+
+
+def time_requests(count):
+    """
+    Runs in a subprocess per profile: microseconds per request through the Django handler
+    """
+    import io
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+
+    def call(path):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+        }
+        response = handler(environ, lambda status, headers: None)
+        b''.join(response)
+        response.close()
+
+    result = {}
+    for path in REQUEST_PATHS:
+        for _ in range(100):
+            call(path)
+        start = time.perf_counter()
+        for _ in range(count):
+            call(path)
+        result[path] = (time.perf_counter() - start) / count * 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--duration', type=float, default=3.0, help="seconds of load before measuring memory")
+    parser.add_argument('--port', type=int, default=8768)
+    parser.add_argument('--time-requests', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.time_requests:
+        _common.setup_django(migrate=False)
+        print(json.dumps(time_requests(args.requests)))
+        return
+
+    _common.setup_django()
+    _common.seed_strings(1000)
+
+    print(f"{args.workers} sync workers")
+    print(f"{'profile':<28}{'worker boot':>12}{'all up':>9}{'req/s':>9}{'RSS':>9}{'PSS':>9}{'USS':>9}")
+    for label, profile in PROFILES.items():
+        worker_boot, all_up, load, (rss, pss, uss) = boot(profile, args.workers, args.port, args.duration)
+        print(
+            f"{label:<28}{worker_boot * 1e3:>10.0f}ms{all_up:>8.2f}s{load['rps']:>9.0f}"
+            + "".join(f"{size / 2 ** 20:>7.1f}MB" for size in (rss, pss, uss)),
+            flush=True,
+        )
+
+    print(f"\nper request through the Django handler, {args.requests} requests each")
+    print(f"{'profile':<28}" + "".join(f"{path:>18}" for path in REQUEST_PATHS))
+    for label, profile in PROFILES.items():
+        output = subprocess.run(
+            [sys.executable, __file__, '--time-requests', '--requests', str(args.requests)],
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': profile['settings']},
+            check=True, capture_output=True, text=True,
+        ).stdout
+        timings = json.loads(output)
+        print(f"{label:<28}" + "".join(f"{timings[path]:>16.1f}us" for path in REQUEST_PATHS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Time to delete a filtered subset: QuerySet.delete() and its collector
+(which leaves the summary counters alone), against the raw DELETE ...
+RETURNING of delete_analyzed(), one transaction, and bulk_delete_analyzed(),
+the chunked one behind DELETE /strings. Each run deletes the
+non-palindromes of the same freshly seeded corpus.
+
+    python benchmarks/bench_bulk_delete.py [--rows 20000]
+"""
+import argparse
+import random
+import time
+
+import _common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    _common.setup_django()
+    from string_analyzer.models import AnalyzedString
+
+    methods = {
+        "QuerySet.delete()": lambda queryset: queryset.delete()[1].get(queryset.model._meta.label, 0),
+        "delete_analyzed()": lambda queryset: queryset.delete_analyzed(),
+        "bulk_delete_analyzed()": lambda queryset: queryset.bulk_delete_analyzed(),
+    }
+    print(f"{args.rows} rows, deleting every non-palindrome")
+    print(f"{'method':<26}{'deleted':>10}{'seconds':>10}{'rows/s':>12}")
+    for label, delete in methods.items():
+        AnalyzedString.objects.all().bulk_delete_analyzed()
+        _common.seed_strings(args.rows, length=(8, 128), rng=random.Random(0))
+        start = time.perf_counter()
+        deleted = delete(AnalyzedString.objects.filter(is_palindrome=False))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<26}{deleted:>10}{elapsed:>10.2f}{deleted / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Per-request latency with each connection reuse setting: a new connection per
+request (DB_CONN_MAX_AGE=0), persistent connections with and without health
+checks, and, on PostgreSQL, Django's psycopg pool. Every configuration runs
+its own gunicorn against the same database and is hit sequentially on
+/strings/stats, which runs SQL on every request and is not cached.
+
+    DATABASE_URL=postgres://localhost/strings_bench python benchmarks/bench_connections.py
+    python benchmarks/bench_connections.py   # temporary SQLite, the pool is skipped
+"""
+import argparse
+
+import _common
+
+CONFIGURATIONS = {
+    "new connection per request": {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'false'},
+    "persistent + health checks": {'DB_CONN_MAX_AGE': '60', 'DB_CONN_HEALTH_CHECKS': 'true', 'DB_POOL': 'false'},
+    "persistent, no health checks": {'DB_CONN_MAX_AGE': '60', 'DB_CONN_HEALTH_CHECKS': 'false', 'DB_POOL': 'false'},
+    "psycopg pool": {'DB_POOL': 'true', 'DB_POOL_MIN_SIZE': '1', 'DB_POOL_MAX_SIZE': '4'},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--port', type=int, default=8767)
+    args = parser.parse_args()
+
+    _common.setup_django()
+    from django.db import connection
+
+    _common.seed_strings(args.rows, length=(8, 64))
+    url = f'http://127.0.0.1:{args.port}'
+    command = _common.SERVER_COMMANDS['wsgi'] + ['--workers', '1', '--bind', f'127.0.0.1:{args.port}']
+
+    print(f"database: {connection.vendor}, 1 worker, 1 client, {args.duration}s each")
+    print(f"{'configuration':<32}{'req/s':>10}{'p50':>10}{'p95':>10}{'p50 saved':>12}")
+    baseline = None
+    for label, env in CONFIGURATIONS.items():
+        if env.get('DB_POOL') == 'true' and connection.vendor != 'postgresql':
+            print(f"{label:<32}{'skipped, PostgreSQL only':>42}")
+            continue
+        process = _common.start_server(command, args.port, env={**env, 'STRING_CACHE_TTL': '0'})
+        try:
+            _common.http_load(url, ['/strings/stats'], concurrency=1, duration=0.5)
+            result = _common.http_load(url, ['/strings/stats'], concurrency=1, duration=args.duration)
+        finally:
+            _common.stop_server(process)
+        baseline = baseline if baseline is not None else result['p50_ms']
+        print(f"{label:<32}{result['rps']:>10.0f}{result['p50_ms']:>8.2f}ms{result['p95_ms']:>8.2f}ms"
+              f"{baseline - result['p50_ms']:>10.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
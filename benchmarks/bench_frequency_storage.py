@@ -0,0 +1,73 @@
+"""
+Storage size and throughput of each STRING_FREQUENCY_MAP_STORAGE mode:
+bytes the map takes per row, bulk ingest rate, and the time to read and
+encode every row with and without the map (?fields= leaving it out).
+
+    python benchmarks/bench_frequency_storage.py [--rows 20000] [--length 16 512]
+"""
+import argparse
+import random
+import time
+
+import _common
+
+MODES = ('json', 'packed', 'none')
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--length', type=int, nargs=2, default=[16, 512])
+    args = parser.parse_args()
+
+    _common.setup_django()
+    from django.db import connection
+    from django.test import override_settings
+    from string_analyzer import serializer
+    from string_analyzer.analysis import analyze
+    from string_analyzer.models import AnalyzedString
+
+    rng = random.Random(0)
+    values = [_common.random_text(rng.randint(*args.length), rng) for _ in range(args.rows)]
+    rows = [{"value": value, **analyze(value)} for value in values]
+    without_map = serializer.parse_fields('id,value,length,is_palindrome,unique_characters,word_count,created_at')
+
+    def read_all(fields=None):
+        payload = serializer.payload_builder(fields)
+        serializer.dumps([payload(row) for row in serializer.string_rows(AnalyzedString.objects.all(), fields)])
+
+    print(f"{args.rows} rows, lengths {args.length[0]}-{args.length[1]}")
+    print(f"{'mode':>8}{'map bytes/row':>15}{'ingest':>12}{'read':>12}{'read w/o map':>14}")
+    for mode in MODES:
+        AnalyzedString.objects.all().delete()
+        with override_settings(STRING_FREQUENCY_MAP_STORAGE=mode):
+            ingest = timed(lambda: AnalyzedString.objects.bulk_create_analyzed([dict(row) for row in rows], batch_size=2000))
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COALESCE(SUM(LENGTH(CAST(character_frequency_map AS BLOB))), 0)"
+                    " + COALESCE(SUM(LENGTH(character_frequency_packed)), 0)"
+                    " FROM string_analyzer_analyzedstring"
+                    if connection.vendor == 'sqlite' else
+                    "SELECT COALESCE(SUM(OCTET_LENGTH(character_frequency_map::text)), 0)"
+                    " + COALESCE(SUM(OCTET_LENGTH(character_frequency_packed)), 0)"
+                    " FROM string_analyzer_analyzedstring"
+                )
+                stored = cursor.fetchone()[0]
+
+            read = timed(read_all)
+            read_without_map = timed(lambda: read_all(without_map))
+        print(
+            f"{mode:>8}{stored / args.rows:>15.1f}{args.rows / ingest:>10.0f}/s"
+            f"{args.rows / read:>10.0f}/s{args.rows / read_without_map:>12.0f}/s"
+        )
+
+
+if __name__ == '__main__':
+    main()
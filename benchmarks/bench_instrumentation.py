@@ -0,0 +1,56 @@
+"""
+Per-request cost of InstrumentationMiddleware: the same requests through the
+test client with and without it in MIDDLEWARE.
+
+    python benchmarks/bench_instrumentation.py [--requests 2000] [--rounds 5]
+"""
+import argparse
+import hashlib
+import random
+import time
+
+import _common
+
+MIDDLEWARE = 'string_analyzer.middleware.InstrumentationMiddleware'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    _common.setup_django()
+    from django.conf import settings
+    from django.test import Client, override_settings
+
+    rng = random.Random(0)
+    values = _common.seed_strings(args.rows, length=(8, 64), rng=rng)
+    paths = {
+        "lookup (cached)": [f"/strings/id/{hashlib.sha256(value.encode()).hexdigest()}" for value in values[:50]],
+        "list page (cached)": ["/strings?limit=20"],
+        "stats (2 queries)": ["/strings/stats"],
+    }
+    without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+
+    print(f"{'request':<22}{'without':>12}{'with':>12}{'overhead':>12}")
+    for label, urls in paths.items():
+        timings = {"without": float('inf'), "with": float('inf')}
+        # alternating rounds, best of each, so drift in the machine hits both sides
+        for _ in range(args.rounds):
+            for name, middleware in (("without", without), ("with", [MIDDLEWARE] + without)):
+                with override_settings(MIDDLEWARE=middleware):
+                    client = Client()
+                    for url in urls:
+                        client.get(url)
+                    start = time.perf_counter()
+                    for index in range(args.requests):
+                        client.get(urls[index % len(urls)])
+                    timings[name] = min(timings[name], (time.perf_counter() - start) / args.requests)
+        print(f"{label:<22}{timings['without'] * 1e6:>10.0f}us{timings['with'] * 1e6:>10.0f}us"
+              f"{(timings['with'] - timings['without']) * 1e6:>10.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Ingest throughput of ?async=1 jobs: clients queue single strings and batches
+through the API while process_jobs worker processes drain the queue. Timed
+from the first request until every job is done.
+
+    python benchmarks/bench_jobs.py [--clients 8] [--jobs 20] [--batch-size 50] [--workers 2]
+"""
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import _common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--jobs', type=int, default=20, help="jobs per client, every fourth one a batch")
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    _common.setup_django()
+    from django.db import close_old_connections, connections
+    from django.test import Client
+    from string_analyzer.management.commands.process_jobs import worker_process
+    from string_analyzer.models import AnalysisJob
+
+    def queue_jobs(client_number):
+        client = Client()
+        try:
+            strings = 0
+            for number in range(args.jobs):
+                prefix = f"client {client_number} job {number}"
+                if number % 4 == 0:
+                    values = [f"{prefix} item {item}" for item in range(args.batch_size)]
+                    client.post('/strings/batch?async=1', values, content_type='application/json')
+                    strings += len(values)
+                else:
+                    client.post('/strings?async=1', {'value': prefix}, content_type='application/json')
+                    strings += 1
+            return strings
+        finally:
+            close_old_connections()
+
+    # fork the workers before any client thread exists
+    connections.close_all()
+    workers = [multiprocessing.Process(target=worker_process, args=(0.05, False)) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            strings = sum(pool.map(queue_jobs, range(args.clients)))
+        while AnalysisJob.objects.filter(status__in=[AnalysisJob.QUEUED, AnalysisJob.RUNNING]).exists():
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+    jobs = AnalysisJob.objects.count()
+    print(f"{strings} strings in {jobs} jobs queued and ingested in {elapsed:.2f}s "
+          f"by {args.workers} workers: {strings / elapsed:.0f} strings/s")
+
+
+if __name__ == '__main__':
+    main()
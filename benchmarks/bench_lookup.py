@@ -0,0 +1,60 @@
+"""
+Shows that single-string lookups stay flat as the table grows now that they
+go through the sha256_hash index instead of comparing the full value.
+
+    python benchmarks/bench_lookup.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import hashlib
+import random
+import time
+
+import _common
+
+
+def time_per_call(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--length', type=int, default=256)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    _common.setup_django()
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.test import Client
+    from string_analyzer.models import AnalyzedString
+
+    settings.ALLOWED_HOSTS = ['*']
+    client = Client()
+    rng = random.Random(0)
+    values = []
+    client.get('/strings/warm-up')
+
+    print(f"{'rows':>10}{'by value':>14}{'by hash':>14}{'GET /strings/<v>':>20}")
+    for size in sorted(args.sizes):
+        values += _common.seed_strings(size - len(values), length=args.length, rng=rng)
+        keys = rng.sample(values, min(args.lookups, len(values)))
+
+        by_value = time_per_call(lambda value: AnalyzedString.objects.get(value=value), keys)
+        by_hash = time_per_call(
+            lambda value: AnalyzedString.objects.get(sha256_hash=hashlib.sha256(value.encode()).hexdigest()), keys
+        )
+
+        def fetch(value):
+            caches['strings'].clear()
+            assert client.get(f'/strings/{value}').status_code == 200
+
+        endpoint = time_per_call(fetch, [value for value in keys if '?' not in value and '#' not in value])
+        print(f"{size:>10}{by_value * 1e3:>12.3f}ms{by_hash * 1e3:>12.3f}ms{endpoint * 1e3:>18.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
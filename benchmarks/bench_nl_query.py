@@ -0,0 +1,101 @@
+"""
+Parse throughput of the natural language query parser over a generated corpus,
+compared with the regex chain the view used to run on every request.
+
+    python benchmarks/bench_nl_query.py [--queries 5000]
+"""
+import argparse
+import random
+import re
+import time
+
+import _common
+
+TEMPLATES = [
+    "all single word palindromic strings",
+    "strings longer than {n} characters",
+    "strings shorter than {n}",
+    "palindromic strings that contain the first vowel",
+    "strings containing the letter {c}",
+    "strings between {n} and {m} characters",
+    "strings containing {c} and {d}",
+    "strings with at least {w} words",
+    "non-palindromic strings with multiple words shorter than {m}",
+    "strings with the letters {c}, {d} and {e}",
+    "exactly {w} words longer than {n}",
+    "strings with {n} characters or more",
+]
+
+
+def legacy_parse(query):
+    query = query.lower().strip()
+    natural_language_filters = {}
+    if "palindrome" in query or "palindromic" in query:
+        natural_language_filters['is_palindrome'] = True
+    if "single word" in query:
+        natural_language_filters['word_count'] = 1
+    elif "multiple words" in query:
+        natural_language_filters['word_count__gt'] = 1
+    contains_letter = re.search(r"(?:containing|have|with|including) the letter ([a-z])", query)
+    if contains_letter:
+        natural_language_filters['value__icontains'] = contains_letter.group(1)
+    contains_vowel = re.search(r"(?:contain|include|have|feature).*vowel\s*([aeiou])?", query)
+    if contains_vowel:
+        natural_language_filters["value__icontains"] = contains_vowel.group(1) or "a"
+    longer_than = re.search(r"longer than (\d+)", query)
+    if longer_than:
+        natural_language_filters['length__gt'] = int(longer_than.group(1))
+    shorter_than = re.search(r"shorter than (\d+)", query)
+    if shorter_than:
+        natural_language_filters['length__lt'] = int(shorter_than.group(1))
+    return natural_language_filters
+
+
+def corpus(size, distinct, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    pool = [
+        rng.choice(TEMPLATES).format(
+            n=rng.randint(1, 50), m=rng.randint(51, 100), w=rng.randint(1, 6),
+            c=rng.choice(letters), d=rng.choice(letters), e=rng.choice(letters),
+        )
+        for _ in range(distinct)
+    ]
+    return [rng.choice(pool) for _ in range(size)]
+
+
+def throughput(func, queries):
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--distinct', type=int, default=500)
+    args = parser.parse_args()
+
+    _common.setup_django(migrate=False)
+    from string_analyzer import nl_query
+
+    queries = corpus(args.queries, args.distinct, random.Random(0))
+
+    def cold(query):
+        nl_query._parse_normalized.cache_clear()
+        nl_query.parse(query)
+
+    results = [
+        ("legacy regex chain", throughput(legacy_parse, queries)),
+        ("parser, cache cleared", throughput(cold, queries)),
+    ]
+    nl_query._parse_normalized.cache_clear()
+    results.append(("parser, first pass", throughput(nl_query.parse, queries)))
+    results.append(("parser, warm LRU cache", throughput(nl_query.parse, queries)))
+    for label, rate in results:
+        print(f"{label:<24}{rate:>12,.0f} queries/s")
+    print(nl_query._parse_normalized.cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Latency of GET /strings/search against the 50ms target. Seeds --rows strings
+made of words from a fixed vocabulary, so common trigrams have long posting
+lists like in real text, then times the endpoint (response cache disabled)
+for three kinds of query: a substring of a stored string, the same substring
+with a typo, and a single word.
+
+    python benchmarks/bench_search.py [--rows 1000000] [--queries 200]
+    DATABASE_URL=postgres://localhost/strings_bench python benchmarks/bench_search.py
+"""
+import argparse
+import os
+import random
+import string
+import time
+
+import _common
+
+TARGET_MS = 50.0
+
+
+def vocabulary(rng, size=5000):
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(size)]
+
+
+def typo(text, rng):
+    index = rng.randrange(len(text))
+    return text[:index] + rng.choice(string.ascii_lowercase) + text[index + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ['STRING_CACHE_TTL'] = '0'
+    _common.setup_django()
+    from django.db import connection
+    from django.test import Client
+    from string_analyzer.analysis import analyze
+    from string_analyzer.models import AnalyzedString
+
+    rng = random.Random(0)
+    words = vocabulary(rng)
+    start = time.perf_counter()
+    values = []
+    for offset in range(0, args.rows, args.batch_size):
+        batch = [" ".join(rng.choices(words, k=rng.randint(2, 8))) for _ in range(min(args.batch_size, args.rows - offset))]
+        AnalyzedString.objects.bulk_create_analyzed(
+            [{"value": value, **analyze(value)} for value in batch], batch_size=args.batch_size
+        )
+        values.extend(rng.sample(batch, min(len(batch), 10)))
+    print(f"database: {connection.vendor}, {args.rows} rows seeded in {time.perf_counter() - start:.0f}s")
+
+    def substring(value):
+        begin = rng.randrange(max(1, len(value) - 6))
+        return value[begin:begin + rng.randint(6, 12)]
+
+    kinds = {
+        "substring": lambda: substring(rng.choice(values)),
+        "substring with typo": lambda: typo(substring(rng.choice(values)), rng),
+        "single word": lambda: rng.choice(words),
+    }
+    client = Client()
+    print(f"{'query':<22}{'p50':>10}{'p95':>10}{'max':>10}{'matches/page':>14}  target {TARGET_MS:.0f}ms")
+    for label, make_query in kinds.items():
+        latencies, matches = [], 0
+        for _ in range(args.queries):
+            query = make_query()
+            begin = time.perf_counter()
+            response = client.get('/strings/search', {'q': query, 'limit': 20})
+            latencies.append(time.perf_counter() - begin)
+            assert response.status_code == 200, response.content
+            matches += len(response.json()["data"])
+        result = _common.summarize(latencies, 0, sum(latencies))
+        verdict = "ok" if result['p95_ms'] <= TARGET_MS else "over"
+        print(f"{label:<22}{result['p50_ms']:>8.2f}ms{result['p95_ms']:>8.2f}ms{max(latencies) * 1e3:>8.2f}ms"
+              f"{matches / args.queries:>14.1f}  {verdict}")
+
+
+if __name__ == '__main__':
+    main()
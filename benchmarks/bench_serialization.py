@@ -0,0 +1,76 @@
+"""
+Time to turn a page of strings into JSON bytes: the old path (model instances,
+a dict per row, DRF's JSONRenderer) against the values_list tuples encoded by
+serializer.dumps (orjson when installed, json otherwise).
+
+    python benchmarks/bench_serialization.py [--sizes 10000 100000]
+"""
+import argparse
+import json
+import random
+import time
+
+import _common
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--length', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    _common.setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from string_analyzer import serializer
+    from string_analyzer.models import AnalyzedString
+
+    def legacy(queryset):
+        data = []
+        for s in queryset:
+            data.append({
+                "id": s.sha256_hash,
+                "value": s.value,
+                "properties": {
+                    "length": s.length,
+                    "is_palindrome": s.is_palindrome,
+                    "unique_characters": s.unique_characters,
+                    "word_count": s.word_count,
+                    "sha256_hash": s.sha256_hash,
+                    "character_frequency_map": s.character_frequency_map
+                },
+                "created_at": s.created_at
+            })
+        return JSONRenderer().render({"data": data, "count": len(data)})
+
+    def fast(queryset):
+        data = [serializer.string_payload(row) for row in serializer.string_rows(queryset)]
+        return serializer.dumps({"data": data, "count": len(data)})
+
+    rng = random.Random(0)
+    seeded = 0
+    encoder = 'orjson' if serializer.orjson is not None else 'json'
+    print(f"encoder: {encoder}")
+    print(f"{'rows':>10}{'legacy':>12}{'fast':>12}{'speedup':>10}")
+    for size in sorted(args.sizes):
+        _common.seed_strings(size - seeded, length=args.length, rng=rng)
+        seeded = size
+        queryset = AnalyzedString.objects.order_by('created_at', 'id')[:size]
+
+        legacy_time, legacy_bytes = best_of(lambda: legacy(queryset.all()), args.repeat)
+        fast_time, fast_bytes = best_of(lambda: fast(queryset.all()), args.repeat)
+        assert json.loads(legacy_bytes)["count"] == json.loads(fast_bytes)["count"] == size
+        print(f"{size:>10}{legacy_time * 1e3:>10.0f}ms{fast_time * 1e3:>10.0f}ms{legacy_time / fast_time:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Latency of GET /strings/<id>/similar at a million rows. Seeds --rows strings,
+builds the vector index like `python manage.py build_vector_index`, then
+times, for both metrics, the index scan alone (VectorIndex.nearest() for the
+candidates of k neighbours) and the whole endpoint, which adds the target
+lookup and the exact re-ranking (response cache disabled). recall is the
+share of the k nearest index vectors, found by scanning every list, that
+are among the candidates.
+
+    python benchmarks/bench_similar.py [--rows 1000000] [--queries 200] [--k 10]
+"""
+import argparse
+import os
+import random
+import time
+
+import _common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ['STRING_CACHE_TTL'] = '0'
+    _common.setup_django()
+    from django.test import Client
+    from string_analyzer import frequency, vectors
+    from string_analyzer.models import AnalyzedString
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    values = _common.seed_strings(args.rows, length=(8, 128), rng=rng)
+    print(f"{args.rows} rows seeded in {time.perf_counter() - start:.0f}s")
+
+    start = time.perf_counter()
+    vectors.build()
+    print(f"index built in {time.perf_counter() - start:.1f}s, "
+          f"{os.path.getsize(vectors.index().path) / 2 ** 20:.0f}MB file")
+
+    samples = AnalyzedString.objects.filter(value__in=rng.sample(values, min(args.queries, len(values))))
+    targets = [
+        (pk, sha256_hash, frequency.frequency_map(*columns))
+        for pk, sha256_hash, *columns in samples.values_list('id', 'sha256_hash', *frequency.FREQUENCY_COLUMNS)
+    ]
+    candidates = max(args.k * vectors.CANDIDATE_FACTOR, vectors.MIN_CANDIDATES)
+    client = Client()
+
+    print(f"{'metric':<8}{'measured':<22}{'p50':>10}{'p95':>10}{'max':>10}{'recall':>8}")
+    for metric in vectors.METRICS:
+        scans, requests, found = [], [], 0
+        for pk, sha256_hash, frequency_map in targets:
+            begin = time.perf_counter()
+            proposed = vectors.index().nearest(frequency_map, candidates, metric, exclude=pk)
+            scans.append(time.perf_counter() - begin)
+            exhaustive = vectors.index().nearest(frequency_map, args.k, metric, exclude=pk, probes=vectors.MAX_LISTS)
+            found += len({string_id for string_id, _ in exhaustive} & {string_id for string_id, _ in proposed})
+
+            begin = time.perf_counter()
+            response = client.get(f'/strings/{sha256_hash}/similar', {'k': args.k, 'metric': metric})
+            requests.append(time.perf_counter() - begin)
+            assert response.status_code == 200, response.content
+        for label, latencies, recall in (
+            (f"index scan ({candidates})", scans, f"{found / (args.k * len(targets)):>8.2f}"),
+            (f"endpoint (k={args.k})", requests, ""),
+        ):
+            result = _common.summarize(latencies, 0, sum(latencies))
+            print(f"{metric:<8}{label:<22}{result['p50_ms']:>8.2f}ms{result['p95_ms']:>8.2f}ms"
+                  f"{max(latencies) * 1e3:>8.2f}ms{recall}")
+
+
+if __name__ == '__main__':
+    main()
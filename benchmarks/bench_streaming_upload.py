@@ -0,0 +1,75 @@
+"""
+Peak Python memory of analyzing one large value, measured with tracemalloc:
+the JSON body parsed whole and passed to analyze(), against the text/plain
+body fed to StreamingAnalyzer in UPLOAD_READ_SIZE chunks. The body itself
+exists before measuring starts, like the bytes waiting on the socket. The
+last column adds StreamingAnalyzer.value(), the one full copy the INSERT needs.
+
+    python benchmarks/bench_streaming_upload.py [--sizes 1 8 32 64] (MB)
+"""
+import argparse
+import io
+import json
+import random
+import time
+import tracemalloc
+
+import _common
+
+
+def measure(func):
+    """
+    (peak traced bytes, seconds), timed in a separate run since tracing slows it down
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 8, 32, 64])
+    args = parser.parse_args()
+
+    _common.setup_django(migrate=False)
+    from string_analyzer.analysis import StreamingAnalyzer, analyze
+    from string_analyzer.views import UPLOAD_READ_SIZE
+
+    rng = random.Random(0)
+    block = _common.random_text(1024 * 1024, rng)
+
+    def parsed_whole(body):
+        return analyze(json.loads(body)['value'])
+
+    def streamed(body, keep_value=False):
+        stream = io.BytesIO(body)
+        with StreamingAnalyzer() as analyzer:
+            for chunk in iter(lambda: stream.read(UPLOAD_READ_SIZE), b''):
+                analyzer.feed(chunk)
+            properties = analyzer.finish()
+            return (analyzer.value(), properties) if keep_value else properties
+
+    print(f"{'size':>8}{'json + analyze()':>22}{'streaming':>22}{'streaming + value()':>24}")
+    for size in args.sizes:
+        value = block * size
+        json_body = json.dumps({"value": value}).encode()
+        plain_body = value.encode()
+        del value
+        columns = [
+            measure(lambda: parsed_whole(json_body)),
+            measure(lambda: streamed(plain_body)),
+            measure(lambda: streamed(plain_body, keep_value=True)),
+        ]
+        del json_body, plain_body
+        print(f"{size:>6}MB" + "".join(
+            f"{peak / 2 ** 20:>12.1f}MB {elapsed:>6.2f}s" for peak, elapsed in columns
+        ), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""
+Benchmark harness for the whole string API.
+
+Seeds a synthetic corpus, then drives every route in string_analyzer/urls.py
+in-process through the Django test client and/or over HTTP against a locally
+started gunicorn, and records throughput and p50/p95/p99 latency per scenario.
+Results are written as JSON so two runs can be compared:
+
+    python benchmarks/harness.py run --rows 10000 --lengths uniform:8:256 --output before.json
+    python benchmarks/harness.py run --rows 10000 --lengths uniform:8:256 --output after.json
+    python benchmarks/harness.py compare before.json after.json --threshold 0.10
+
+Runs use a fresh SQLite file unless DATABASE_URL is set, e.g. to a scratch
+local Postgres database (the harness writes to it, never point it at real data).
+`run` exits with status 1 when any request failed or answered 5xx, and
+`compare` exits with status 1 when a scenario lost more than --threshold of
+its throughput or its p95 latency grew by more than --threshold.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode
+
+import _common
+
+NL_QUERIES = [
+    "all single word palindromic strings",
+    "strings longer than 200 characters",
+    "strings containing the letter z",
+    "strings between 5 and 10 characters",
+    "strings with at least 3 words",
+]
+BATCH_SIZE = 100
+
+
+def length_distribution(spec):
+    """
+    fixed:N, uniform:MIN:MAX or lognormal:MU:SIGMA, as a function of rng
+    """
+    kind, _, params = spec.partition(':')
+    try:
+        numbers = [float(number) for number in params.split(':')]
+        if kind == 'fixed' and len(numbers) == 1:
+            return lambda rng: int(numbers[0])
+        if kind == 'uniform' and len(numbers) == 2:
+            low, high = int(numbers[0]), int(numbers[1])
+            return lambda rng: rng.randint(low, high)
+        if kind == 'lognormal' and len(numbers) == 2:
+            mu, sigma = numbers
+            return lambda rng: max(1, min(100_000, int(rng.lognormvariate(mu, sigma))))
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"invalid length distribution {spec!r}")
+
+
+class Workload:
+    """
+    Request factories for every scenario. They are called from several
+    threads in HTTP mode, so shared state is only touched under the lock.
+    """
+    def __init__(self, values, lengths, seed):
+        self.rng = random.Random(seed)
+        self.lengths = lengths
+        self.values = values
+        self.doomed = []
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.job = None
+
+    def refill(self, count):
+        """
+        Seeds count extra strings for the delete scenarios to consume
+        """
+        with self.lock:
+            self.doomed = _common.seed_strings(count, length=self.lengths, rng=self.rng)
+
+    def job_id(self):
+        """
+        A queued job for the status scenario, nothing runs it during the benchmark
+        """
+        with self.lock:
+            if self.job is None:
+                from string_analyzer import jobs
+                self.job = jobs.enqueue_string("harness job")
+            return self.job.id
+
+    def pick(self):
+        with self.lock:
+            return self.rng.choice(self.values)
+
+    def pop_doomed(self):
+        with self.lock:
+            # once the pool is used up the deletes repeat and answer 404
+            return self.doomed.pop() if self.doomed else self.values[0] + " (deleted)"
+
+    def new_value(self):
+        with self.lock:
+            value = _common.random_text(_common.pick_length(self.lengths, self.rng), self.rng)
+        return f"{value} #{next(self.counter)}-{os.getpid()}-{time.monotonic_ns()}"
+
+    def random_choice(self, options):
+        with self.lock:
+            return self.rng.choice(options)
+
+
+def sha256(value):
+    import hashlib
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def get(path, **params):
+    return ('GET', path + ('?' + urlencode(params) if params else ''), None, {})
+
+
+def send_json(method, path, data):
+    return (method, path, json.dumps(data).encode(), {'Content-Type': 'application/json'})
+
+
+# (name, url name it exercises, request factory); reads run before writes,
+# which invalidate the response cache
+SCENARIOS = [
+    ('home', 'home', lambda w: get('/')),
+    ('cache_stats', 'cache_stats', lambda w: get('/cache/stats')),
+    ('metrics', 'metrics', lambda w: get('/metrics')),
+    ('list', 'strings', lambda w: get('/strings', limit=50)),
+    ('list_filtered', 'strings', lambda w: get(
+        '/strings', is_palindrome='false', min_length=w.random_choice([8, 32, 64]), contains_character='e', limit=50
+    )),
+    ('list_fields', 'strings', lambda w: get('/strings', fields='id,length,word_count', limit=200)),
+    ('stream', 'strings', lambda w: get('/strings', stream='true', contains_character='z', max_length=24)),
+    ('stats', 'strings_stats', lambda w: get('/strings/stats')),
+    ('nl_filter', 'natural_language_filter', lambda w: get(
+        '/strings/filter-by-natural-language', query=w.random_choice(NL_QUERIES)
+    )),
+    ('search', 'strings_search', lambda w: get('/strings/search', q=w.pick()[:8], limit=20)),
+    ('similar', 'strings_similar', lambda w: get(f'/strings/{sha256(w.pick())}/similar', k=10)),
+    ('job_status', 'job_status', lambda w: get(f'/jobs/{w.job_id()}')),
+    ('get_by_value', 'get_remove_string', lambda w: get('/strings/' + quote(w.pick(), safe=''))),
+    ('get_by_id', 'get_remove_string_by_id', lambda w: get('/strings/id/' + sha256(w.pick()))),
+    ('create', 'strings', lambda w: send_json('POST', '/strings', {"value": w.new_value()})),
+    ('create_async', 'strings', lambda w: send_json('POST', '/strings?async=1', {"value": w.new_value()})),
+    ('batch', 'strings_batch', lambda w: send_json(
+        'POST', '/strings/batch', [w.new_value() for _ in range(BATCH_SIZE)]
+    )),
+    ('delete_by_value', 'get_remove_string', lambda w: ('DELETE', '/strings/' + quote(w.pop_doomed(), safe=''), None, {})),
+    ('delete_by_id', 'get_remove_string_by_id', lambda w: ('DELETE', '/strings/id/' + sha256(w.pop_doomed()), None, {})),
+    ('delete_many', 'strings', lambda w: send_json(
+        'DELETE', '/strings', {"ids": [sha256(w.pop_doomed()) for _ in range(BATCH_SIZE)]}
+    )),
+]
+
+
+def uncovered_routes():
+    from string_analyzer.urls import urlpatterns
+    covered = {route for _, route, _ in SCENARIOS}
+    return sorted(pattern.name for pattern in urlpatterns if pattern.name not in covered)
+
+
+def run_inprocess(factory, workload, duration):
+    from django.test import Client
+
+    client = Client(raise_request_exception=False)
+    latencies, statuses, errors = [], Counter(), 0
+    started = time.perf_counter()
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        method, path, body, headers = factory(workload)
+        start = time.perf_counter()
+        response = client.generic(
+            method, path, data=body or b'', content_type=headers.get('Content-Type', 'application/octet-stream')
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] += 1
+        errors += response.status_code >= 500
+    return _common.summarize(latencies, errors, time.perf_counter() - started, statuses)
+
+
+def run_scenarios(label, workload, args, run):
+    workload.refill(args.delete_pool)
+    results = {}
+    for name, _, factory in SCENARIOS:
+        if args.only and name not in args.only:
+            continue
+        run(factory, workload, min(0.5, args.duration))
+        results[name] = result = run(factory, workload, args.duration)
+        print(
+            f"{label:<10}{name:<18}{result['rps']:>10.1f}"
+            + "".join(f"{result[key]:>10.1f}" if result[key] is not None else f"{'-':>10}" for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+            + f"{result['errors']:>8}  {result['statuses']}",
+            flush=True,
+        )
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=_common.PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    os.environ['STRING_CACHE_TTL'] = str(args.cache_ttl)
+    _common.setup_django()
+    import django
+    from django.core.management import call_command
+    from django.db import connection
+
+    missing = uncovered_routes()
+    if missing:
+        print(f"warning: no scenario for {', '.join(missing)}", file=sys.stderr)
+
+    workload = Workload(None, args.lengths, args.seed)
+    started = time.perf_counter()
+    workload.values = _common.seed_strings(args.rows, length=args.lengths, rng=workload.rng)
+    print(f"seeded {args.rows} rows in {time.perf_counter() - started:.1f}s ({connection.vendor})")
+    # /similar answers 503 until the index is built
+    call_command('build_vector_index')
+    print(f"{'mode':<10}{'scenario':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "rows": args.rows,
+            "lengths": args.lengths_spec,
+            "seed": args.seed,
+            "duration": args.duration,
+            "cache_ttl": args.cache_ttl,
+            "concurrency": args.concurrency,
+            "server": args.server,
+            "workers": args.workers,
+        },
+        "results": {},
+    }
+
+    if args.mode in ('inprocess', 'both'):
+        report["results"]["inprocess"] = run_scenarios('inprocess', workload, args, run_inprocess)
+
+    if args.mode in ('http', 'both'):
+        base_url = f'http://127.0.0.1:{args.port}'
+        command = _common.SERVER_COMMANDS[args.server] + [
+            '--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}'
+        ]
+        process = _common.start_server(command, args.port)
+        try:
+            report["results"]["http"] = run_scenarios(
+                'http', workload, args,
+                lambda factory, workload, duration: _common.http_run(
+                    base_url, lambda: factory(workload), concurrency=args.concurrency, duration=duration
+                ),
+            )
+        finally:
+            _common.stop_server(process)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f"wrote {args.output}")
+
+    failed = [f"{mode} {name}" for mode, results in report["results"].items() for name, result in results.items() if result["errors"]]
+    if failed:
+        print(f"error: 5xx or failed requests in {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline, candidate = json.load(baseline_file), json.load(candidate_file)
+
+    for key in ('database', 'rows', 'lengths', 'cache_ttl', 'server', 'workers', 'concurrency'):
+        if baseline["meta"].get(key) != candidate["meta"].get(key):
+            print(f"note: {key} differs ({baseline['meta'].get(key)} vs {candidate['meta'].get(key)})")
+
+    regressions = 0
+    print(f"{'mode':<10}{'scenario':<18}{'req/s':>22}{'p95 ms':>22}")
+    for mode, scenarios in candidate["results"].items():
+        for name, result in scenarios.items():
+            before = baseline["results"].get(mode, {}).get(name)
+            if not before or not before["rps"] or not result["rps"]:
+                continue
+            rps_change = result["rps"] / before["rps"] - 1
+            p95_change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+            regressed = rps_change < -args.threshold or p95_change > args.threshold
+            regressions += regressed
+            print(
+                f"{mode:<10}{name:<18}"
+                f"{before['rps']:>9.1f} ->{result['rps']:>8.1f} {rps_change:>+4.0%}"
+                f"{before['p95_ms']:>9.1f} ->{result['p95_ms']:>8.1f} {p95_change:>+4.0%}"
+                + ("  REGRESSION" if regressed else "")
+            )
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="seed a corpus and benchmark every endpoint")
+    run_parser.add_argument('--rows', type=int, default=10000)
+    run_parser.add_argument('--lengths', dest='lengths_spec', default='uniform:8:256',
+                            help="fixed:N, uniform:MIN:MAX or lognormal:MU:SIGMA")
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--mode', choices=['inprocess', 'http', 'both'], default='both')
+    run_parser.add_argument('--only', nargs='+', choices=[name for name, _, _ in SCENARIOS])
+    run_parser.add_argument('--duration', type=float, default=5.0, help="seconds per scenario")
+    run_parser.add_argument('--delete-pool', type=int, default=5000, help="extra rows seeded for the delete scenarios")
+    run_parser.add_argument('--cache-ttl', type=int, default=300, help="STRING_CACHE_TTL, 0 disables the response cache")
+    run_parser.add_argument('--server', choices=sorted(_common.SERVER_COMMANDS), default='wsgi')
+    run_parser.add_argument('--workers', type=int, default=2)
+    run_parser.add_argument('--concurrency', type=int, default=16)
+    run_parser.add_argument('--port', type=int, default=8766)
+    run_parser.add_argument('--output')
+
+    compare_parser = commands.add_parser('compare', help="compare two result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.10)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        try:
+            args.lengths = length_distribution(args.lengths_spec)
+        except argparse.ArgumentTypeError as error:
+            run_parser.error(str(error))
+        return run(args)
+    return compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
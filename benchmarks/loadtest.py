@@ -0,0 +1,61 @@
+"""
+Load test comparing the sync WSGI deployment (Procfile) with the ASGI one
+(Procfile.asgi) under concurrent clients. Both servers run against the
+same seeded database.
+
+    python benchmarks/loadtest.py [--rows 20000] [--concurrency 32] [--duration 10]
+"""
+import argparse
+import random
+import sys
+from urllib.parse import quote
+
+import _common
+
+SERVERS = {
+    "wsgi (sync workers)": _common.SERVER_COMMANDS['wsgi'],
+    "asgi (uvicorn workers)": _common.SERVER_COMMANDS['asgi'],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    _common.setup_django()
+    rng = random.Random(0)
+    values = _common.seed_strings(args.rows, length=(8, 128), rng=rng)
+
+    paths = [f"/strings/{quote(value, safe='')}" for value in rng.sample(values, 200)]
+    paths += [
+        "/strings?limit=50",
+        "/strings?is_palindrome=false&min_length=10&limit=50",
+        "/strings?contains_character=z&limit=50",
+        "/strings/filter-by-natural-language?query=strings%20longer%20than%20126%20characters",
+    ] * 20
+    rng.shuffle(paths)
+
+    print(f"{args.rows} rows, {args.workers} workers, {args.concurrency} clients, {args.duration}s per server")
+    print(f"{'server':<26}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}")
+    for label, command in SERVERS.items():
+        command = command + ['--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}']
+        process = _common.start_server(command, args.port)
+        try:
+            _common.http_load(f'http://127.0.0.1:{args.port}', paths[:20], concurrency=4, duration=1.0)
+            result = _common.http_load(
+                f'http://127.0.0.1:{args.port}', paths, concurrency=args.concurrency, duration=args.duration
+            )
+        finally:
+            _common.stop_server(process)
+        print(f"{label:<26}{result['rps']:>10.0f}{result['p50_ms']:>8.1f}ms"
+              f"{result['p95_ms']:>8.1f}ms{result['p99_ms']:>8.1f}ms{result['errors']:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+gunicorn settings for both Procfiles:
+
+    gunicorn hng1project.wsgi --config gunicorn.conf.py
+    gunicorn hng1project.asgi:application -k uvicorn.workers.UvicornWorker --config gunicorn.conf.py
+
+The application is imported once in the master (preload_app), with the
+API-only settings unless DJANGO_SETTINGS_MODULE says otherwise. Workers are
+forked from it and share its memory copy-on-write. Each worker then opens its
+database connection before it takes its first request.
+
+The response cache defaults to a file cache every worker on the host shares,
+a per-process locmem:// cache would keep serving what another worker's write
+invalidated. The process_jobs workers need the same STRING_CACHE_URL, which
+has to be redis:// once they, or the web workers, run on more than one host.
+
+/metrics adds up the values of every worker: prometheus_client's multiprocess
+mode keeps them in files under PROMETHEUS_MULTIPROC_DIR, a new empty
+directory per server unless it is set (then it has to be emptied between runs).
+"""
+import gc
+import os
+import tempfile
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hng1project.settings_api')
+os.environ.setdefault('STRING_CACHE_URL', 'file://' + os.path.join(tempfile.gettempdir(), 'string-analyzer-cache'))
+# read when prometheus_client is imported, so before the app is preloaded
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='string-analyzer-metrics-')
+
+preload_app = True
+
+
+def when_ready(server):
+    from django.urls import reverse
+    # builds the URL resolver's lookup tables in the master, so workers inherit them
+    reverse('home')
+    # objects allocated so far are never collected, so the collector does not
+    # have to touch, and thereby copy, the pages they live on in every worker
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    from django.db import connections
+    # a connection opened in the master must not be shared by the workers
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    from django.db import connection
+    connection.ensure_connection()
+    if not connection.settings_dict['CONN_MAX_AGE']:
+        # no request would reuse it; with DB_POOL closing returns it to the now open pool
+        connection.close()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    # the counters and histograms of a dead worker stay in the totals, only its live gauges go
+    multiprocess.mark_process_dead(worker.pid)
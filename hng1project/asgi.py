@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hng1project.settings')
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'hng1project.async_urls')
+# Persistent connections are per thread and async views hop between threads,
+# so under ASGI reuse comes from DB_POOL instead
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,14 @@
+"""
+URL configuration used by the ASGI entry point, see asgi.py.
+"""
+from django.apps import apps
+from django.urls import path, include
+
+urlpatterns = [
+    path('', include('string_analyzer.async_urls')),
+]
+
+# settings_api.py leaves the admin out
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -54,6 +54,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'string_analyzer.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,7 +66,8 @@ MIDDLEWARE = [
 
 APPEND_SLASH = False
 
-ROOT_URLCONF = 'hng1project.urls'
+# asgi.py switches this to the async views
+ROOT_URLCONF = os.getenv('DJANGO_ROOT_URLCONF', 'hng1project.urls')
 
 TEMPLATES = [
     {
@@ -95,12 +97,87 @@ WSGI_APPLICATION = 'hng1project.wsgi.application'
 #     }
 # }
 
+def env_flag(name, default):
+    return os.getenv(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Connection reuse, see string_analyzer/checks.py for the startup checks:
+#   DB_CONN_MAX_AGE                 seconds a connection is reused across requests (60), 0 closes it after each
+#   DB_CONN_HEALTH_CHECKS           ping a reused connection before the request uses it (true)
+#   DB_POOL                         use Django's psycopg 3 connection pool instead (false, Postgres only)
+#   DB_POOL_MIN_SIZE                connections the pool keeps open (2)
+#   DB_POOL_MAX_SIZE                connections the pool may open (10)
+#   DB_POOL_TIMEOUT                 seconds a request waits for a free connection (10)
+#   DB_DISABLE_SERVER_SIDE_CURSORS  needed behind a transaction pooling pgbouncer (false)
+# SQLite ignores the pool settings.
+
+DB_POOL = env_flag('DB_POOL', False)
+
 DATABASES = {
     'default': dj_database_url.config(
-        default=os.getenv('DATABASE_URL')
+        default=os.getenv('DATABASE_URL'),
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        conn_health_checks=env_flag('DB_CONN_HEALTH_CHECKS', True),
+        disable_server_side_cursors=env_flag('DB_DISABLE_SERVER_SIDE_CURSORS', False),
         )
 }
 
+if DB_POOL and DATABASES['default'].get('ENGINE') == 'django.db.backends.postgresql':
+    # the pool hands connections out per request, it cannot be combined with persistent ones
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    }
+
+# SQLite tests run against a file rather than the shared-cache in-memory database,
+# whose table locks fail at once instead of waiting, so threaded tests can write
+if DATABASES['default'].get('ENGINE') == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('TEST', {}).setdefault('NAME', str(BASE_DIR / 'test_db.sqlite3'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# The 'strings' cache holds API responses, STRING_CACHE_URL picks the backend:
+#   locmem://              per-process memory (default), a write only invalidates
+#                          the process that handled it, so not for several workers
+#   file:///var/tmp/cache  shared between workers on one host (gunicorn.conf.py's default)
+#   redis://host:6379/0    shared between hosts
+
+def string_cache_config(url):
+    config = {'TIMEOUT': int(os.getenv('STRING_CACHE_TTL', '300'))}
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        # eviction is left to the server's maxmemory-policy (e.g. allkeys-lru)
+        config.update(BACKEND='django.core.cache.backends.redis.RedisCache', LOCATION=url)
+    else:
+        if url.startswith('file://'):
+            config.update(BACKEND='django.core.cache.backends.filebased.FileBasedCache', LOCATION=url[len('file://'):])
+        else:
+            config.update(BACKEND='django.core.cache.backends.locmem.LocMemCache', LOCATION='strings')
+        config['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('STRING_CACHE_MAX_ENTRIES', '10000'))}
+    return config
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'strings': string_cache_config(os.getenv('STRING_CACHE_URL', 'locmem://')),
+}
+
+
+# How AnalyzedString.character_frequency_map is stored:
+#   json    a JSON object per row (default)
+#   packed  a compact binary column: the counts as a packed integer array, then the characters
+#   none    not stored, recomputed from the value on read
+# Run `python manage.py convert_frequency_maps` after changing it.
+STRING_FREQUENCY_MAP_STORAGE = os.getenv('STRING_FREQUENCY_MAP_STORAGE', 'json')
+
+# Directory of the memory-mapped character vector index behind /strings/<id>/similar.
+# Every worker on a host maps the same file; build it with `python manage.py build_vector_index`.
+STRING_VECTOR_INDEX_DIR = os.getenv('STRING_VECTOR_INDEX_DIR', str(BASE_DIR / 'vector_index'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,45 @@
+"""
+API-only settings profile, used by gunicorn.conf.py (see the Procfiles).
+
+The API has no admin, sessions, logins, messages or static files, so this
+profile drops those apps and their middleware from settings.py. DRF runs
+without authentication and only renders JSON, which keeps
+django.contrib.auth out of every request. Everything else, including the
+DB_*, STRING_CACHE_* and STRING_FREQUENCY_MAP_STORAGE environment
+variables, is read by settings.py as usual.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'rest_framework',
+    'string_analyzer',
+]
+
+MIDDLEWARE = [
+    'string_analyzer.middleware.InstrumentationMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'UNAUTHENTICATED_USER': None,
+}
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [],
+        },
+    },
+]
+
+AUTH_PASSWORD_VALIDATORS = []
@@ -0,0 +1,168 @@
+import codecs
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Batches with fewer characters than this are analyzed in-process,
+# the pickling cost of a pool round-trip is higher than the work saved.
+PARALLEL_MIN_CHARACTERS = 4 * 1024 * 1024
+
+# StreamingAnalyzer keeps up to this many bytes of each spool file in memory
+# before moving it to disk, and compares this many characters at a time
+SPOOL_MEMORY_SIZE = 4 * 1024 * 1024
+PALINDROME_BLOCK_SIZE = 256 * 1024
+# How many characters around a capital sigma StreamingAnalyzer looks at across
+# chunk boundaries, its lower-case form depends on the letters next to it (final sigma)
+SIGMA_LOOKAHEAD = 16
+
+
+def analyze(value):
+    """
+    Computes every stored property of value.
+    The string is lowered once and the distinct character count comes from
+    the frequency map instead of another pass with set().
+    """
+    lowered = value.lower()
+    character_frequency_map = dict(Counter(value))
+    return {
+        "length": len(value),
+        "is_palindrome": lowered == lowered[::-1],
+        "unique_characters": len(character_frequency_map),
+        "word_count": len(value.split()),
+        "sha256_hash": hashlib.sha256(value.encode()).hexdigest(),
+        "character_frequency_map": character_frequency_map
+    }
+
+
+def analyze_many(values, processes=None):
+    """
+    Analyzes a list of strings, returning results in the same order.
+    processes=1 forces in-process analysis, None picks based on input size.
+    """
+    if processes is None:
+        total = sum(len(value) for value in values)
+        processes = 1 if total < PARALLEL_MIN_CHARACTERS else os.cpu_count() or 1
+
+    if processes <= 1 or len(values) < 2:
+        return [analyze(value) for value in values]
+
+    chunksize = max(1, len(values) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(analyze, values, chunksize=chunksize))
+
+
+class StreamingAnalyzer:
+    """
+    analyze() for a value that arrives as chunks of UTF-8 bytes, in memory
+    that does not grow with its length. Every property is updated as chunks
+    are fed. The lower-cased text is spooled to a temporary file as UTF-32,
+    so finish() can check for a palindrome by comparing fixed-size blocks
+    from both ends.
+
+        with StreamingAnalyzer() as analyzer:
+            for chunk in chunks:
+                analyzer.feed(chunk)
+            properties = analyzer.finish()
+            value = analyzer.value()
+
+    Invalid UTF-8 raises UnicodeDecodeError from feed() or finish().
+    """
+
+    def __init__(self, spool_size=SPOOL_MEMORY_SIZE):
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.sha256 = hashlib.sha256()
+        self.counts = Counter()
+        self.length = 0
+        self.word_count = 0
+        self.in_word = False
+        # text not lower-cased yet and the end of the text that was, see _lower()
+        self.pending = ''
+        self.previous = ''
+        # the raw bytes for value(), and the lower-cased text for the palindrome check
+        self.raw = tempfile.SpooledTemporaryFile(spool_size)
+        self.lowered = tempfile.SpooledTemporaryFile(spool_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.raw.close()
+        self.lowered.close()
+
+    def feed(self, data):
+        # the UTF-8 bytes are what analyze() hashes, value.encode() gives them back unchanged
+        self.sha256.update(data)
+        self.raw.write(data)
+        self._add_text(self.decoder.decode(data))
+
+    def finish(self):
+        """
+        Returns the same properties as analyze(value)
+        """
+        self._add_text(self.decoder.decode(b'', final=True), final=True)
+        return {
+            "length": self.length,
+            "is_palindrome": self._is_palindrome(),
+            "unique_characters": len(self.counts),
+            "word_count": self.word_count,
+            "sha256_hash": self.sha256.hexdigest(),
+            "character_frequency_map": dict(self.counts)
+        }
+
+    def value(self):
+        """
+        The whole value as one string, the one full copy, needed for the INSERT
+        """
+        self.raw.seek(0)
+        return self.raw.read().decode()
+
+    def _add_text(self, text, final=False):
+        if text:
+            self.length += len(text)
+            self.counts.update(text)
+            self.word_count += len(text.split())
+            # a word cut in two by the chunk boundary was counted on both sides
+            if self.in_word and not text[0].isspace():
+                self.word_count -= 1
+            self.in_word = not text[-1].isspace()
+        self._lower(text, final)
+
+    def _lower(self, text, final):
+        """
+        Appends text.lower() to the spool. str.lower() maps a capital sigma
+        by its neighbours, so one near the end of the chunk is held back until the characters after it have arrived, and every chunk is lowered after
+        the end of the previous one.
+        """
+        text = self.pending + text
+        cut = len(text)
+        if not final:
+            sigma = text.find('Σ', max(0, len(text) - SIGMA_LOOKAHEAD))
+            if sigma != -1:
+                cut = sigma
+        head = text[:cut]
+        if head:
+            # lower() maps other characters on their own, so lengths line up with the input
+            context = self.previous
+            lowered = (context + text).lower()
+            start = len(context.lower())
+            self.lowered.write(lowered[start:start + len(head.lower())].encode('utf-32-le'))
+            self.previous = (context + head)[-SIGMA_LOOKAHEAD:]
+        self.pending = text[cut:]
+
+    def _is_palindrome(self):
+        characters = self.lowered.tell() // 4
+        half = characters // 2
+        for start in range(0, half, PALINDROME_BLOCK_SIZE):
+            count = min(PALINDROME_BLOCK_SIZE, half - start)
+            self.lowered.seek(start * 4)
+            front = self.lowered.read(count * 4).decode('utf-32-le')
+            self.lowered.seek((characters - start - count) * 4)
+            back = self.lowered.read(count * 4).decode('utf-32-le')
+            if front != back[::-1]:
+                return False
+        return True
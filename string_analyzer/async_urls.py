@@ -0,0 +1,19 @@
+from django.urls import path, re_path
+from . import async_views, views
+
+# Same routes as urls.py, served by the async views where one exists
+urlpatterns = [
+    path('', views.home, name='home'),
+    path('cache/stats', views.cache_stats, name='cache_stats'),
+    path('metrics', views.metrics, name='metrics'),
+    path('jobs/<uuid:job_id>', views.job_status, name='job_status'),
+    path('strings', async_views.strings, name='strings'),
+    path('strings/batch', views.strings_batch, name='strings_batch'),
+    path('strings/stats', views.strings_stats, name='strings_stats'),
+    path('strings/filter-by-natural-language', async_views.natural_language_filter, name='natural_language_filter'),
+    path('strings/search', views.strings_search, name='strings_search'),
+    re_path(r'^strings/(?P<sha256_hash>[0-9a-f]{64})/similar$', views.strings_similar, name='strings_similar'),
+    re_path(r'^strings/id/(?P<sha256_hash>[0-9a-f]{64})$', async_views.get_remove_string_by_id, name='get_remove_string_by_id'),
+    # values that equal one of the routes above are only reachable through strings/id/<sha256>
+    path('strings/<path:specific_string>', async_views.get_remove_string, name='get_remove_string'),
+]
@@ -0,0 +1,234 @@
+import hashlib
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.http.multipartparser import MultiPartParserError
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from . import cache as response_cache
+from . import jobs
+from . import nl_query
+from .analysis import analyze
+from .instrumentation import timed
+from .models import AnalyzedString
+from .pagination import InvalidCursor, akeyset_page, parse_limit
+from .serializer import dumps, parse_fields, payload_builder, row_position, string_rows
+from .views import (
+    STREAM_CHUNK_SIZE, analyze_upload, delete_filters, encode_string, filter_strings, json_bytes_response,
+    natural_language_payload
+)
+
+# Async counterparts of the views in views.py for the ASGI deployment.
+# They return the same payloads but use the async ORM, so a slow query
+# suspends the request instead of holding a worker thread.
+
+
+def json_response(data, status=200):
+    with timed('serialization'):
+        content = dumps(data)
+    return json_bytes_response(content, status=status)
+
+
+def read_value(request):
+    """
+    Returns the 'value' from a JSON, form or multipart body, or None.
+    Form bodies go through request.POST like DRF's FormParser and
+    MultiPartParser do for the sync view.
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data.get('value') if isinstance(data, dict) else None
+
+    try:
+        form = request.POST
+    except MultiPartParserError:
+        return None
+    if '_content' in form:
+        try:
+            return json.loads(form['_content']).get('value')
+        except (ValueError, AttributeError):
+            return None
+    return form.get('value')
+
+
+def stream_strings(queryset, applied_filters, fields=None):
+    """
+    NDJSON stream fed by an async iterator, a sync one would be buffered whole under ASGI
+    """
+    # QuerySet.aiterator() opens the cursor of a values_list() queryset
+    # outside sync_to_async, so the chunks are pulled through it explicitly
+    rows = string_rows(queryset.order_by('created_at', 'id'), fields).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    next_chunk = sync_to_async(lambda: list(islice(rows, STREAM_CHUNK_SIZE)))
+    payload = payload_builder(fields)
+
+    async def lines():
+        while chunk := await next_chunk():
+            for row in chunk:
+                yield dumps(payload(row)) + b"\n"
+
+    response = StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+    response['X-Filters-Applied'] = json.dumps(applied_filters)
+    return response
+
+
+@csrf_exempt
+@require_http_methods(['POST', 'GET', 'DELETE'])
+async def strings(request):
+    if request.method == 'POST':
+        properties = None
+        queue = request.GET.get('async', '').lower() in ('1', 'true')
+        if request.content_type == 'text/plain':
+            # ASGIHandler has already spooled the body to a temporary file, read it from there in chunks
+            try:
+                if queue:
+                    value = request.body.decode()
+                else:
+                    value, properties = await sync_to_async(analyze_upload)(request)
+            except UnicodeDecodeError:
+                return json_response({"error": "Request body is not valid UTF-8"}, status=400)
+        else:
+            value = read_value(request)
+        if value is None or value == "":
+            return json_response({"error": "Invalid request body or missing 'value' field"}, status=400)
+        if not isinstance(value, str):
+            return json_response({"error": "Invalid data type for 'value' (must be string)"}, status=422)
+
+        if queue:
+            job = await jobs.aenqueue_string(value)
+            url = f"/jobs/{job.id}"
+            response = json_response({"job_id": str(job.id), "status": job.status, "url": url}, status=202)
+            response['Location'] = url
+            return response
+
+        if properties is None:
+            with timed('analysis'):
+                properties = analyze(value)
+        sha256_hash = properties['sha256_hash']
+        analyzed_value = await AnalyzedString.objects.acreate_analyzed(value=value, **properties)
+        if analyzed_value is None:
+            return json_response({"error": "String already exists in the system"}, status=409)
+        await response_cache.ainvalidate()
+        return json_response({
+            "id": sha256_hash,
+            "value": value,
+            "properties": properties,
+            "created_at": analyzed_value.created_at
+        }, status=201)
+
+    if request.method == 'DELETE':
+        try:
+            data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else {}
+            matched, applied_filters = delete_filters(request.GET, data)
+        except nl_query.QueryParseError:
+            return json_response({"error": "Unable to parse natural language query"}, status=400)
+        except ValueError:
+            return json_response({"error": "Invalid query parameter values or types"}, status=400)
+        if not applied_filters:
+            return json_response({"error": "At least one filter is required to delete strings"}, status=400)
+
+        deleted = await matched.abulk_delete_analyzed()
+        if deleted:
+            await response_cache.ainvalidate()
+        return json_response({"deleted": deleted, "filters_applied": applied_filters})
+
+    try:
+        all_strings, applied_filters = filter_strings(request.GET)
+        limit = parse_limit(request.GET.get('limit', None))
+        fields = parse_fields(request.GET.get('fields', None))
+    except ValueError:
+        return json_response({"error": "Invalid query parameter values or types"}, status=400)
+
+    if request.GET.get('stream', '').lower() == 'true':
+        return stream_strings(all_strings, applied_filters, fields)
+
+    cursor = request.GET.get('cursor', None)
+
+    async def build_page():
+        page, next_cursor = await akeyset_page(string_rows(all_strings, fields), cursor, limit, position=row_position)
+        count = await all_strings.acount() if cursor is None else None
+        payload = payload_builder(fields)
+        with timed('serialization'):
+            return dumps({
+                "data": [payload(row) for row in page],
+                "count": count,
+                "next": next_cursor,
+                "filters_applied": applied_filters
+            })
+
+    cache_key = await response_cache.afilter_key(
+        'list', {**applied_filters, 'cursor': cursor, 'limit': limit, 'fields': fields}
+    )
+    try:
+        payload = await response_cache.aget_or_compute(cache_key, build_page)
+    except InvalidCursor:
+        return json_response({"error": "Invalid cursor"}, status=400)
+    return json_bytes_response(payload)
+
+
+async def get_or_remove_by_hash(request, sha256_hash):
+    if request.method == 'GET':
+        async def fetch():
+            return encode_string(await string_rows(AnalyzedString.objects.filter(sha256_hash=sha256_hash)).aget())
+
+        try:
+            payload = await response_cache.aget_or_compute(await response_cache.astring_key(sha256_hash), fetch)
+        except AnalyzedString.DoesNotExist:
+            return json_response({"error": "String does not exist in the system"}, status=404)
+        return json_bytes_response(payload)
+
+    deleted = await AnalyzedString.objects.filter(sha256_hash=sha256_hash).adelete_analyzed()
+    if not deleted:
+        return json_response({"error": "String does not exist in the system"}, status=404)
+    await response_cache.ainvalidate()
+    return HttpResponse(status=204)
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'DELETE'])
+async def get_remove_string(request, specific_string):
+    return await get_or_remove_by_hash(request, hashlib.sha256(specific_string.encode()).hexdigest())
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'DELETE'])
+async def get_remove_string_by_id(request, sha256_hash):
+    return await get_or_remove_by_hash(request, sha256_hash)
+
+
+@require_http_methods(['GET'])
+async def natural_language_filter(request):
+    query = request.GET.get('query', None)
+    if not query:
+        return json_response({"error": "Unable to parse natural language query"}, status=400)
+
+    query = query.lower().strip()
+    try:
+        parsed = nl_query.parse(query)
+    except nl_query.QueryParseError:
+        return json_response({"error": "Unable to parse natural language query"}, status=400)
+    try:
+        fields = parse_fields(request.GET.get('fields', None))
+    except ValueError:
+        return json_response({"error": "Invalid query parameter values or types"}, status=400)
+
+    async def build_matches():
+        payload = payload_builder(fields)
+        rows = [row async for row in string_rows(AnalyzedString.objects.filter(parsed.q), fields)]
+        with timed('serialization'):
+            return len(rows), dumps([payload(row) for row in rows])
+
+    count, data = await response_cache.aget_or_compute(
+        await response_cache.afilter_key('natural_language', {**parsed.filters, 'fields': fields}),
+        build_matches
+    )
+    if not count:
+        return json_response({"error": "Query parsed but resulted in no matches."}, status=422)
+
+    return json_bytes_response(natural_language_payload(data, count, query, parsed.filters))
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.core.cache import caches
+
+CACHE_ALIAS = 'strings'
+GENERATION_KEY = 'strings:generation'
+
+# Hit and miss counts are kept per process
+_counters = {'hits': 0, 'misses': 0}
+_counters_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _seed():
+    """
+    Starting value of a missing generation key. The key can be evicted like
+    any other entry, and restarting from a constant would bring back the
+    generations of entries cached before, so it starts from the clock
+    instead, past every value the old counter reached by incrementing.
+    """
+    return time.time_ns()
+
+
+def generation():
+    cache = get_cache()
+    current = cache.get(GENERATION_KEY)
+    if current is None:
+        seed = _seed()
+        cache.add(GENERATION_KEY, seed, timeout=None)
+        current = cache.get(GENERATION_KEY, seed)
+    return current
+
+
+def invalidate():
+    """
+    Makes every cached entry unreachable by moving to a new generation.
+    Called after any create or delete, old entries age out through TTL/LRU.
+    """
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, _seed(), timeout=None)
+
+
+def string_key(sha256_hash):
+    return f"strings:{generation()}:item:{sha256_hash}"
+
+
+def filter_key(namespace, filters):
+    """
+    Key for a filtered list, equal filters give equal keys whatever their order
+    """
+    return f"strings:{generation()}:{namespace}:{_signature(filters)}"
+
+
+def _signature(filters):
+    signature = json.dumps(filters, sort_keys=True, default=str)
+    return hashlib.sha256(signature.encode()).hexdigest()
+
+
+def get_or_compute(key, compute):
+    cache = get_cache()
+    payload = cache.get(key)
+    if payload is not None:
+        _count('hits')
+        return payload
+
+    _count('misses')
+    payload = compute()
+    if payload is not None:
+        cache.set(key, payload)
+    return payload
+
+
+async def ageneration():
+    cache = get_cache()
+    current = await cache.aget(GENERATION_KEY)
+    if current is None:
+        seed = _seed()
+        await cache.aadd(GENERATION_KEY, seed, timeout=None)
+        current = await cache.aget(GENERATION_KEY, seed)
+    return current
+
+
+async def ainvalidate():
+    cache = get_cache()
+    try:
+        await cache.aincr(GENERATION_KEY)
+    except ValueError:
+        await cache.aadd(GENERATION_KEY, _seed(), timeout=None)
+
+
+async def astring_key(sha256_hash):
+    return f"strings:{await ageneration()}:item:{sha256_hash}"
+
+
+async def afilter_key(namespace, filters):
+    return f"strings:{await ageneration()}:{namespace}:{_signature(filters)}"
+
+
+async def aget_or_compute(key, acompute):
+    cache = get_cache()
+    payload = await cache.aget(key)
+    if payload is not None:
+        _count('hits')
+        return payload
+
+    _count('misses')
+    payload = await acompute()
+    if payload is not None:
+        await cache.aset(key, payload)
+    return payload
+
+
+def _count(counter):
+    with _counters_lock:
+        _counters[counter] += 1
+
+
+def stats():
+    with _counters_lock:
+        hits, misses = _counters['hits'], _counters['misses']
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else None,
+        "generation": generation()
+    }
@@ -0,0 +1,66 @@
+from django.db import models
+from django.db.models import Lookup, Q
+
+# Folded ASCII letters and digits get a bit in AnalyzedString.char_mask,
+# every other character present in a string gets a CharacterPresence row.
+LETTER_BITS = 26
+DIGIT_BITS = 10
+
+
+def fold(character):
+    """
+    Case-folds a single character the way a case-insensitive match sees it
+    """
+    lowered = character.lower()
+    return lowered if len(lowered) == 1 else character
+
+
+def character_bit(character):
+    folded = fold(character)
+    if 'a' <= folded <= 'z':
+        return 1 << (ord(folded) - ord('a'))
+    if '0' <= folded <= '9':
+        return 1 << (LETTER_BITS + ord(folded) - ord('0'))
+    return None
+
+
+def character_mask(characters):
+    mask = 0
+    for character in characters:
+        bit = character_bit(character)
+        if bit is not None:
+            mask |= bit
+    return mask
+
+
+def extra_characters(characters):
+    """
+    Folded characters that have no bit in the mask
+    """
+    return {fold(character) for character in characters if character_bit(character) is None}
+
+
+def contains_character_q(character):
+    """
+    Case-insensitive "value contains character" without scanning value
+    """
+    bit = character_bit(character)
+    if bit is not None:
+        return Q(char_mask__hasbits=bit)
+
+    from .models import CharacterPresence
+    return Q(pk__in=CharacterPresence.objects.filter(character=fold(character)).values('string_id'))
+
+
+class CharacterMaskField(models.BigIntegerField):
+    pass
+
+
+@CharacterMaskField.register_lookup
+class HasBits(Lookup):
+    lookup_name = 'hasbits'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"({lhs} & {rhs}) = {rhs}", (*lhs_params, *rhs_params, *rhs_params)
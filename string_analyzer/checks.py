@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+from django.db import connections
+
+POSTGRES = 'django.db.backends.postgresql'
+
+
+@register()
+def check_database_connections(app_configs, **kwargs):
+    """
+    Startup checks for the DB_* connection reuse settings, see settings.py
+    """
+    messages = []
+    for alias in connections:
+        config = connections.settings[alias]
+        pool = config.get('OPTIONS', {}).get('pool')
+
+        if getattr(settings, 'DB_POOL', False) and config['ENGINE'] != POSTGRES:
+            messages.append(Warning(
+                f"DB_POOL is set but database '{alias}' is not PostgreSQL, connections are not pooled.",
+                id='string_analyzer.W001',
+            ))
+
+        if pool:
+            try:
+                import psycopg  # noqa: F401
+                import psycopg_pool  # noqa: F401
+            except ImportError:
+                messages.append(Error(
+                    f"Database '{alias}' has a connection pool configured but psycopg 3 with the pool extra is not installed.",
+                    hint="pip install 'psycopg[binary,pool]'",
+                    id='string_analyzer.E001',
+                ))
+            if isinstance(pool, dict) and pool.get('min_size', 0) > pool.get('max_size', pool.get('min_size', 0)):
+                messages.append(Error(
+                    f"Database '{alias}': DB_POOL_MIN_SIZE is larger than DB_POOL_MAX_SIZE.",
+                    id='string_analyzer.E002',
+                ))
+        elif config['ENGINE'] == POSTGRES and not config.get('CONN_MAX_AGE'):
+            messages.append(Warning(
+                f"Database '{alias}' opens a new PostgreSQL connection for every request.",
+                hint="Set DB_CONN_MAX_AGE (WSGI) or DB_POOL=true (ASGI) to reuse connections.",
+                id='string_analyzer.W002',
+            ))
+    return messages
@@ -0,0 +1,141 @@
+import struct
+import sys
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+JSON = 'json'
+PACKED = 'packed'
+NONE = 'none'
+MODES = (JSON, PACKED, NONE)
+
+CONVERT_CHUNK_SIZE = 2000
+
+# Columns the map is stored in, and those read to produce it in any storage mode
+STORED_COLUMNS = ('character_frequency_map', 'character_frequency_packed')
+FREQUENCY_COLUMNS = STORED_COLUMNS + ('value',)
+
+_HEADER = struct.Struct('<BI')
+# (array typecode, exclusive upper bound) from narrowest to widest
+_COUNT_TYPES = (('B', 1 << 8), ('H', 1 << 16), ('I', 1 << 32), ('Q', 1 << 64))
+_TYPECODES = {array(code).itemsize: code for code, _ in reversed(_COUNT_TYPES)}
+
+
+def storage_mode():
+    mode = getattr(settings, 'STRING_FREQUENCY_MAP_STORAGE', JSON)
+    if mode not in MODES:
+        raise ValueError(f"STRING_FREQUENCY_MAP_STORAGE must be one of {', '.join(MODES)}")
+    return mode
+
+
+def pack(frequency_map):
+    """
+    Encodes {character: count} as a header (count width, entry count), the
+    counts as a little-endian array of the narrowest unsigned type that holds
+    them, then the characters as UTF-8. For ASCII text that is about two
+    bytes per distinct character, and both halves decode in C.
+    """
+    largest = max(frequency_map.values(), default=0)
+    typecode = next(code for code, limit in _COUNT_TYPES if largest < limit)
+    count_array = array(typecode, frequency_map.values())
+    if sys.byteorder == 'big':
+        count_array.byteswap()
+    return (
+        _HEADER.pack(count_array.itemsize, len(count_array))
+        + count_array.tobytes()
+        + ''.join(frequency_map).encode('utf-8', 'surrogatepass')
+    )
+
+
+def unpack(packed):
+    packed = bytes(packed)
+    width, size = _HEADER.unpack_from(packed)
+    end = _HEADER.size + width * size
+    count_array = array(_TYPECODES[width])
+    count_array.frombytes(packed[_HEADER.size:end])
+    if sys.byteorder == 'big':
+        count_array.byteswap()
+    return dict(zip(packed[end:].decode('utf-8', 'surrogatepass'), count_array))
+
+
+def stored_columns(frequency_map, mode=None):
+    """
+    Column values holding frequency_map in the given (or configured) storage mode
+    """
+    mode = mode or storage_mode()
+    return {
+        'character_frequency_map': frequency_map if mode == JSON else None,
+        'character_frequency_packed': pack(frequency_map) if mode == PACKED else None,
+    }
+
+
+def frequency_map(stored_map, packed, value):
+    """
+    The frequency map of a row, whatever mode it was stored in.
+    Rows are decoded by what they hold rather than by the current setting,
+    so reads keep working while a conversion is in progress.
+    """
+    if stored_map is not None:
+        return stored_map
+    if packed is not None:
+        return unpack(packed)
+    return dict(Counter(value))
+
+
+def decoded(row):
+    """
+    A values() dict read with FREQUENCY_COLUMNS, with character_frequency_map filled in.
+    Historical models in older migrations have no packed column.
+    """
+    return {
+        **row,
+        'character_frequency_map': frequency_map(
+            row['character_frequency_map'], row.get('character_frequency_packed'), row['value']
+        )
+    }
+
+
+def model_fields(fields, mode=None):
+    """
+    Analyzed fields with character_frequency_map swapped for its stored columns
+    """
+    fields = dict(fields)
+    return {**fields, **stored_columns(fields.pop('character_frequency_map'), mode)}
+
+
+def convert(analyzed_model=None, mode=None):
+    """
+    Rewrites every row that is not stored in the given (or configured) mode.
+    Returns the number of rows converted.
+    """
+    from .models import AnalyzedString
+    analyzed_model = analyzed_model or AnalyzedString
+    mode = mode or storage_mode()
+
+    rows = analyzed_model.objects.all()
+    if mode == JSON:
+        rows = rows.filter(character_frequency_map__isnull=True)
+    elif mode == PACKED:
+        rows = rows.filter(character_frequency_packed__isnull=True)
+    else:
+        rows = rows.exclude(character_frequency_map__isnull=True, character_frequency_packed__isnull=True)
+
+    converted = 0
+    pks = list(rows.values_list('pk', flat=True))
+    for start in range(0, len(pks), CONVERT_CHUNK_SIZE):
+        with transaction.atomic():
+            chunk = analyzed_model.objects.filter(pk__in=pks[start:start + CONVERT_CHUNK_SIZE]).only('pk', *FREQUENCY_COLUMNS)
+            updated = []
+            for analyzed in chunk:
+                columns = stored_columns(
+                    frequency_map(analyzed.character_frequency_map, analyzed.character_frequency_packed, analyzed.value),
+                    mode,
+                )
+                for name, column in columns.items():
+                    setattr(analyzed, name, column)
+                updated.append(analyzed)
+            analyzed_model.objects.bulk_update(updated, STORED_COLUMNS, batch_size=500)
+            converted += len(updated)
+    return converted
@@ -0,0 +1,86 @@
+import hashlib
+from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
+
+from django.db import transaction
+
+from .analysis import analyze_many
+from .instrumentation import timed
+from .models import AnalyzedString
+from .parsers import InvalidLine
+
+BATCH_CHUNK_SIZE = 1000
+INVALID_ITEM = "Item must be a non-empty string or {\"value\": string}"
+
+
+def item_value(item):
+    return item.get('value') if isinstance(item, dict) else item
+
+
+def ingest(items, atomic=True, progress=None, done=()):
+    """
+    Analyzes and inserts batch items (strings or {"value": ...} objects) in
+    chunks of BATCH_CHUNK_SIZE, each item gets its own status. With atomic
+    the whole batch is one transaction, otherwise every chunk commits on its
+    own, and progress(results so far) is called inside that transaction.
+    done holds the statuses of the leading items an earlier, interrupted run
+    committed; those items are skipped and keep their status.
+    Returns the counts and per-item results of the /strings/batch response.
+    """
+    results = []
+    chunk = []
+    seen_hashes = set()
+
+    for index, item_status in enumerate(done):
+        if item_status == "invalid":
+            results.append({"index": index, "status": "invalid", "error": INVALID_ITEM})
+            continue
+        sha256_hash = hashlib.sha256(item_value(items[index]).encode()).hexdigest()
+        seen_hashes.add(sha256_hash)
+        results.append({"index": index, "id": sha256_hash, "status": item_status})
+
+    def flush():
+        rows = []
+        with timed('analysis'):
+            analyzed = analyze_many([value for _, value in chunk])
+        for (index, value), properties in zip(chunk, analyzed):
+            sha256_hash = properties['sha256_hash']
+            if sha256_hash in seen_hashes:
+                results[index] = {"index": index, "id": sha256_hash, "status": "conflict"}
+                continue
+            seen_hashes.add(sha256_hash)
+            rows.append((index, {"value": value, **properties}))
+
+        with transaction.atomic():
+            created = AnalyzedString.objects.bulk_create_analyzed(
+                [row for _, row in rows], batch_size=BATCH_CHUNK_SIZE
+            )
+            for index, row in rows:
+                item_status = "created" if row['sha256_hash'] in created else "conflict"
+                results[index] = {"index": index, "id": row['sha256_hash'], "status": item_status}
+            if progress is not None:
+                progress(results)
+        chunk.clear()
+
+    with transaction.atomic() if atomic else nullcontext():
+        for index, item in enumerate(islice(items, len(done), None), start=len(done)):
+            value = item_value(item)
+            if isinstance(item, InvalidLine) or not isinstance(value, str) or value == "":
+                results.append({"index": index, "status": "invalid", "error": INVALID_ITEM})
+                continue
+
+            results.append(None)
+            chunk.append((index, value))
+            if len(chunk) >= BATCH_CHUNK_SIZE:
+                flush()
+        if chunk:
+            flush()
+
+    counts = Counter(result['status'] for result in results)
+    return {
+        "created": counts['created'],
+        "conflict": counts['conflict'],
+        "invalid": counts['invalid'],
+        "results": results
+    }
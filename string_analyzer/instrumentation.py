@@ -0,0 +1,169 @@
+import os
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+# Measurements of the request being handled, None outside of one.
+# A ContextVar follows the request into sync_to_async threads and async views.
+_current = ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# prometheus_client picks its value storage from this when it is imported
+MULTIPROCESS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db', 'analysis', 'serialization')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.analysis = 0.0
+        self.serialization = 0.0
+
+
+class timed:
+    """
+    Adds the time spent in the block to a phase ('analysis' or 'serialization')
+    of the current request. Outside a request it only costs the ContextVar lookup.
+    """
+    __slots__ = ('phase', 'metrics', 'start')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.metrics = _current.get()
+        if self.metrics is not None:
+            self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.metrics is not None:
+            setattr(self.metrics, self.phase, getattr(self.metrics, self.phase) + perf_counter() - self.start)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db += perf_counter() - start
+        metrics.queries += 1
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    # the wrapper list outlives reconnects, only add it once per connection object
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+connection_created.connect(_install_wrapper)
+for _connection in connections.all(initialized_only=True):
+    _install_wrapper(None, _connection)
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def time_rendering(response):
+    """
+    Counts the rendering of a DRF Response, which happens after the view has
+    returned, as serialization time of the current request
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return
+    start = perf_counter()
+
+    def rendered(response):
+        metrics.serialization += perf_counter() - start
+
+    response.add_post_render_callback(rendered)
+
+
+# Anything else is counted as 'other', so a client cannot add label values at will
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+def method_label(method):
+    return method if method in METHODS else 'other'
+
+
+class Registry:
+    """
+    Per-route request counter and histograms in prometheus_client metrics.
+    With PROMETHEUS_MULTIPROC_DIR set, as gunicorn.conf.py does, every
+    process writes its values to memory-mapped files in that directory and
+    render() adds up the files of all of them, so a scrape gets the same
+    totals whichever worker answers it. Without it the values are per process.
+    """
+    HISTOGRAMS = {
+        'string_api_request_duration_seconds': ('Time to produce the response', DURATION_BUCKETS),
+        'string_api_db_queries': ('SQL queries per request', QUERY_BUCKETS),
+        'string_api_db_duration_seconds': ('Time spent in SQL queries', DURATION_BUCKETS),
+        'string_api_analysis_duration_seconds': ('Time spent analyzing strings', DURATION_BUCKETS),
+        'string_api_serialization_duration_seconds': ('Time spent encoding responses', DURATION_BUCKETS),
+        'string_api_response_size_bytes': ('Response body size, streamed responses excluded', SIZE_BUCKETS),
+    }
+
+    def __init__(self):
+        self.registry = CollectorRegistry()
+        self.requests = Counter(
+            'string_api_requests_total', 'Requests handled', ['route', 'method', 'status'], registry=self.registry
+        )
+        self.histograms = {
+            name: Histogram(name, description, ['route', 'method'], buckets=buckets, registry=self.registry)
+            for name, (description, buckets) in self.HISTOGRAMS.items()
+        }
+        # the labelled children of each (route, method), labels() takes a lock on every call
+        self.children = {}
+
+    def record(self, route, method, status, duration, metrics, size):
+        labels = (route, method_label(method))
+        children = self.children.get(labels)
+        if children is None:
+            children = self.children[labels] = [histogram.labels(*labels) for histogram in self.histograms.values()]
+        values = (duration, metrics.queries, metrics.db, metrics.analysis, metrics.serialization, size)
+        for child, value in zip(children, values):
+            if value is not None:
+                child.observe(value)
+        self.requests.labels(*labels, str(status)).inc()
+
+    def render(self):
+        """
+        Prometheus text exposition format
+        """
+        if not MULTIPROCESS_DIR:
+            return generate_latest(self.registry)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROCESS_DIR)
+        return generate_latest(registry)
+
+
+registry = Registry()
+
+
+def server_timing(metrics, duration):
+    """
+    Server-Timing header value, durations in milliseconds
+    """
+    return (
+        f'db;dur={metrics.db * 1e3:.2f};desc="{metrics.queries} queries", '
+        f'analysis;dur={metrics.analysis * 1e3:.2f}, '
+        f'serialization;dur={metrics.serialization * 1e3:.2f}, '
+        f'total;dur={duration * 1e3:.2f}'
+    )
@@ -0,0 +1,179 @@
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import cache as response_cache
+from . import vectors
+from .analysis import analyze
+from .ingest import ingest
+from .instrumentation import timed
+from .models import AnalysisJob, AnalyzedString
+
+logger = logging.getLogger(__name__)
+
+# A running job whose worker has not reported for this long is handed to
+# another worker, up to MAX_ATTEMPTS runs in all
+STALE_AFTER = timedelta(minutes=10)
+MAX_ATTEMPTS = 3
+# SQLite claims: how many waiting jobs a worker tries before polling again
+CLAIM_CANDIDATES = 10
+# AnalysisJob.item_statuses letters
+STATUS_CODES = {"created": "c", "conflict": "x", "invalid": "i"}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+
+def enqueue_string(value):
+    return AnalysisJob.objects.create(kind=AnalysisJob.STRING, payload={"value": value}, total=1)
+
+
+async def aenqueue_string(value):
+    return await AnalysisJob.objects.acreate(kind=AnalysisJob.STRING, payload={"value": value}, total=1)
+
+
+def enqueue_batch(items):
+    return AnalysisJob.objects.create(kind=AnalysisJob.BATCH, payload={"items": items}, total=len(items))
+
+
+def describe(job):
+    """
+    GET /jobs/<id> payload
+    """
+    return {
+        "id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "progress": {"processed": job.processed, "total": job.total},
+        "result": job.result,
+        "error": job.error or None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def claim(worker):
+    """
+    Marks the oldest waiting job as running for worker and returns it, or None.
+    PostgreSQL skips the rows other workers have locked. SQLite has no row
+    locks, so a job is claimed with an UPDATE that only matches while it is
+    still unclaimed, and the next one is tried when another worker won.
+    """
+    now = timezone.now()
+    stale = Q(status=AnalysisJob.RUNNING, updated_at__lt=now - STALE_AFTER)
+    AnalysisJob.objects.filter(stale, attempts__gte=MAX_ATTEMPTS).update(
+        status=AnalysisJob.FAILED, error="The worker running this job stopped responding", finished_at=now, updated_at=now
+    )
+    waiting = AnalysisJob.objects.filter(Q(status=AnalysisJob.QUEUED) | stale).order_by('created_at')
+    claimed = {'status': AnalysisJob.RUNNING, 'worker': worker, 'attempts': F('attempts') + 1, 'started_at': now, 'updated_at': now}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_id = waiting.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if job_id is None:
+                return None
+            AnalysisJob.objects.filter(pk=job_id).update(**claimed)
+        return AnalysisJob.objects.get(pk=job_id)
+
+    for job_id, attempts in waiting.values_list('id', 'attempts')[:CLAIM_CANDIDATES]:
+        # attempts only changes when a job is claimed, so it tells whether someone else got there first
+        if AnalysisJob.objects.filter(Q(status=AnalysisJob.QUEUED) | stale, pk=job_id, attempts=attempts).update(**claimed):
+            return AnalysisJob.objects.get(pk=job_id)
+    return None
+
+
+def run(job):
+    """
+    Does the work of a claimed job and stores its result or error
+    """
+    try:
+        if job.kind == AnalysisJob.STRING:
+            result = run_string(job)
+        else:
+            result = run_batch(job)
+    except Exception as e:
+        logger.exception("Job %s failed", job.id)
+        job.status = AnalysisJob.FAILED
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+        return
+
+    job.status = AnalysisJob.DONE
+    job.result = result
+    job.payload = None
+    job.item_statuses = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'payload', 'item_statuses', 'processed', 'finished_at', 'updated_at'])
+
+
+def run_string(job):
+    """
+    What POST /strings does for one value
+    """
+    value = job.payload['value']
+    with timed('analysis'):
+        properties = analyze(value)
+    created = AnalyzedString.objects.create_analyzed(value=value, **properties)
+    job.processed = 1
+    if created is None:
+        return {"id": properties['sha256_hash'], "status": "conflict"}
+    response_cache.invalidate()
+    return {"id": properties['sha256_hash'], "status": "created", "created_at": created.created_at.isoformat()}
+
+
+def run_batch(job):
+    """
+    What POST /strings/batch does, committing and reporting progress chunk by chunk.
+    The item statuses are saved in the chunk's transaction, so a run that
+    resumes after a crash skips the committed items and reports them as the
+    first run would have.
+    """
+    def report(results):
+        job.processed = len(results)
+        job.item_statuses += ''.join(STATUS_CODES[result['status']] for result in results[len(job.item_statuses):])
+        job.save(update_fields=['processed', 'item_statuses', 'updated_at'])
+
+    done = [STATUS_NAMES[code] for code in job.item_statuses]
+    result = ingest(job.payload['items'], atomic=False, progress=report, done=done)
+    job.processed = job.total
+    if result['created']:
+        response_cache.invalidate()
+    return result
+
+
+def compact_vector_index():
+    try:
+        if vectors.compact():
+            logger.info("Compacted the similarity index")
+    except Exception:
+        logger.exception("Compacting the similarity index failed")
+
+
+def work(poll_interval=1.0, burst=False, stop=None):
+    """
+    Claims and runs jobs until stop is set, polling every poll_interval
+    seconds while the queue is empty. With burst it returns as soon as the
+    queue is empty. Whenever the queue is empty it also compacts the
+    similarity index, so requests never rewrite it. Returns the number of jobs run.
+    """
+    stop = stop or threading.Event()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    count = 0
+    while not stop.is_set():
+        close_old_connections()
+        job = claim(worker)
+        if job is None:
+            compact_vector_index()
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        run(job)
+        count += 1
+    return count
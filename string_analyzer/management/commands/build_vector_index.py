@@ -0,0 +1,16 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from string_analyzer import vectors
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the character vector index behind /strings/<id>/similar from the stored frequency maps"
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        total = vectors.build()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} strings in {perf_counter() - start:.1f}s at {vectors.index().path}"
+        ))
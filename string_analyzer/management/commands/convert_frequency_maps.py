@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from string_analyzer import frequency
+
+
+class Command(BaseCommand):
+    help = "Rewrites stored character frequency maps into the STRING_FREQUENCY_MAP_STORAGE mode"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=frequency.MODES, help="Convert to this mode instead of the configured one")
+
+    def handle(self, *args, **options):
+        mode = options['mode'] or frequency.storage_mode()
+        converted = frequency.convert(mode=mode)
+        self.stdout.write(self.style.SUCCESS(f"Converted {converted} strings to '{mode}' frequency map storage"))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import QueryDict
+
+from string_analyzer.models import AnalyzedString
+from string_analyzer.views import filter_strings
+
+# query strings accepted by GET /strings
+LIST_FILTER_SHAPES = [
+    'is_palindrome=true',
+    'is_palindrome=true&min_length=5',
+    'is_palindrome=false&min_length=3&max_length=10',
+    'min_length=5&max_length=20',
+    'word_count=2',
+    'word_count=1&min_length=3',
+    'contains_character=a',
+    'contains_character=%C3%A9',
+]
+
+# filter kwargs produced by the natural language endpoint
+NATURAL_LANGUAGE_SHAPES = [
+    {'is_palindrome': True, 'word_count': 1},
+    {'word_count__gt': 1, 'length__gt': 10},
+    {'length__gt': 5, 'length__lt': 20},
+    {'is_palindrome': True, 'length__gt': 3},
+]
+
+
+class Command(BaseCommand):
+    help = "Prints the database query plan for each standard filter shape"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help="Run EXPLAIN ANALYZE (PostgreSQL only)")
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        self.stdout.write(f"Database vendor: {connection.vendor}")
+
+        for shape in LIST_FILTER_SHAPES:
+            queryset, _ = filter_strings(QueryDict(shape))
+            self.explain(f"GET /strings?{shape}", queryset.order_by('created_at', 'id'), explain_options)
+
+        for shape in NATURAL_LANGUAGE_SHAPES:
+            queryset = AnalyzedString.objects.filter(**shape)
+            self.explain(f"natural language {shape}", queryset, explain_options)
+
+        self.explain("first page", AnalyzedString.objects.order_by('created_at', 'id')[:100], explain_options)
+
+    def explain(self, label, queryset, explain_options):
+        plan = queryset.explain(**explain_options)
+        if connection.vendor == 'sqlite':
+            # "SCAN ... USING INDEX" walks the index in order, only SEARCH is a seek
+            if 'SEARCH' in plan:
+                marker = self.style.SUCCESS("index")
+            elif 'USING INDEX' in plan or 'USING COVERING INDEX' in plan:
+                marker = self.style.SUCCESS("index order")
+            else:
+                marker = self.style.WARNING("scan")
+        elif 'Index' in plan and 'Seq Scan' not in plan:
+            marker = self.style.SUCCESS("index")
+        else:
+            marker = self.style.WARNING("scan")
+        self.stdout.write(f"\n[{marker}] {label}")
+        self.stdout.write(plan)
@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def worker_process(poll_interval, burst):
+    """
+    Entry point of one worker process. SIGTERM and SIGINT let the current job finish.
+    """
+    import django
+    django.setup()
+    from string_analyzer import jobs
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    jobs.work(poll_interval=poll_interval, burst=burst, stop=stop)
+
+
+class Command(BaseCommand):
+    help = "Runs the workers for POST /strings?async=1 and /strings/batch?async=1 jobs, one process each"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between polls of an empty queue")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        # forked workers must not share the parent's database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=worker_process, args=(options['poll_interval'], options['burst']))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {processes} job worker processes")
+
+        def forward(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    os.kill(worker.pid, signal.SIGTERM)
+
+        previous = {signum: signal.signal(signum, forward) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            for worker in workers:
+                worker.join()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS("Job workers stopped"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from string_analyzer import stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the /strings/stats summary table from the stored strings"
+
+    def handle(self, *args, **options):
+        total = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {total} strings"))
@@ -0,0 +1,56 @@
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import instrumentation
+
+
+class InstrumentationMiddleware:
+    """
+    Measures every request (SQL queries and time, analysis and serialization
+    time, response size), adds a Server-Timing header and feeds the /metrics
+    histograms. Works for both the sync and the async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = perf_counter()
+        metrics, token = instrumentation.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        return self.finish(request, response, metrics, perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = perf_counter()
+        metrics, token = instrumentation.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        return self.finish(request, response, metrics, perf_counter() - start)
+
+    def process_template_response(self, request, response):
+        # called right before Django renders the response, inside the measured request
+        instrumentation.time_rendering(response)
+        return response
+
+    def finish(self, request, response, metrics, duration):
+        # streamed bodies are produced after this point, only their setup is measured
+        size = None if response.streaming else len(response.content)
+        match = request.resolver_match
+        instrumentation.registry.record(
+            match.view_name if match else 'unmatched', request.method, response.status_code, duration, metrics, size
+        )
+        response['Server-Timing'] = instrumentation.server_timing(metrics, duration)
+        return response
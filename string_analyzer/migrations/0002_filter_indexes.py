@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('string_analyzer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analyzedstring',
+            index=models.Index(fields=['length'], name='analyzed_length_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyzedstring',
+            index=models.Index(fields=['is_palindrome', 'length'], name='analyzed_palindrome_len_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyzedstring',
+            index=models.Index(fields=['word_count', 'length'], name='analyzed_words_len_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyzedstring',
+            index=models.Index(fields=['created_at', 'id'], name='analyzed_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyzedstring',
+            index=models.Index(fields=['is_palindrome', 'created_at', 'id'], name='analyzed_palindrome_page_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:03
+
+import django.db.models.deletion
+import string_analyzer.characters
+from django.db import migrations, models
+from string_analyzer.characters import character_mask, extra_characters
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_character_presence(apps, schema_editor):
+    AnalyzedString = apps.get_model('string_analyzer', 'AnalyzedString')
+    CharacterPresence = apps.get_model('string_analyzer', 'CharacterPresence')
+
+    batch = []
+    for analyzed in AnalyzedString.objects.only('id', 'character_frequency_map').iterator(chunk_size=BACKFILL_CHUNK_SIZE):
+        characters = analyzed.character_frequency_map.keys()
+        analyzed.char_mask = character_mask(characters)
+        batch.append(analyzed)
+        CharacterPresence.objects.bulk_create(
+            CharacterPresence(string_id=analyzed.id, character=character)
+            for character in extra_characters(characters)
+        )
+        if len(batch) >= BACKFILL_CHUNK_SIZE:
+            AnalyzedString.objects.bulk_update(batch, ['char_mask'])
+            batch = []
+    if batch:
+        AnalyzedString.objects.bulk_update(batch, ['char_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('string_analyzer', '0002_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyzedstring',
+            name='char_mask',
+            field=string_analyzer.characters.CharacterMaskField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CharacterPresence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('character', models.CharField(max_length=1)),
+                ('string', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='extra_characters', to='string_analyzer.analyzedstring')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('character', 'string'), name='character_presence_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_character_presence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:13
+
+from django.db import migrations, models
+from string_analyzer import stats
+
+
+def build_stats(apps, schema_editor):
+    stats.rebuild(
+        apps.get_model('string_analyzer', 'AnalyzedString'),
+        apps.get_model('string_analyzer', 'StatsCounter'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('string_analyzer', '0003_character_presence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('name', models.CharField(max_length=32)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'name'), name='stats_counter_unique')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
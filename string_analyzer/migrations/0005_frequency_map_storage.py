@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:19
+
+from django.db import migrations, models
+from string_analyzer import frequency
+
+
+def convert_rows(apps, schema_editor):
+    frequency.convert(apps.get_model('string_analyzer', 'AnalyzedString'))
+
+
+def restore_json(apps, schema_editor):
+    frequency.convert(apps.get_model('string_analyzer', 'AnalyzedString'), frequency.JSON)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('string_analyzer', '0004_stats_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyzedstring',
+            name='character_frequency_packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='analyzedstring',
+            name='character_frequency_map',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(convert_rows, restore_json),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The backfill keeps its own copy of search.py's trigram indexing, so it
+# does not change when search.py does. Values past MAX_INDEXED_LENGTH get
+# no postings, see 0008_drop_long_search_postings.
+BACKFILL_CHUNK_SIZE = 5000
+MAX_INDEXED_LENGTH = 4096
+TRIGRAM_INDEX = 'analyzed_value_trgm_idx'
+
+
+def trigrams(text):
+    lowered = text.lower()
+    return {lowered[i:i + 3] for i in range(len(lowered) - 2)}
+
+
+def insert_postings(apps, connection, pairs):
+    SearchTrigram = apps.get_model('string_analyzer', 'SearchTrigram')
+    quote = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {quote(SearchTrigram._meta.db_table)} ({quote('trigram')}, {quote('string_id')}) "
+        f"VALUES (%s, %s) ON CONFLICT DO NOTHING"
+    )
+    rows = [
+        (trigram, string_id)
+        for string_id, value in pairs if len(value) <= MAX_INDEXED_LENGTH
+        for trigram in trigrams(value)
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BACKFILL_CHUNK_SIZE):
+            cursor.executemany(sql, rows[start:start + BACKFILL_CHUNK_SIZE])
+
+
+def build_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    table = apps.get_model('string_analyzer', 'AnalyzedString')._meta.db_table
+    if connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON {connection.ops.quote_name(table)} "
+            f"USING gin (value gin_trgm_ops)"
+        )
+        return
+
+    AnalyzedString = apps.get_model('string_analyzer', 'AnalyzedString')
+    pairs = []
+    for pair in AnalyzedString.objects.using(connection.alias).values_list('id', 'value').iterator(chunk_size=BACKFILL_CHUNK_SIZE):
+        pairs.append(pair)
+        if len(pairs) >= BACKFILL_CHUNK_SIZE:
+            insert_postings(apps, connection, pairs)
+            pairs = []
+    insert_postings(apps, connection, pairs)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('string_analyzer', '0005_frequency_map_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('string', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='string_analyzer.analyzedstring')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('trigram', 'string'), name='search_trigram_unique')],
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:02
+
+from django.db import migrations
+
+# search.MAX_INDEXED_LENGTH when this migration was written
+MAX_INDEXED_LENGTH = 4096
+
+
+def drop_long_postings(apps, schema_editor):
+    # index_strings() no longer indexes these, search scans them instead
+    alias = schema_editor.connection.alias
+    AnalyzedString = apps.get_model('string_analyzer', 'AnalyzedString')
+    SearchTrigram = apps.get_model('string_analyzer', 'SearchTrigram')
+    long_strings = AnalyzedString.objects.using(alias).filter(length__gt=MAX_INDEXED_LENGTH).values('id')
+    SearchTrigram.objects.using(alias).filter(string_id__in=long_strings).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('string_analyzer', '0007_analysis_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_long_postings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('string_analyzer', '0008_drop_long_search_postings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='item_statuses',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -1,5 +1,204 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import connections, models, transaction
 import hashlib
+import uuid
+from . import frequency, search, stats, vectors
+from .characters import CharacterMaskField, character_mask, extra_characters
+
+STATS_FIELDS = ('length', 'word_count', 'is_palindrome') + frequency.FREQUENCY_COLUMNS
+DELETE_CHUNK_SIZE = 1000
+
+
+class AnalyzedStringQuerySet(models.QuerySet):
+    def delete_analyzed(self):
+        """
+        Deletes the matched rows in one transaction and takes them out of the
+        summary counters. Like bulk_delete_analyzed(), only the rows the
+        DELETE ... RETURNING reports are subtracted, so a concurrent delete
+        of the same row cannot count it twice.
+        Returns the number of strings deleted.
+        """
+        sql, params = self.values('pk').query.get_compiler(self.db).as_sql()
+        with transaction.atomic(using=self.db):
+            return self._delete_returning(f"IN ({sql})", params)
+
+    async def adelete_analyzed(self):
+        return await sync_to_async(self.delete_analyzed)()
+
+    def bulk_delete_analyzed(self, chunk_size=DELETE_CHUNK_SIZE):
+        """
+        delete_analyzed() for large sets. Walks the matched ids in chunks and
+        removes every chunk in its own transaction, so no transaction holds
+        the whole set.
+        Returns the number of strings deleted.
+        """
+        ids = self.order_by('pk').values_list('pk', flat=True)
+        deleted = 0
+        last = None
+        while chunk := list((ids if last is None else ids.filter(pk__gt=last))[:chunk_size]):
+            last = chunk[-1]
+            with transaction.atomic(using=self.db):
+                deleted += self._delete_returning(f"IN ({', '.join(['%s'] * len(chunk))})", chunk, ids=chunk)
+        return deleted
+
+    def _delete_returning(self, condition, params, ids=None):
+        """
+        Removes the strings whose id matches condition with raw DELETE
+        statements: no model instance is built, unlike QuerySet.delete()
+        whose collector loads each row to cascade. The summary counters are
+        updated from DELETE ... RETURNING, so only rows this call removed
+        are subtracted. Runs in the caller's transaction.
+        With the ids known up front their character presence and search
+        rows are deleted first. Otherwise the string rows go first, so the
+        write lock is taken before anything is read (SQLite cannot upgrade a
+        read to a write under contention), and the foreign keys, which are
+        deferred, are checked at commit. Returns the number of strings deleted.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        table = self.model._meta.db_table
+        pk_column = quote(self.model._meta.pk.column)
+        columns = [self.model._meta.get_field(name).get_col(table) for name in STATS_FIELDS]
+        converters = [connection.ops.get_db_converters(column) + column.get_db_converters(connection) for column in columns]
+        def delete_related(cursor, ids):
+            for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+                chunk = ids[start:start + DELETE_CHUNK_SIZE]
+                for model in (CharacterPresence, SearchTrigram):
+                    cursor.execute(
+                        f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote('string_id')} IN ({', '.join(['%s'] * len(chunk))})",
+                        chunk,
+                    )
+
+        with connection.cursor() as cursor:
+            if ids is not None:
+                delete_related(cursor, ids)
+            cursor.execute(
+                f"DELETE FROM {quote(table)} WHERE {pk_column} {condition} "
+                f"RETURNING {pk_column}, {', '.join(quote(column.target.column) for column in columns)}",
+                params,
+            )
+            deleted_ids, rows = [], []
+            for pk, *row in cursor.fetchall():
+                values = {}
+                for name, value, column, column_converters in zip(STATS_FIELDS, row, columns, converters):
+                    for converter in column_converters:
+                        value = converter(value, column, connection)
+                    values[name] = value
+                deleted_ids.append(pk)
+                rows.append(frequency.decoded(values))
+            if ids is None:
+                delete_related(cursor, deleted_ids)
+        if rows:
+            stats.record_deleted(rows)
+            vectors.unindex_strings(deleted_ids, using=self.db)
+        return len(rows)
+
+
+class AnalyzedStringManager(models.Manager.from_queryset(AnalyzedStringQuerySet)):
+    def create_analyzed(self, **fields):
+        """
+        Inserts the row with INSERT ... ON CONFLICT (sha256_hash) DO NOTHING RETURNING id,
+        together with its character presence index and summary counters, in one transaction.
+        Returns the new instance, or None when a string with the same hash already exists.
+        """
+        characters = fields['character_frequency_map'].keys()
+        analyzed = self.model(char_mask=character_mask(characters), **frequency.model_fields(fields))
+        with transaction.atomic(using=self.db):
+            if not self._insert_or_skip(analyzed):
+                return None
+            CharacterPresence.objects.bulk_create(
+                CharacterPresence(string=analyzed, character=character)
+                for character in extra_characters(characters)
+            )
+            search.index_strings([(analyzed.pk, analyzed.value)], using=self.db)
+            vectors.index_strings([(analyzed.pk, fields['character_frequency_map'])], using=self.db)
+            stats.record_created([fields])
+        return analyzed
+
+    def _insert_or_skip(self, instance):
+        """
+        Single statement insert that leaves an existing hash alone, so concurrent
+        creates of one value cannot both pass a check and then collide.
+        Sets the primary key and returns True when the row was inserted.
+        """
+        return bool(self._insert_many_or_skip([instance]))
+
+    def _insert_many_or_skip(self, instances, batch_size=None):
+        """
+        _insert_or_skip() for many instances, one multi-row INSERT ... ON CONFLICT
+        (sha256_hash) DO NOTHING RETURNING per batch. Only the rows a statement
+        inserted come back, so a hash that already exists, or that a concurrent
+        writer inserts first, is never taken for one of ours.
+        Sets the primary key of the inserted instances and returns them.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        fields = [field for field in self.model._meta.concrete_fields if not field.primary_key]
+        batch_size = min(batch_size or len(instances), connection.ops.bulk_batch_size(fields, instances)) or 1
+        sql = (
+            f"INSERT INTO {quote(self.model._meta.db_table)} "
+            f"({', '.join(quote(field.column) for field in fields)}) VALUES {{}} "
+            f"ON CONFLICT ({quote('sha256_hash')}) DO NOTHING "
+            f"RETURNING {quote(self.model._meta.pk.column)}, {quote('sha256_hash')}"
+        )
+        placeholders = f"({', '.join(['%s'] * len(fields))})"
+        inserted = []
+        with connection.cursor() as cursor:
+            for start in range(0, len(instances), batch_size):
+                batch = instances[start:start + batch_size]
+                cursor.execute(
+                    sql.format(', '.join([placeholders] * len(batch))),
+                    [field.get_db_prep_save(field.pre_save(instance, True), connection)
+                     for instance in batch for field in fields],
+                )
+                ids = {sha256_hash: pk for pk, sha256_hash in cursor.fetchall()}
+                for instance in batch:
+                    # a hash given twice in one batch is only inserted once
+                    pk = ids.pop(instance.sha256_hash, None)
+                    if pk is not None:
+                        instance.pk = pk
+                        instance._state.adding = False
+                        instance._state.db = self.db
+                        inserted.append(instance)
+        return inserted
+
+    async def acreate_analyzed(self, **fields):
+        # the async ORM has no transactions yet, so the atomic create runs in a thread
+        return await sync_to_async(self.create_analyzed)(**fields)
+
+    def bulk_create_analyzed(self, rows, batch_size=1000):
+        """
+        Inserts already analyzed field dicts, skipping hashes that exist.
+        The character presence rows, search postings, vectors and summary
+        counters are written for the rows the INSERT returned, and only those.
+        Returns the set of hashes that this call inserted.
+        """
+        if not rows:
+            return set()
+
+        mode = frequency.storage_mode()
+        instances = [
+            self.model(char_mask=character_mask(row['character_frequency_map'].keys()), **frequency.model_fields(row, mode))
+            for row in rows
+        ]
+        with transaction.atomic(using=self.db):
+            self._insert_many_or_skip(instances, batch_size)
+            new_rows = [(instance.pk, row) for instance, row in zip(instances, rows) if instance.pk is not None]
+            if not new_rows:
+                return set()
+            CharacterPresence.objects.db_manager(self.db).bulk_create(
+                [
+                    CharacterPresence(string_id=pk, character=character)
+                    for pk, row in new_rows
+                    for character in extra_characters(row['character_frequency_map'].keys())
+                ],
+                batch_size=batch_size,
+            )
+            search.index_strings([(pk, row['value']) for pk, row in new_rows], using=self.db)
+            stats.record_created([row for _, row in new_rows])
+            vectors.index_strings([(pk, row['character_frequency_map']) for pk, row in new_rows], using=self.db)
+        return {row['sha256_hash'] for _, row in new_rows}
+
 
 class AnalyzedString(models.Model):
     value = models.TextField()
@@ -8,10 +207,99 @@ class AnalyzedString(models.Model):
     unique_characters = models.PositiveIntegerField()
     word_count = models.PositiveIntegerField()
     sha256_hash = models.CharField(max_length=64, unique=True)
-    character_frequency_map = models.JSONField()
+    # Stored according to STRING_FREQUENCY_MAP_STORAGE, read it through frequency.frequency_map()
+    character_frequency_map = models.JSONField(null=True, blank=True)
+    character_frequency_packed = models.BinaryField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    char_mask = CharacterMaskField(default=0)
+
+    objects = AnalyzedStringManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['length'], name='analyzed_length_idx'),
+            models.Index(fields=['is_palindrome', 'length'], name='analyzed_palindrome_len_idx'),
+            models.Index(fields=['word_count', 'length'], name='analyzed_words_len_idx'),
+            models.Index(fields=['created_at', 'id'], name='analyzed_created_id_idx'),
+            models.Index(fields=['is_palindrome', 'created_at', 'id'], name='analyzed_palindrome_page_idx'),
+        ]
 
     def __str__(self):
         return self.value
-    
- 
\ No newline at end of file
+
+
+class CharacterPresence(models.Model):
+    string = models.ForeignKey(AnalyzedString, on_delete=models.CASCADE, related_name='extra_characters')
+    character = models.CharField(max_length=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['character', 'string'], name='character_presence_unique'),
+        ]
+
+
+class SearchTrigram(models.Model):
+    """
+    Posting list entry of the substring search index on backends without pg_trgm
+    """
+    trigram = models.CharField(max_length=3)
+    string = models.ForeignKey(AnalyzedString, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['trigram', 'string'], name='search_trigram_unique'),
+        ]
+
+
+class StatsCounter(models.Model):
+    """
+    One counter of the /strings/stats summary, e.g. ('length', '8-15') -> 42
+    """
+    kind = models.CharField(max_length=16)
+    name = models.CharField(max_length=32)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'name'], name='stats_counter_unique'),
+        ]
+
+
+class AnalysisJob(models.Model):
+    """
+    A POST /strings?async=1 or /strings/batch?async=1 waiting for, or run by,
+    a process_jobs worker. The table is the queue, see jobs.claim().
+    """
+    STRING = 'string'
+    BATCH = 'batch'
+    KINDS = [(STRING, 'String'), (BATCH, 'Batch')]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=8, choices=KINDS)
+    status = models.CharField(max_length=8, choices=STATUSES, default=QUEUED)
+    # the request's value or items, dropped once the job is done
+    payload = models.JSONField(null=True)
+    total = models.PositiveIntegerField(default=1)
+    processed = models.PositiveIntegerField(default=0)
+    # a batch's committed item statuses, one letter each (see jobs.STATUS_CODES),
+    # so a retried batch reports the items an earlier run inserted as created
+    item_statuses = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='analysis_job_queue_idx'),
+        ]
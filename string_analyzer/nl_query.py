@@ -0,0 +1,295 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.db.models import Q
+
+from .characters import contains_character_q
+
+TOKEN_RE = re.compile(r"\d+|[^\W\d_]+|\S")
+
+NUMBER_WORDS = {
+    'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+}
+PALINDROME_WORDS = {'palindrome', 'palindromes', 'palindromic'}
+NEGATIONS = {'non', 'not', 'no'}
+# "without z", "excluding z"
+EXCLUDE_WORDS = {'without', 'excluding', 'lacking'}
+# "doesn't", "don't" are tokenized as doesn ' t
+CONTRACTED_NEGATIONS = {'doesn', 'don', 'isn', 'aren'}
+CONTAINS_WORDS = {
+    'contain', 'contains', 'containing', 'with', 'have', 'has', 'having',
+    'include', 'includes', 'including', 'feature', 'features', 'featuring',
+}
+CHARACTER_WORDS = {'letter', 'letters', 'character', 'characters', 'char', 'chars'}
+LENGTH_UNITS = {'character', 'characters', 'char', 'chars', 'letter', 'letters', 'long'}
+WORD_UNITS = {'word', 'words'}
+MULTIPLE_WORDS = {'multiple', 'multi', 'several', 'many'}
+LIST_SEPARATORS = {'and', ',', '&'}
+
+# comparator phrase -> lookup suffix, longest phrases first
+COMPARATORS = [
+    (('at', 'least'), '__gte'),
+    (('at', 'most'), '__lte'),
+    (('no', 'more', 'than'), '__lte'),
+    (('no', 'less', 'than'), '__gte'),
+    (('no', 'longer', 'than'), '__lte'),
+    (('no', 'shorter', 'than'), '__gte'),
+    (('not', 'more', 'than'), '__lte'),
+    (('not', 'less', 'than'), '__gte'),
+    (('not', 'longer', 'than'), '__lte'),
+    (('not', 'shorter', 'than'), '__gte'),
+    (('more', 'than'), '__gt'),
+    (('greater', 'than'), '__gt'),
+    (('longer', 'than'), '__gt'),
+    (('fewer', 'than'), '__lt'),
+    (('less', 'than'), '__lt'),
+    (('shorter', 'than'), '__lt'),
+    (('over',), '__gt'),
+    (('under',), '__lt'),
+    (('exactly',), ''),
+]
+COMPARATORS_BY_FIRST_WORD = {}
+for _phrase, _suffix in COMPARATORS:
+    COMPARATORS_BY_FIRST_WORD.setdefault(_phrase[0], []).append((_phrase, _suffix))
+OR_BOUNDS = {'more': '__gte', 'longer': '__gte', 'less': '__lte', 'fewer': '__lte', 'shorter': '__lte'}
+IMPLICIT_LENGTH = {
+    ('longer', 'than'), ('shorter', 'than'), ('no', 'longer', 'than'), ('no', 'shorter', 'than'),
+    ('not', 'longer', 'than'), ('not', 'shorter', 'than'),
+}
+
+
+class QueryParseError(ValueError):
+    pass
+
+
+class ParsedQuery(NamedTuple):
+    normalized: str
+    filters: dict
+    q: Q
+
+
+def normalize(query):
+    return ' '.join(query.lower().split())
+
+
+def parse(query):
+    """
+    Parses a natural language query into ORM filters.
+
+    Returns a ParsedQuery with the filters as a dict (for display and cache
+    keys) and the equivalent Q object. Results are cached on the normalized
+    query, so repeating a query costs a dict lookup. The returned object is
+    shared between callers and must not be mutated.
+    """
+    return _parse_normalized(normalize(query))
+
+
+@lru_cache(maxsize=4096)
+def _parse_normalized(normalized):
+    filters = _Parser(TOKEN_RE.findall(normalized)).parse()
+    if not filters:
+        raise QueryParseError("Unable to parse natural language query")
+    return ParsedQuery(normalized, filters, build_q(filters))
+
+
+def build_q(filters):
+    q = Q()
+    for key, value in filters.items():
+        if key == 'value__icontains':
+            for character in value if isinstance(value, list) else [value]:
+                q &= contains_character_q(character)
+        elif key == 'value__not_icontains':
+            for character in value if isinstance(value, list) else [value]:
+                q &= ~contains_character_q(character)
+        else:
+            q &= Q(**{key: value})
+    return q
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.filters = {}
+        self.characters = []
+        self.excluded = []
+
+    def parse(self):
+        rules = (self.palindrome, self.word_phrase, self.comparison, self.between, self.contains)
+        while self.pos < len(self.tokens):
+            if not any(rule() for rule in rules):
+                if self.peek() in NEGATIONS | EXCLUDE_WORDS | CONTRACTED_NEGATIONS:
+                    # a negation no rule took would be dropped, turning the query into its opposite
+                    raise QueryParseError(f"Unsupported negation at {self.peek()!r}")
+                self.pos += 1
+
+        if set(self.characters) & set(self.excluded):
+            raise QueryParseError("A character is both required and excluded")
+        for key, characters in (('value__icontains', self.characters), ('value__not_icontains', self.excluded)):
+            if characters:
+                self.filters[key] = characters[0] if len(characters) == 1 else characters
+        return self.filters
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def number(self, offset=0):
+        token = self.peek(offset)
+        if token is None:
+            return None
+        if token.isdigit():
+            return int(token)
+        return NUMBER_WORDS.get(token)
+
+    def matches(self, phrase, offset=0):
+        return all(self.peek(offset + i) == word for i, word in enumerate(phrase))
+
+    def bound(self, key, value):
+        """
+        Adds a filter, keeping the tighter bound when one is given twice
+        """
+        current = self.filters.get(key)
+        if current is not None and key.endswith(('__gt', '__gte')):
+            value = max(current, value)
+        elif current is not None and key.endswith(('__lt', '__lte')):
+            value = min(current, value)
+        self.filters[key] = value
+
+    def unit(self, offset):
+        token = self.peek(offset)
+        if token in WORD_UNITS:
+            return 'word_count'
+        if token in LENGTH_UNITS:
+            return 'length'
+        return None
+
+    def palindrome(self):
+        offset = 0
+        negated = self.peek() in NEGATIONS
+        if negated:
+            offset = 2 if self.peek(1) == '-' else 1
+        if self.peek(offset) not in PALINDROME_WORDS:
+            return False
+        self.filters['is_palindrome'] = not negated
+        self.pos += offset + 1
+        return True
+
+    def word_phrase(self):
+        # "single word", "multiple words"
+        if self.peek() == 'single' and self.peek(1) in WORD_UNITS:
+            self.filters['word_count'] = 1
+        elif self.peek() in MULTIPLE_WORDS and self.peek(1) in WORD_UNITS:
+            self.bound('word_count__gt', 1)
+        else:
+            return False
+        self.pos += 2
+        return True
+
+    def comparison(self):
+        # "longer than 5", "at least 3 words", "exactly 2 words", "10 characters"
+        for phrase, suffix in COMPARATORS_BY_FIRST_WORD.get(self.peek(), ()):
+            if self.matches(phrase):
+                break
+        else:
+            phrase, suffix = (), ''
+
+        number = self.number(len(phrase))
+        if number is None:
+            return False
+        field = self.unit(len(phrase) + 1)
+        consumed = len(phrase) + (2 if field else 1)
+        if field is None:
+            if phrase not in IMPLICIT_LENGTH:
+                return False
+            field = 'length'
+        elif not suffix and self.peek(consumed) == 'or' and self.peek(consumed + 1) in OR_BOUNDS:
+            # "10 characters or more"
+            suffix = OR_BOUNDS[self.peek(consumed + 1)]
+            consumed += 2
+
+        self.bound(field + suffix, number)
+        self.pos += consumed
+        return True
+
+    def between(self):
+        # "between 5 and 10 characters"
+        if self.peek() != 'between' or self.peek(2) != 'and':
+            return False
+        low, high = self.number(1), self.number(3)
+        field = self.unit(4)
+        if low is None or high is None or field is None:
+            return False
+        if low > high:
+            low, high = high, low
+        self.bound(field + '__gte', low)
+        self.bound(field + '__lte', high)
+        self.pos += 5
+        return True
+
+    def negated_contains(self):
+        """
+        (negated, offset of what follows) for a contains phrase at the current token, or None.
+        "not containing z", "doesn't contain z", "with no z", "without z".
+        """
+        if self.peek() in NEGATIONS and self.peek(1) in CONTAINS_WORDS:
+            return True, 2
+        if self.peek() in CONTRACTED_NEGATIONS and self.matches(("'", 't'), 1) and self.peek(3) in CONTAINS_WORDS:
+            return True, 4
+        if self.peek() in EXCLUDE_WORDS:
+            return True, 1
+        if self.peek() in CONTAINS_WORDS:
+            return (True, 2) if self.peek(1) in ('no', 'not') else (False, 1)
+        if self.peek() in CHARACTER_WORDS and self.peek(1) is not None and len(self.peek(1)) == 1:
+            return False, 0
+        return None
+
+    def contains(self):
+        # "containing the letter z", "with a and b", "contain the first vowel", "without z"
+        phrase = self.negated_contains()
+        if phrase is None:
+            return False
+        negated, offset = phrase
+
+        while self.peek(offset) in ('the', 'first', 'a', 'an') and self.peek(offset + 1) in ('first', 'vowel'):
+            offset += 1
+        if self.peek(offset) == 'vowel':
+            vowel = self.peek(offset + 1)
+            if vowel is not None and len(vowel) == 1 and vowel in 'aeiou':
+                self.add_character(vowel, negated)
+                offset += 1
+            else:
+                self.add_character('a', negated)
+            self.pos += offset + 1
+            return True
+
+        if self.peek(offset) == 'the':
+            offset += 1
+        if self.peek(offset) in CHARACTER_WORDS:
+            offset += 1
+
+        found = []
+        while True:
+            token = self.peek(offset)
+            if token is None or len(token) != 1 or token in LIST_SEPARATORS or (token.isdigit() and self.unit(offset + 1)):
+                break
+            found.append(token)
+            offset += 1
+            if self.peek(offset) in LIST_SEPARATORS and self.peek(offset + 1) is not None and len(self.peek(offset + 1)) == 1:
+                offset += 1
+            else:
+                break
+
+        if not found:
+            return False
+        for character in found:
+            self.add_character(character, negated)
+        self.pos += offset
+        return True
+
+    def add_character(self, character, negated=False):
+        characters = self.excluded if negated else self.characters
+        if character not in characters:
+            characters.append(character)
@@ -0,0 +1,76 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    """
+    Opaque cursor pointing just after the row with the given (created_at, id)
+    """
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def parse_limit(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if not limit.isdigit() or int(limit) == 0:
+        raise ValueError("Invalid limit")
+    return min(int(limit), MAX_PAGE_SIZE)
+
+
+def instance_position(row):
+    return row.created_at, row.pk
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, position=instance_position):
+    """
+    Returns (rows, next_cursor) for one page of queryset ordered by (created_at, id).
+
+    Rows after the cursor are selected with a seek predicate instead of OFFSET,
+    so every page costs the same no matter how deep into the table it is.
+    position returns (created_at, id) of a row, which matters for values_list querysets.
+    """
+    rows = list(_after_cursor(queryset, cursor)[:limit + 1])
+    return _split_page(rows, limit, position)
+
+
+async def akeyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, position=instance_position):
+    rows = [row async for row in _after_cursor(queryset, cursor)[:limit + 1]]
+    return _split_page(rows, limit, position)
+
+
+def _after_cursor(queryset, cursor):
+    queryset = queryset.order_by("created_at", "id")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        )
+    return queryset
+
+
+def _split_page(rows, limit, position):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*position(rows[-1]))
+    return rows, next_cursor
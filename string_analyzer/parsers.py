@@ -0,0 +1,34 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class InvalidLine:
+    def __init__(self, error):
+        self.error = error
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited JSON lazily, one item per line.
+    Lines that are not valid JSON come through as InvalidLine so the
+    caller can report them per item instead of failing the whole body.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self.items(codecs.getreader(encoding)(stream))
+
+    def items(self, reader):
+        for line in reader:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield InvalidLine(str(e))
@@ -0,0 +1,153 @@
+import math
+
+from django.db import connection, connections
+from django.db.models import BooleanField, F, FloatField, Func, Q, Value
+
+# Matches below this trigram similarity are dropped unless they contain the
+# query, the same cut-off as pg_trgm's default similarity_threshold
+SIMILARITY_THRESHOLD = 0.3
+INDEX_BATCH_SIZE = 5000
+# Longer values get no posting rows: a 4 MB value has millions of distinct
+# trigrams to insert, and its similarity to any query is far below the
+# threshold anyway. _posting_search finds them by substring scan instead.
+MAX_INDEXED_LENGTH = 4096
+
+
+def uses_posting_table(using='default'):
+    """
+    PostgreSQL searches the pg_trgm GIN index on value,
+    every other backend the app-maintained SearchTrigram table
+    """
+    return connections[using].vendor != 'postgresql'
+
+
+def trigrams(text):
+    """
+    Distinct lower-cased 3-character substrings, spaces and punctuation included
+    """
+    lowered = text.lower()
+    return {lowered[i:i + 3] for i in range(len(lowered) - 2)}
+
+
+def index_strings(pairs, using='default'):
+    """
+    Adds the posting rows for (string_id, value) pairs, skipping values longer than MAX_INDEXED_LENGTH.
+    A raw executemany, building a model instance per trigram costs more than the insert.
+    """
+    if not uses_posting_table(using):
+        return
+    from .models import SearchTrigram
+    quote = connections[using].ops.quote_name
+    sql = (
+        f"INSERT INTO {quote(SearchTrigram._meta.db_table)} ({quote('trigram')}, {quote('string_id')}) "
+        f"VALUES (%s, %s) ON CONFLICT DO NOTHING"
+    )
+    rows = [
+        (trigram, string_id)
+        for string_id, value in pairs if len(value) <= MAX_INDEXED_LENGTH
+        for trigram in trigrams(value)
+    ]
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(rows), INDEX_BATCH_SIZE):
+            cursor.executemany(sql, rows[start:start + INDEX_BATCH_SIZE])
+
+
+def search(query, limit, offset=0):
+    """
+    Ranked (string_id, score) pairs for one page of matches: strings that
+    contain query come first, then the rest by trigram similarity.
+    Queries shorter than a trigram fall back to a plain substring scan.
+    """
+    if len(query) < 3:
+        return _substring_scan(query, limit, offset)
+    if uses_posting_table():
+        return _posting_search(query, limit, offset)
+    return _trigram_index_search(query, limit, offset)
+
+
+def _substring_scan(query, limit, offset):
+    from .models import AnalyzedString
+    ids = AnalyzedString.objects.filter(value__icontains=query).order_by('id').values_list('id', flat=True)
+    return [(pk, 1.0) for pk in ids[offset:offset + limit]]
+
+
+class TrigramSimilarity(Func):
+    function = 'similarity'
+    output_field = FloatField()
+
+
+class TrigramMatch(Func):
+    # value % query, true above pg_trgm.similarity_threshold
+    arg_joiner = ' %% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+class ILike(Func):
+    # Django's icontains compiles to UPPER(value) LIKE UPPER(...), which the GIN index cannot serve
+    arg_joiner = ' ILIKE '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def like_pattern(query):
+    return '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _trigram_index_search(query, limit, offset):
+    from .models import AnalyzedString
+    contains = ILike(F('value'), Value(like_pattern(query)))
+    matches = (
+        AnalyzedString.objects
+        .filter(Q(contains) | Q(TrigramMatch(F('value'), Value(query))))
+        .annotate(contains=contains, score=TrigramSimilarity(F('value'), Value(query)))
+        .order_by('-contains', '-score', 'id')
+        .values_list('id', 'contains', 'score')
+    )
+    return [(pk, 1.0 if contains else score) for pk, contains, score in matches[offset:offset + limit]]
+
+
+def _posting_search(query, limit, offset):
+    """
+    Counts the query's trigrams per string in the posting table, then scores
+    shared / (query trigrams + string trigrams - shared) like pg_trgm's
+    similarity. length - 2 stands in for the string's distinct trigram count,
+    which keeps the score a lower bound without storing the count.
+    Strings longer than MAX_INDEXED_LENGTH have no postings and are only
+    matched when they contain the query, through the length index.
+    """
+    from .models import AnalyzedString, SearchTrigram
+    grams = sorted(trigrams(query))
+    quote = connection.ops.quote_name
+    strings = quote(AnalyzedString._meta.db_table)
+    postings = quote(SearchTrigram._meta.db_table)
+    # a string needs this many shared trigrams to reach the threshold even at its shortest
+    min_shared = max(1, math.ceil(SIMILARITY_THRESHOLD * len(grams)))
+
+    sql = f"""
+        SELECT id, CASE WHEN contains THEN 1.0 ELSE score END FROM (
+            SELECT s.{quote('id')} AS id,
+                   s.{quote('value')} LIKE %s ESCAPE '\\' AS contains,
+                   m.shared * 1.0 / ({len(grams)} + MAX(s.{quote('length')} - 2, 1) - m.shared) AS score
+            FROM (
+                SELECT {quote('string_id')} AS string_id, COUNT(*) AS shared
+                FROM {postings}
+                WHERE {quote('trigram')} IN ({', '.join(['%s'] * len(grams))})
+                GROUP BY {quote('string_id')}
+                HAVING COUNT(*) >= %s
+            ) m
+            JOIN {strings} s ON s.{quote('id')} = m.string_id
+            WHERE s.{quote('length')} <= {MAX_INDEXED_LENGTH}
+            UNION ALL
+            SELECT {quote('id')}, 1, 1.0
+            FROM {strings}
+            WHERE {quote('length')} > {MAX_INDEXED_LENGTH} AND {quote('value')} LIKE %s ESCAPE '\\'
+        ) ranked
+        WHERE contains OR score >= %s
+        ORDER BY contains DESC, score DESC, id
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        pattern = like_pattern(query)
+        cursor.execute(sql, [pattern, *grams, min_shared, pattern, SIMILARITY_THRESHOLD, limit, offset])
+        return [(pk, float(score)) for pk, score in cursor.fetchall()]
@@ -1,7 +1,123 @@
-from rest_framework import serializers
-from .models import AnalyzedString
+import json
 
-class AnalyzedStringSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = AnalyzedString
-        fields = '__all__'
\ No newline at end of file
+from rest_framework.utils.encoders import JSONEncoder
+from . import frequency
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Columns read for the API response shape, in the order string_payload unpacks them.
+# Reading tuples with values_list skips model instantiation for every row.
+STRING_COLUMNS = (
+    'id', 'created_at', 'sha256_hash', 'value', 'length', 'is_palindrome', 'unique_characters',
+    'word_count', 'character_frequency_map', 'character_frequency_packed',
+)
+
+# Response fields selectable with ?fields=, and the columns each one needs
+FIELD_COLUMNS = {
+    'id': ('sha256_hash',),
+    'value': ('value',),
+    'length': ('length',),
+    'is_palindrome': ('is_palindrome',),
+    'unique_characters': ('unique_characters',),
+    'word_count': ('word_count',),
+    'sha256_hash': ('sha256_hash',),
+    'character_frequency_map': frequency.FREQUENCY_COLUMNS,
+    'created_at': ('created_at',),
+}
+TOP_LEVEL_FIELDS = ('id', 'value', 'created_at')
+
+
+def parse_fields(fields):
+    """
+    The response fields named in a comma separated ?fields= value, None when it is absent.
+    Raises ValueError on unknown names.
+    """
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    if not names or any(name not in FIELD_COLUMNS for name in names):
+        raise ValueError("Invalid fields")
+    return tuple(name for name in FIELD_COLUMNS if name in names)
+
+
+def string_rows(queryset, fields=None):
+    return queryset.values_list(*string_columns(fields))
+
+
+def string_columns(fields=None):
+    if fields is None:
+        return STRING_COLUMNS
+    # id and created_at always come first, keyset pagination reads them from every row
+    needed = {'id', 'created_at'}.union(*(FIELD_COLUMNS[name] for name in fields))
+    return tuple(column for column in STRING_COLUMNS if column in needed)
+
+
+def row_position(row):
+    """
+    (created_at, id) of a string_rows() tuple, for keyset pagination
+    """
+    return row[1], row[0]
+
+
+def string_payload(row):
+    (_, created_at, sha256_hash, value, length, is_palindrome, unique_characters, word_count,
+     character_frequency_map, character_frequency_packed) = row
+    return {
+        "id": sha256_hash,
+        "value": value,
+        "properties": {
+            "length": length,
+            "is_palindrome": is_palindrome,
+            "unique_characters": unique_characters,
+            "word_count": word_count,
+            "sha256_hash": sha256_hash,
+            "character_frequency_map": frequency.frequency_map(character_frequency_map, character_frequency_packed, value)
+        },
+        "created_at": created_at
+    }
+
+
+def payload_builder(fields=None):
+    """
+    Returns the function turning string_rows(queryset, fields) tuples into
+    response dicts that hold only the requested fields
+    """
+    if fields is None:
+        return string_payload
+
+    index = {column: position for position, column in enumerate(string_columns(fields))}
+    top_level = [name for name in TOP_LEVEL_FIELDS if name in fields]
+    properties = [name for name in fields if name not in TOP_LEVEL_FIELDS]
+    columns = {name: index['sha256_hash' if name == 'id' else name] for name in fields if name != 'character_frequency_map'}
+
+    def build(row):
+        payload = {name: row[columns[name]] for name in top_level}
+        if properties:
+            payload["properties"] = {
+                name: row[columns[name]] if name in columns else frequency.frequency_map(
+                    *(row[index[column]] for column in frequency.FREQUENCY_COLUMNS)
+                )
+                for name in properties
+            }
+        return payload
+    return build
+
+
+def dumps(data):
+    """
+    Encodes data to JSON bytes the way DRF's JSONRenderer does,
+    with orjson when it is installed
+    """
+    if orjson is not None:
+        content = orjson.dumps(data, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    else:
+        content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    # like JSONRenderer, escape the two line terminators JavaScript does not allow in strings.
+    # Both start with the byte 0xe2, a single byte is found with memchr, a sequence is searched for much slower
+    if b'\xe2' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
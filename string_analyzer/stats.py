@@ -0,0 +1,134 @@
+from collections import Counter
+
+from django.db import connection, transaction
+
+from . import frequency
+
+UPSERT_CHUNK_SIZE = 500
+REBUILD_CHUNK_SIZE = 2000
+
+TOTAL = 'total'
+PALINDROME = 'palindrome'
+LENGTH = 'length'
+WORD_COUNT = 'word_count'
+CHARACTER = 'character'
+
+
+def bucket(number):
+    """
+    Power of two histogram bucket label: 0, 1, 2-3, 4-7, 8-15, ...
+    """
+    if number < 2:
+        return str(number)
+    low = 1 << (number.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+def bucket_start(label):
+    return int(label.split('-')[0])
+
+
+def deltas(rows, sign=1):
+    """
+    Counter changes for rows with length, word_count, is_palindrome and
+    character_frequency_map keys, sign=-1 for rows being removed
+    """
+    changes = Counter()
+    for row in rows:
+        changes[(TOTAL, '')] += sign
+        if row['is_palindrome']:
+            changes[(PALINDROME, '')] += sign
+        changes[(LENGTH, bucket(row['length']))] += sign
+        changes[(WORD_COUNT, bucket(row['word_count']))] += sign
+        for character, count in row['character_frequency_map'].items():
+            changes[(CHARACTER, character)] += sign * count
+    return changes
+
+
+def apply(changes, counter_model=None):
+    """
+    Adds the changes to the counters with one INSERT ... ON CONFLICT DO UPDATE
+    per chunk, so concurrent writers never lose an increment.
+    """
+    counter_model = counter_model or _counter_model()
+    items = [(kind, name, count) for (kind, name), count in changes.items() if count]
+    if not items:
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(counter_model._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_CHUNK_SIZE):
+            chunk = items[start:start + UPSERT_CHUNK_SIZE]
+            placeholders = ", ".join(["(%s, %s, %s)"] * len(chunk))
+            cursor.execute(
+                f"INSERT INTO {table} ({quote('kind')}, {quote('name')}, {quote('count')}) "
+                f"VALUES {placeholders} "
+                f"ON CONFLICT ({quote('kind')}, {quote('name')}) "
+                f"DO UPDATE SET {quote('count')} = {table}.{quote('count')} + excluded.{quote('count')}",
+                [value for item in chunk for value in item],
+            )
+
+
+def record_created(rows):
+    apply(deltas(rows))
+
+
+def record_deleted(rows):
+    apply(deltas(rows, sign=-1))
+
+
+def snapshot():
+    """
+    Current statistics, read from the summary table only
+    """
+    result = {
+        "total": 0,
+        "palindromes": 0,
+        "length_histogram": {},
+        "word_count_histogram": {},
+        "character_frequencies": {},
+    }
+    histograms = {LENGTH: "length_histogram", WORD_COUNT: "word_count_histogram"}
+
+    for kind, name, count in _counter_model().objects.filter(count__gt=0).values_list('kind', 'name', 'count'):
+        if kind == TOTAL:
+            result["total"] = count
+        elif kind == PALINDROME:
+            result["palindromes"] = count
+        elif kind in histograms:
+            result[histograms[kind]][name] = count
+        elif kind == CHARACTER:
+            result["character_frequencies"][name] = count
+
+    for key in histograms.values():
+        result[key] = dict(sorted(result[key].items(), key=lambda item: bucket_start(item[0])))
+    result["character_frequencies"] = dict(
+        sorted(result["character_frequencies"].items(), key=lambda item: -item[1])
+    )
+    return result
+
+
+def rebuild(analyzed_model=None, counter_model=None):
+    """
+    Recomputes every counter from the strings table
+    """
+    from .models import AnalyzedString, STATS_FIELDS
+    analyzed_model = analyzed_model or AnalyzedString
+    counter_model = counter_model or _counter_model()
+
+    changes = Counter()
+    existing = {field.name for field in analyzed_model._meta.concrete_fields}
+    rows = analyzed_model.objects.values(*(name for name in STATS_FIELDS if name in existing))
+    for row in rows.iterator(chunk_size=REBUILD_CHUNK_SIZE):
+        changes.update(deltas([frequency.decoded(row)]))
+
+    with transaction.atomic():
+        counter_model.objects.all().delete()
+        apply(changes, counter_model)
+    return changes[(TOTAL, '')]
+
+
+def _counter_model():
+    from .models import StatsCounter
+    return StatsCounter
@@ -1,3 +1,905 @@
-from django.test import TestCase
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from time import perf_counter
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import close_old_connections, connections
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from .analysis import StreamingAnalyzer, analyze
+from .characters import contains_character_q
+from .management.commands.process_jobs import worker_process
+from .models import AnalysisJob, AnalyzedString, CharacterPresence, SearchTrigram, StatsCounter
+from .pagination import MAX_PAGE_SIZE
+from .serializer import dumps, orjson, string_payload, string_rows
+from . import cache as response_cache
+from . import search as string_search
+from . import frequency, ingest, jobs, nl_query, stats, vectors
+
+
+class CommittingTestCase(TransactionTestCase):
+    """
+    TransactionTestCase commits for real, so the on_commit updates of the
+    similarity index run: each class gets an index of its own in a temporary
+    directory, emptied before every test, rather than the project's
+    """
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        cls.enterClassContext(override_settings(STRING_VECTOR_INDEX_DIR=directory.name))
+        super().setUpClass()
+
+    def setUp(self):
+        vectors.index().build([])
+
+    def indexed(self):
+        return {pk for pk, _ in vectors.index().nearest({'a': 1}, 10000, probes=vectors.MAX_LISTS)}
+
+
+class ConcurrentCreateTests(CommittingTestCase):
+    """
+    Many clients POSTing the same value at once get exactly one 201,
+    every other request is a 409 and nothing is counted twice
+    """
+    WORKERS = 16
+    REQUESTS = 64
+
+    def post_value(self, value):
+        try:
+            return Client().post('/strings', {'value': value}, content_type='application/json').status_code
+        finally:
+            close_old_connections()
+
+    def test_parallel_posts_of_one_value(self):
+        value = "Was it a car or a cat I saw? ÿ"
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            statuses = list(pool.map(self.post_value, [value] * self.REQUESTS))
+
+        self.assertEqual(statuses.count(201), 1)
+        self.assertEqual(statuses.count(409), self.REQUESTS - 1)
+        self.assertEqual(AnalyzedString.objects.filter(value=value).count(), 1)
+        self.assertEqual(CharacterPresence.objects.filter(character='ÿ').count(), 1)
+        self.assertEqual(stats.snapshot()['total'], 1)
+        self.assertEqual(self.indexed(), set(AnalyzedString.objects.values_list('pk', flat=True)))
+
+
+class ConcurrentDeleteTests(CommittingTestCase):
+    """
+    Many clients deleting the same string at once: one of them deletes it
+    and the summary counters drop by exactly one string
+    """
+    WORKERS = 16
+
+    def delete_value(self, path):
+        try:
+            return Client().delete(path).status_code
+        finally:
+            close_old_connections()
+
+    def test_parallel_deletes_of_one_string(self):
+        for value in ('racecar', 'keep me'):
+            self.client.post('/strings', {'value': value}, content_type='application/json')
+        paths = ['/strings/racecar', '/strings/id/' + analyze('racecar')['sha256_hash']] * (self.WORKERS // 2)
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            statuses = list(pool.map(self.delete_value, paths))
+
+        self.assertEqual(statuses.count(204), 1)
+        self.assertEqual(statuses.count(404), self.WORKERS - 1)
+        counted = stats.snapshot()
+        self.assertEqual(counted['total'], 1)
+        stats.rebuild()
+        self.assertEqual(counted, stats.snapshot())
+        self.assertEqual(self.indexed(), set(AnalyzedString.objects.values_list('pk', flat=True)))
+
+
+class ConcurrentBatchTests(CommittingTestCase):
+    """
+    Batches overlapping each other, ingested at once: every string is
+    created by exactly one of them and counted once
+    """
+    WORKERS = 4
+    VALUES = [f"shared value {number} ÿ" for number in range(50)]
+
+    def ingest(self, offset):
+        try:
+            values = self.VALUES[offset:] + self.VALUES[:offset]
+            return AnalyzedString.objects.bulk_create_analyzed([{"value": value, **analyze(value)} for value in values])
+        finally:
+            close_old_connections()
+
+    def test_overlapping_batches(self):
+        AnalyzedString.objects.create_analyzed(value=self.VALUES[0], **analyze(self.VALUES[0]))
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            created = list(pool.map(self.ingest, range(0, len(self.VALUES), len(self.VALUES) // self.WORKERS)))
+
+        self.assertEqual(sum(len(hashes) for hashes in created), len(self.VALUES) - 1)
+        self.assertEqual(len(set().union(*created)), len(self.VALUES) - 1)
+        self.assertEqual(AnalyzedString.objects.count(), len(self.VALUES))
+        self.assertEqual(CharacterPresence.objects.filter(character='ÿ').count(), len(self.VALUES))
+        self.assertEqual(stats.snapshot()['total'], len(self.VALUES))
+        self.assertEqual(self.indexed(), set(AnalyzedString.objects.values_list('pk', flat=True)))
+
+    def test_repeated_hash_in_one_batch(self):
+        rows = [{"value": value, **analyze(value)} for value in ('abba', 'abba', 'level')]
+        self.assertEqual(AnalyzedString.objects.bulk_create_analyzed(rows), {rows[0]['sha256_hash'], rows[2]['sha256_hash']})
+        self.assertEqual(stats.snapshot()['total'], 2)
+
+
+class PaginationTests(TestCase):
+    VALUES = [f"string {number}" for number in range(7)]
+
+    def setUp(self):
+        for value in self.VALUES:
+            self.client.post('/strings', {'value': value}, content_type='application/json')
+        # several rows share a created_at, the id breaks the tie
+        first, *rest = AnalyzedString.objects.order_by('id')
+        AnalyzedString.objects.filter(pk__in=[row.pk for row in rest[:4]]).update(created_at=first.created_at)
+
+    def test_cursor_walks_every_row_once(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/strings', params)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual(body['count'], len(self.VALUES) if cursor is None else None)
+            seen += [item['value'] for item in body['data']]
+            pages += 1
+            cursor = body['next']
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 4)
+        self.assertCountEqual(seen, self.VALUES)
+        expected = AnalyzedString.objects.order_by('created_at', 'id').values_list('value', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_limit_bounds(self):
+        for limit in ('0', '-1', 'ten'):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.client.get('/strings', {'limit': limit}).status_code, 400)
+        response = self.client.get('/strings', {'limit': MAX_PAGE_SIZE * 10})
+        self.assertEqual(len(response.json()['data']), len(self.VALUES))
+        self.assertEqual(len(self.client.get('/strings').json()['data']), len(self.VALUES))
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('not a cursor', 'bm90fGE', '!!!'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get('/strings', {'cursor': cursor}).status_code, 400)
+
+    def test_stream_is_ndjson(self):
+        response = self.client.get('/strings', {'stream': 'true', 'min_length': 8, 'fields': 'value'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(json.loads(response['X-Filters-Applied']), {'min_length': 8})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'value': value} for value in self.VALUES])
+
+
+class ContainsCharacterTests(TestCase):
+    VALUES = ["Café", "ÉCOLE", "ÿes", "ΣΟΦΙΑ", "σοφία", "жук", "smile 😀", "A7", "İstanbul", "straße"]
+    CHARACTERS = ["é", "É", "Ÿ", "ÿ", "σ", "Σ", "Ж", "😀", "a", "7", "İ", "ß", "x"]
+
+    def setUp(self):
+        for value in self.VALUES:
+            self.client.post('/strings', {'value': value}, content_type='application/json')
+
+    def matching(self, character):
+        return set(AnalyzedString.objects.filter(contains_character_q(character)).values_list('value', flat=True))
+
+    def expected(self, character):
+        return {value for value in self.VALUES if character.lower() in value.lower()}
+
+    def test_lookup_matches_a_case_insensitive_contains(self):
+        for character in self.CHARACTERS:
+            with self.subTest(character=character):
+                self.assertEqual(self.matching(character), self.expected(character))
+        self.assertEqual(self.matching('É'), {"Café", "ÉCOLE"})
+        self.assertEqual(self.matching('σ'), {"ΣΟΦΙΑ", "σοφία"})
+
+    def test_list_filter_and_bad_character(self):
+        response = self.client.get('/strings', {'contains_character': 'Ÿ', 'fields': 'value'})
+        self.assertEqual(response.json()['data'], [{'value': 'ÿes'}])
+        self.assertEqual(self.client.get('/strings', {'contains_character': 'ab'}).status_code, 400)
+
+    def test_backfill_rebuilds_masks_and_presence_rows(self):
+        expected = {character: self.matching(character) for character in self.CHARACTERS}
+        CharacterPresence.objects.all().delete()
+        AnalyzedString.objects.update(char_mask=0)
+        self.assertEqual(self.matching('a'), set())
+
+        migration = importlib.import_module('string_analyzer.migrations.0003_character_presence')
+        migration.backfill_character_presence(django_apps, None)
+        self.assertEqual({character: self.matching(character) for character in self.CHARACTERS}, expected)
+
+
+class CreateTests(TestCase):
+    def test_duplicate_post_is_a_conflict(self):
+        first = self.client.post('/strings', {'value': 'abba'}, content_type='application/json')
+        second = self.client.post('/strings', {'value': 'abba'}, content_type='application/json')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(AnalyzedString.objects.count(), 1)
+
+    def test_create_analyzed_returns_none_on_conflict(self):
+        created = AnalyzedString.objects.create_analyzed(value='level', **analyze('level'))
+        self.assertIsNotNone(created.pk)
+        self.assertIsNone(AnalyzedString.objects.create_analyzed(value='level', **analyze('level')))
+
+    def test_text_plain_body_is_the_value(self):
+        response = self.client.post('/strings', 'Never odd or even', content_type='text/plain; charset=utf-8')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['properties'], analyze('Never odd or even'))
+        self.assertTrue(AnalyzedString.objects.filter(value='Never odd or even').exists())
+
+        invalid = self.client.post('/strings', b'\xff\xfe', content_type='text/plain')
+        self.assertEqual(invalid.status_code, 400)
+
+
+class ResponseCacheTests(TestCase):
+    def test_evicted_generation_does_not_revive_old_entries(self):
+        self.client.post('/strings', {'value': 'abba'}, content_type='application/json')
+        self.assertEqual(self.client.get('/strings/abba').status_code, 200)
+        stale_key = response_cache.string_key(analyze('abba')['sha256_hash'])
+
+        self.client.delete('/strings/abba')
+        self.client.post('/strings', {'value': 'abba '}, content_type='application/json')
+        for _ in range(3):
+            response_cache.invalidate()
+        # the generation key is evicted like any other entry
+        response_cache.get_cache().delete(response_cache.GENERATION_KEY)
+        self.assertNotEqual(response_cache.string_key(analyze('abba')['sha256_hash']), stale_key)
+        self.assertEqual(self.client.get('/strings/abba').status_code, 404)
+
+        response_cache.get_cache().delete(response_cache.GENERATION_KEY)
+        response_cache.invalidate()
+        self.assertGreater(response_cache.generation(), int(stale_key.split(':')[1]))
+
+
+class NaturalLanguageQueryTests(SimpleTestCase):
+    PARSED = {
+        "all single word palindromic strings": {'word_count': 1, 'is_palindrome': True},
+        "strings between 5 and 10 characters": {'length__gte': 5, 'length__lte': 10},
+        "strings between ten and five characters": {'length__gte': 5, 'length__lte': 10},
+        "strings containing a and b": {'value__icontains': ['a', 'b']},
+        "strings containing the letter z": {'value__icontains': 'z'},
+        "strings that contain the first vowel": {'value__icontains': 'a'},
+        "at least 3 words": {'word_count__gte': 3},
+        "strings longer than 10 characters": {'length__gt': 10},
+        "strings of 10 characters or more": {'length__gte': 10},
+        "non-palindromic strings with multiple words": {'is_palindrome': False, 'word_count__gt': 1},
+        "strings no longer than 4": {'length__lte': 4},
+        "strings not containing the letter a": {'value__not_icontains': 'a'},
+        "strings that don't contain the letter x": {'value__not_icontains': 'x'},
+        "strings without z and q": {'value__not_icontains': ['z', 'q']},
+        "palindromes with the letter b but with no letter c": {'is_palindrome': True, 'value__icontains': 'b', 'value__not_icontains': 'c'},
+    }
+    UNPARSEABLE = [
+        "hello there",
+        "",
+        "strings that are not short",
+        "palindromes with a and not b",
+        "strings containing a but not containing a",
+    ]
+
+    def test_grammar(self):
+        for query, filters in self.PARSED.items():
+            with self.subTest(query=query):
+                self.assertEqual(nl_query.parse(query).filters, filters)
+        self.assertIs(nl_query.parse("At  least 3 WORDS"), nl_query.parse("at least 3 words"))
+
+    def test_unparseable_queries_are_rejected(self):
+        for query in self.UNPARSEABLE:
+            with self.subTest(query=query), self.assertRaises(nl_query.QueryParseError):
+                nl_query.parse(query)
+
+
+class NaturalLanguageFilterTests(TestCase):
+    def setUp(self):
+        for value in ('abba', 'level', 'hello world', 'racecar', 'xyz'):
+            self.client.post('/strings', {'value': value}, content_type='application/json')
+
+    def matches(self, query):
+        response = self.client.get('/strings/filter-by-natural-language', {'query': query, 'fields': 'value'})
+        return response.status_code, {item['value'] for item in response.json().get('data', [])}
+
+    def test_negation_excludes(self):
+        self.assertEqual(self.matches("strings not containing the letter a"), (200, {'level', 'hello world', 'xyz'}))
+        self.assertEqual(self.matches("palindromes without e"), (200, {'abba'}))
+        self.assertEqual(self.matches("strings containing the letter a"), (200, {'abba', 'racecar'}))
+
+    def test_unparseable_and_empty_results(self):
+        self.assertEqual(self.client.get('/strings/filter-by-natural-language', {'query': 'strings that are not short'}).status_code, 400)
+        self.assertEqual(self.matches("strings containing the letter q")[0], 422)
+
+
+@override_settings(ROOT_URLCONF='hng1project.async_urls')
+class AsyncCreateTests(TestCase):
+    async def test_bodies_the_sync_view_accepts(self):
+        bodies = [
+            ('abba', {'data': {'value': 'abba'}, 'content_type': 'application/json'}),
+            ('level', {'data': {'value': 'level'}}),  # multipart/form-data
+            ('kayak', {'data': 'value=kayak', 'content_type': 'application/x-www-form-urlencoded'}),
+            ('refer', {'data': {'_content': json.dumps({'value': 'refer'})}}),
+        ]
+        for value, request in bodies:
+            with self.subTest(value=value):
+                response = await self.async_client.post('/strings', **request)
+                self.assertEqual(response.status_code, 201, response.content)
+                self.assertEqual(response.json()['value'], value)
+
+    async def test_missing_value(self):
+        response = await self.async_client.post('/strings', {'other': 'abba'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StatsTests(TestCase):
+    def post(self, value):
+        return self.client.post('/strings', {'value': value}, content_type='application/json')
+
+    def assertMatchesRecount(self):
+        counted = self.client.get('/strings/stats').json()
+        stats.rebuild()
+        self.assertEqual(counted, stats.snapshot())
+        return counted
+
+    def test_counters_follow_every_write(self):
+        for value in ('abba', 'level', 'hello world', 'Hello World', 'abba'):
+            self.post(value)
+        counted = self.assertMatchesRecount()
+        self.assertEqual((counted['total'], counted['palindromes']), (4, 2))
+        self.assertEqual(counted['length_histogram'], {'4-7': 2, '8-15': 2})
+        self.assertEqual(counted['character_frequencies']['l'], 8)
+
+        self.client.delete('/strings/level')
+        self.assertEqual(self.assertMatchesRecount()['total'], 3)
+
+        batch = ['racecar', 'two words', 'abba', '', {'value': 'three word string'}, 'racecar']
+        self.assertEqual(self.client.post('/strings/batch', batch, content_type='application/json').json()['created'], 3)
+        counted = self.assertMatchesRecount()
+        self.assertEqual(counted['word_count_histogram'], {'1': 2, '2-3': 4})
+
+        self.client.delete('/strings?is_palindrome=true')
+        counted = self.assertMatchesRecount()
+        self.assertEqual((counted['total'], counted['palindromes']), (4, 0))
+
+        self.client.delete('/strings?min_length=0')
+        self.assertEqual(self.assertMatchesRecount()['total'], 0)
+        self.assertFalse(StatsCounter.objects.exclude(count=0).exists())
+
+    def test_rebuild_stats_command(self):
+        for value in ('abba', 'hello world', 'ÿ ÿ'):
+            self.post(value)
+        expected = stats.snapshot()
+        StatsCounter.objects.all().delete()
+        StatsCounter.objects.create(kind=stats.TOTAL, name='', count=42)
+
+        output = StringIO()
+        call_command('rebuild_stats', stdout=output)
+        self.assertIn("Rebuilt statistics for 3 strings", output.getvalue())
+        self.assertEqual(stats.snapshot(), expected)
+
+
+class SerializationTests(TestCase):
+    VALUES = ['abba', 'Ünïcödé ΣΟΦΙΑ 😀', 'quotes " and \\ back\tslash', 'control \x01\x1f and \u2028 separators']
+
+    def setUp(self):
+        for value in self.VALUES:
+            self.client.post('/strings', {'value': value}, content_type='application/json')
+
+    def responses(self):
+        response_cache.invalidate()
+        return [
+            self.client.get('/strings').content,
+            self.client.get('/strings', {'fields': 'id,created_at,character_frequency_map'}).content,
+            self.client.get('/strings/id/' + analyze(self.VALUES[1])['sha256_hash']).content,
+            self.client.get('/').content,
+        ]
+
+    @skipUnless(orjson, "orjson is not installed")
+    def test_orjson_and_standard_library_encode_the_same_bytes(self):
+        with_orjson = self.responses()
+        with mock.patch('string_analyzer.serializer.orjson', None):
+            self.assertEqual(self.responses(), with_orjson)
+
+    def test_same_json_as_drf_renderer(self):
+        rows = list(string_rows(AnalyzedString.objects.order_by('id')))
+        payload = {"data": [string_payload(row) for row in rows], "count": len(rows), "next": None}
+        self.assertEqual(dumps(payload), JSONRenderer().render(payload))
+        self.assertEqual(json.loads(dumps(payload))['data'][1]['value'], self.VALUES[1])
+
+
+class FieldsTests(TestCase):
+    def setUp(self):
+        self.client.post('/strings', {'value': 'Hello World'}, content_type='application/json')
+
+    def test_projection(self):
+        full = self.client.get('/strings').json()['data'][0]
+        projected = {
+            'value': {'value': 'Hello World'},
+            'id,length': {'id': full['id'], 'properties': {'length': 11}},
+            'character_frequency_map,created_at': {
+                'created_at': full['created_at'],
+                'properties': {'character_frequency_map': full['properties']['character_frequency_map']},
+            },
+            ' value , word_count ,': {'value': 'Hello World', 'properties': {'word_count': 2}},
+        }
+        for fields, expected in projected.items():
+            with self.subTest(fields=fields):
+                self.assertEqual(self.client.get('/strings', {'fields': fields}).json()['data'], [expected])
+        nl = self.client.get('/strings/filter-by-natural-language', {'query': 'strings with multiple words', 'fields': 'is_palindrome'})
+        self.assertEqual(nl.json()['data'], [{'properties': {'is_palindrome': False}}])
+
+    def test_unknown_fields_are_rejected(self):
+        for fields in ('', ',', 'value,password', 'properties', 'char_mask'):
+            with self.subTest(fields=fields):
+                self.assertEqual(self.client.get('/strings', {'fields': fields}).status_code, 400)
+        self.assertEqual(self.client.get('/strings/search', {'q': 'hello', 'fields': 'nope'}).status_code, 400)
+
+
+class FrequencyStorageTests(TestCase):
+    VALUES = ['Hello World', 'ÿ' * 300 + 'ab', 'x' * 70000, '😀 Σ']
+
+    def create(self, mode):
+        with override_settings(STRING_FREQUENCY_MAP_STORAGE=mode):
+            for value in self.VALUES:
+                self.client.post('/strings', {'value': value}, content_type='application/json')
+            AnalyzedString.objects.bulk_create_analyzed([{"value": "batch " + mode, **analyze("batch " + mode)}])
+
+    def stored_maps(self):
+        response_cache.invalidate()
+        return {item['value']: item['properties']['character_frequency_map'] for item in self.client.get('/strings').json()['data']}
+
+    def expected_maps(self):
+        return {value: analyze(value)['character_frequency_map'] for value in AnalyzedString.objects.values_list('value', flat=True)}
+
+    def test_every_mode_round_trips(self):
+        for mode in frequency.MODES:
+            with self.subTest(mode=mode):
+                AnalyzedString.objects.all().delete()
+                self.create(mode)
+                self.assertEqual(self.stored_maps(), self.expected_maps())
+                stored = AnalyzedString.objects.values_list('character_frequency_map', 'character_frequency_packed')
+                self.assertTrue(all((mode == frequency.JSON) == (json_map is not None) for json_map, _ in stored))
+                self.assertTrue(all((mode == frequency.PACKED) == (packed is not None) for _, packed in stored))
+
+    def test_pack_round_trip(self):
+        for counts in ({}, {'a': 1}, {'a': 255, 'b': 256}, {'ÿ': 70000, '😀': 1}, {'\ud800': 2, 'z': 2 ** 33}):
+            with self.subTest(counts=counts):
+                self.assertEqual(frequency.unpack(frequency.pack(counts)), counts)
+
+    def test_convert_frequency_maps(self):
+        self.create(frequency.JSON)
+        expected = self.expected_maps()
+        for mode in (frequency.PACKED, frequency.NONE, frequency.JSON, frequency.PACKED):
+            with self.subTest(mode=mode):
+                output = StringIO()
+                call_command('convert_frequency_maps', mode=mode, stdout=output)
+                self.assertIn(f"Converted {len(expected)} strings to '{mode}'", output.getvalue())
+                self.assertEqual(self.stored_maps(), expected)
+                self.assertEqual(frequency.convert(mode=mode), 0)
+        stats_before = stats.snapshot()
+        stats.rebuild()
+        self.assertEqual(stats.snapshot(), stats_before)
+
+
+class MetricsTests(TestCase):
+    RECORD = (
+        "import django; django.setup(); "
+        "from string_analyzer.instrumentation import RequestMetrics, registry; "
+        "registry.record('strings', 'GET', 200, 0.01, RequestMetrics(), 100); "
+        "registry.record('strings', 'BREW', 418, 0.01, RequestMetrics(), 100)"
+    )
+    RENDER = "import django; django.setup(); from string_analyzer.instrumentation import registry; print(registry.render().decode())"
+
+    def test_workers_share_one_set_of_totals(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory}
+            for _ in range(3):
+                subprocess.run([sys.executable, '-c', self.RECORD], env=env, check=True)
+            output = subprocess.run([sys.executable, '-c', self.RENDER], env=env, check=True, capture_output=True, text=True).stdout
+
+        self.assertIn('string_api_requests_total{method="GET",route="strings",status="200"} 3.0', output)
+        self.assertIn('string_api_request_duration_seconds_count{method="GET",route="strings"} 3.0', output)
+
+    def test_unknown_methods_share_a_label(self):
+        self.client.generic('BREW', '/strings/stats')
+        self.client.generic('PROPFIND', '/strings/stats')
+        output = self.client.get('/metrics').content.decode()
+        self.assertIn('string_api_requests_total{method="other",route="strings_stats",status="405"} 2.0', output)
+        self.assertNotIn('BREW', output)
+
+    def test_drf_rendering_counts_as_serialization(self):
+        timing = self.client.get('/strings/stats')['Server-Timing']
+        serialization = re.search(r'serialization;dur=([\d.]+)', timing).group(1)
+        self.assertGreater(float(serialization), 0)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    LOAD = (
+        "import json, django; django.setup(); "
+        "from django.conf import settings; "
+        "from string_analyzer.checks import check_database_connections; "
+        "print(json.dumps({'database': settings.DATABASES['default'], "
+        "'checks': [message.id for message in check_database_connections(None)]}, default=str))"
+    )
+
+    def load(self, **variables):
+        env = {
+            name: value for name, value in os.environ.items()
+            if not name.startswith('DB_') and name != 'DJANGO_SETTINGS_MODULE'
+        }
+        env.update(DJANGO_SETTINGS_MODULE='hng1project.settings', DATABASE_URL='postgres://user:secret@db:5432/strings')
+        env.update(variables)
+        output = subprocess.run([sys.executable, '-c', self.LOAD], env=env, check=True, capture_output=True, text=True).stdout
+        return json.loads(output)
+
+    def test_defaults(self):
+        loaded = self.load()
+        database = loaded['database']
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertIs(database['CONN_HEALTH_CHECKS'], True)
+        self.assertIs(database['DISABLE_SERVER_SIDE_CURSORS'], False)
+        self.assertNotIn('pool', database.get('OPTIONS', {}))
+        self.assertEqual(loaded['checks'], [])
+
+    def test_connection_reuse_variables(self):
+        loaded = self.load(DB_CONN_MAX_AGE='0', DB_CONN_HEALTH_CHECKS='off', DB_DISABLE_SERVER_SIDE_CURSORS='Yes')
+        database = loaded['database']
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertIs(database['CONN_HEALTH_CHECKS'], False)
+        self.assertIs(database['DISABLE_SERVER_SIDE_CURSORS'], True)
+        self.assertIn('string_analyzer.W002', loaded['checks'])
+
+    def test_pool(self):
+        loaded = self.load(DB_POOL='true', DB_POOL_MIN_SIZE='4', DB_POOL_MAX_SIZE='3', DB_POOL_TIMEOUT='2.5')
+        database = loaded['database']
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 4, 'max_size': 3, 'timeout': 2.5})
+        self.assertIn('string_analyzer.E002', loaded['checks'])
+        self.assertNotIn('string_analyzer.W002', loaded['checks'])
+
+    def test_pool_is_postgres_only(self):
+        loaded = self.load(DATABASE_URL='sqlite:///strings.sqlite3', DB_POOL='1')
+        self.assertNotIn('pool', loaded['database'].get('OPTIONS', {}))
+        self.assertEqual(loaded['checks'], ['string_analyzer.W001'])
+
+
+class ApiSettingsTests(SimpleTestCase):
+    SERVE = (
+        "import json, django; django.setup(); "
+        "from django.apps import apps; "
+        "from django.core.management import call_command; "
+        "from django.test import Client; "
+        "call_command('migrate', verbosity=0); call_command('check', fail_level='WARNING'); "
+        "client = Client(enforce_csrf_checks=True); "
+        "created = client.post('/strings', {'value': 'level'}, content_type='application/json'); "
+        "fetched = client.get('/strings/level'); "
+        "print(json.dumps({"
+        "'apps': [config.name for config in apps.get_app_configs()], "
+        "'created': created.status_code, 'fetched': fetched.status_code, 'content_type': fetched['Content-Type'], "
+        "'value': fetched.json()['value'], 'cookies': list(client.cookies), "
+        "'admin': client.get('/admin/').status_code}))"
+    )
+
+    def test_boots_and_serves_without_admin_sessions_or_csrf(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'hng1project.settings_api',
+                'DATABASE_URL': f'sqlite:///{directory}/api.sqlite3',
+                'STRING_VECTOR_INDEX_DIR': os.path.join(directory, 'vector_index'),
+            }
+            output = subprocess.run([sys.executable, '-c', self.SERVE], env=env, check=True, capture_output=True, text=True).stdout
+        # the last line, after check's report
+        served = json.loads(output.splitlines()[-1])
+
+        self.assertEqual(served['apps'], ['rest_framework', 'string_analyzer'])
+        self.assertEqual((served['created'], served['fetched']), (201, 200))
+        self.assertEqual(served['content_type'], 'application/json')
+        self.assertEqual(served['value'], 'level')
+        self.assertEqual(served['cookies'], [])
+        self.assertEqual(served['admin'], 404)
+
+
+class StreamingAnalyzerTests(TestCase):
+    VALUES = [
+        "",
+        "Was it a car or a cat I saw",
+        "ab  cd\tef\n gh ",
+        "ΟΔΟΣ ΣΟΔΟ",          # a final sigma, lower-cased by what follows it
+        "Σ.Σ'\u0301Σx İ ÿ 😀",
+        "Step on no pets" * 50,
+    ]
+
+    def analyze_in_chunks(self, value, size):
+        data = value.encode()
+        with StreamingAnalyzer(spool_size=64) as analyzer:
+            for start in range(0, len(data), size):
+                analyzer.feed(data[start:start + size])
+            return analyzer.finish(), analyzer.value()
+
+    def test_matches_analyze_for_any_chunking(self):
+        for value in self.VALUES:
+            for size in (1, 2, 3, 7, 1024):
+                with self.subTest(value=value[:20], size=size):
+                    self.assertEqual(self.analyze_in_chunks(value, size), (analyze(value), value))
+
+    def test_invalid_utf8_raises(self):
+        with StreamingAnalyzer() as analyzer, self.assertRaises(UnicodeDecodeError):
+            analyzer.feed(b'\xff')
+        # a sequence cut short is only known to be invalid at the end
+        with StreamingAnalyzer() as analyzer, self.assertRaises(UnicodeDecodeError):
+            analyzer.feed(b'ab\xc3')
+            analyzer.finish()
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        for value in ('hello world', 'yellow fellow', 'world peace', 'help me'):
+            self.client.post('/strings', {'value': value}, content_type='application/json')
+
+    def search(self, **params):
+        response = self.client.get('/strings/search', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_substring_matches_rank_first(self):
+        result = self.search(q='WORLD', fields='value')
+        self.assertEqual([item['value'] for item in result['data']], ['hello world', 'world peace'])
+        self.assertEqual(result['data'][0]['score'], 1.0)
+
+    def test_pagination_and_deleted_strings(self):
+        first = self.search(q='wor', limit=1)
+        self.assertEqual(first['next_offset'], 1)
+        second = self.search(q='wor', limit=1, offset=1)
+        self.assertIsNone(second['next_offset'])
+
+        self.client.delete('/strings/world peace')
+        self.assertEqual([item['value'] for item in self.search(q='world')['data']], ['hello world'])
+
+    def test_missing_query_is_rejected(self):
+        self.assertEqual(self.client.get('/strings/search').status_code, 400)
+
+    @skipUnless(string_search.uses_posting_table(), "PostgreSQL searches the pg_trgm index")
+    @mock.patch.object(string_search, 'MAX_INDEXED_LENGTH', 20)
+    def test_long_values_are_scanned_not_indexed(self):
+        value = 'the quick brown fox jumps over the lazy dog'
+        self.client.post('/strings', {'value': value}, content_type='application/json')
+        self.assertFalse(SearchTrigram.objects.filter(string__value=value).exists())
+
+        self.assertEqual([item['value'] for item in self.search(q='LAZY DOG', fields='value')['data']], [value])
+        self.assertEqual([item['value'] for item in self.search(q='hello', fields='value')['data']], ['hello world'])
+
+
+class BulkDeleteTests(TestCase):
+    VALUES = ['abba', 'level', 'hello world', 'yellow fellow', 'world peace']
+
+    def setUp(self):
+        for value in self.VALUES:
+            self.client.post('/strings', {'value': value}, content_type='application/json')
+
+    def test_filtered_delete_keeps_stats_and_indexes_consistent(self):
+        response = self.client.delete('/strings?is_palindrome=false&min_length=11')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted'], 3)
+        self.assertEqual(set(AnalyzedString.objects.values_list('value', flat=True)), {'abba', 'level'})
+        self.assertFalse(CharacterPresence.objects.filter(character='w').exists())
+
+        counted = stats.snapshot()
+        stats.rebuild()
+        self.assertEqual(counted, stats.snapshot())
+
+    def test_ids_in_the_body(self):
+        ids = [analyze(value)['sha256_hash'] for value in ('abba', 'world peace')]
+        response = self.client.delete('/strings', {'ids': ids + ['0' * 64]}, content_type='application/json')
+        self.assertEqual(response.json()['deleted'], 2)
+        self.assertEqual(AnalyzedString.objects.count(), len(self.VALUES) - 2)
+
+    def test_unfiltered_or_invalid_delete_is_rejected(self):
+        self.assertEqual(self.client.delete('/strings').status_code, 400)
+        self.assertEqual(self.client.delete('/strings?ids=not-a-hash').status_code, 400)
+        self.assertEqual(AnalyzedString.objects.count(), len(self.VALUES))
+
+
+class SimilarTests(TestCase):
+    VALUES = ['hello world', 'world hello', 'Hello World!', 'zzzz yyyy', 'abcabc']
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(STRING_VECTOR_INDEX_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for value in self.VALUES:
+            self.post(value)
+        vectors.build()
+
+    def post(self, value):
+        # the index is updated once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/strings', {'value': value}, content_type='application/json')
+
+    def similar(self, value, **params):
+        response = self.client.get(f'/strings/{hashlib.sha256(value.encode()).hexdigest()}/similar', {'fields': 'value', **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['value'] for item in response.json()['data']]
+
+    def test_nearest_first_without_the_string_itself(self):
+        self.assertEqual(self.similar('hello world', k=2), ['world hello', 'Hello World!'])
+        self.assertEqual(self.similar('hello world', k=2, metric='l1'), ['world hello', 'Hello World!'])
+
+    def test_index_follows_creates_and_deletes(self):
+        self.similar('hello world')
+        self.post('dlrow olleh')
+        self.assertIn('dlrow olleh', self.similar('hello world', k=2))
+
+        ids = [hashlib.sha256(value.encode()).hexdigest() for value in ('world hello', 'dlrow olleh')]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/strings', {'ids': ids}, content_type='application/json')
+        self.assertEqual(self.similar('hello world', k=1), ['Hello World!'])
+        indexed = {pk for pk, _ in vectors.index().nearest({'h': 1}, 100)}
+        self.assertEqual(indexed, set(AnalyzedString.objects.values_list('pk', flat=True)))
+
+    def test_index_grows_in_the_background_and_other_processes_remap(self):
+        index = vectors.index()
+        reader = vectors.VectorIndex(index.path)
+        index.build([])
+        self.assertEqual(reader.nearest({'a': 1}, 5), [])
+        inode = os.stat(index.path).st_ino
+        index.add([(pk, {chr(ord('a') + pk % 26): 1}) for pk in range(1, vectors.INITIAL_CAPACITY + 100)])
+        # too many for the file: logged, and already found by queries
+        self.assertEqual(os.stat(index.path).st_ino, inode)
+        self.assertTrue(os.path.exists(index.pending_path))
+        self.assertEqual(len(reader.nearest({'a': 1}, 5)), 5)
+        self.assertTrue(all(pk % 26 == 0 for pk, _ in reader.nearest({'a': 1}, 5)))
+
+        index.remove([26])
+        # what an idle process_jobs worker does
+        jobs.compact_vector_index()
+        self.assertFalse(os.path.exists(index.pending_path))
+        self.assertNotEqual(os.stat(index.path).st_ino, inode)
+        nearest = reader.nearest({'a': 1}, 5)
+        self.assertEqual(len(nearest), 5)
+        self.assertTrue(all(pk % 26 == 0 and pk != 26 for pk, _ in nearest))
+        self.assertFalse(index.compact())
+
+    def test_updates_during_a_build_are_kept(self):
+        index = vectors.index()
+        hello = AnalyzedString.objects.get(value='hello world').pk
+
+        def rows():
+            # a create and a delete committed while the build is reading
+            index.add([(1000, {'h': 1, 'e': 1})])
+            index.remove([hello])
+            yield from AnalyzedString.objects.values_list('id', 'character_frequency_map')
+
+        index.build(rows())
+        indexed = {pk for pk, _ in index.nearest({'h': 1}, 100)}
+        self.assertIn(1000, indexed)
+        self.assertNotIn(hello, indexed)
+        self.assertFalse(os.path.exists(index.pending_path))
+
+    def test_unbuilt_index_is_unavailable(self):
+        os.remove(vectors.index().path)
+        hello = hashlib.sha256(b'hello world').hexdigest()
+        response = self.client.get(f'/strings/{hello}/similar')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('build_vector_index', response.json()['error'])
+
+    def test_unknown_string_and_invalid_parameters(self):
+        self.assertEqual(self.client.get(f'/strings/{"0" * 64}/similar').status_code, 404)
+        hello = hashlib.sha256(b'hello world').hexdigest()
+        self.assertEqual(self.client.get(f'/strings/{hello}/similar?k=0').status_code, 400)
+        self.assertEqual(self.client.get(f'/strings/{hello}/similar?metric=l2').status_code, 400)
+
+
+class BatchJobTests(TestCase):
+    ITEMS = ['one', 'two', '', 'three', 'one', 'four', 'five']
+
+    @mock.patch.object(ingest, 'BATCH_CHUNK_SIZE', 2)
+    def test_retried_batch_reports_like_the_synchronous_response(self):
+        expected = self.client.post('/strings/batch', self.ITEMS, content_type='application/json').json()
+        AnalyzedString.objects.all().bulk_delete_analyzed()
+
+        job = jobs.enqueue_batch(self.ITEMS)
+        bulk_create = AnalyzedString.objects.bulk_create_analyzed
+        calls = []
+
+        def crash_on_second_chunk(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("worker died")
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(AnalyzedString.objects, 'bulk_create_analyzed', crash_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                jobs.run_batch(job)
+
+        job = AnalysisJob.objects.get(pk=job.pk)
+        self.assertEqual(job.item_statuses, 'cc')
+        self.assertEqual(job.processed, 2)
+        jobs.run(job)
+
+        job = AnalysisJob.objects.get(pk=job.pk)
+        self.assertEqual(job.status, AnalysisJob.DONE)
+        self.assertEqual(job.result, expected)
+        self.assertEqual(job.item_statuses, '')
+        self.assertEqual(AnalyzedString.objects.count(), 5)
+
+
+class JobQueueTests(CommittingTestCase):
+    """
+    ?async=1 jobs under load: worker processes drain the queue while clients
+    keep queueing single strings and batches and polling /jobs/<id> like a
+    real client would. benchmarks/bench_jobs.py measures the throughput.
+    """
+    CLIENTS = 8
+    JOBS_PER_CLIENT = 20
+    BATCH_SIZE = 50
+    WORKERS = 2
+    TIMEOUT = 120
+
+    def queue_jobs(self, client_number):
+        client = Client()
+        job_ids = []
+        try:
+            for number in range(self.JOBS_PER_CLIENT):
+                prefix = f"client {client_number} job {number}"
+                if number % 4 == 0:
+                    values = [f"{prefix} item {item}" for item in range(self.BATCH_SIZE)]
+                    response = client.post('/strings/batch?async=1', values, content_type='application/json')
+                else:
+                    response = client.post('/strings?async=1', {'value': prefix}, content_type='application/json')
+                self.assertEqual(response.status_code, 202)
+                job_ids.append(response.json()['job_id'])
+            return job_ids
+        finally:
+            close_old_connections()
+
+    def wait_for(self, job_ids):
+        deadline = perf_counter() + self.TIMEOUT
+        pending = list(job_ids)
+        while pending:
+            self.assertLess(perf_counter(), deadline, f"{len(pending)} jobs still pending")
+            pending = [job_id for job_id in pending if self.client.get(f'/jobs/{job_id}').json()['status'] in ('queued', 'running')]
+
+    def test_every_job_completes_under_load(self):
+        # fork the workers before any client thread exists, a lock held by one would never be released in the child
+        connections.close_all()
+        workers = [multiprocessing.Process(target=worker_process, args=(0.05, False)) for _ in range(self.WORKERS)]
+        for worker in workers:
+            worker.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.CLIENTS) as pool:
+                job_ids = [job_id for ids in pool.map(self.queue_jobs, range(self.CLIENTS)) for job_id in ids]
+            self.wait_for(job_ids)
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+
+        batches = self.CLIENTS * len(range(0, self.JOBS_PER_CLIENT, 4))
+        expected = batches * self.BATCH_SIZE + len(job_ids) - batches
+        self.assertEqual(AnalysisJob.objects.filter(status=AnalysisJob.DONE).count(), len(job_ids))
+        self.assertEqual(AnalyzedString.objects.count(), expected)
+        self.assertEqual(stats.snapshot()['total'], expected)
+        self.assertEqual(self.indexed(), set(AnalyzedString.objects.values_list('pk', flat=True)))
+
+        batch = self.client.get(f'/jobs/{job_ids[0]}').json()
+        self.assertEqual(batch['progress'], {"processed": self.BATCH_SIZE, "total": self.BATCH_SIZE})
+        self.assertEqual(batch['result']['created'], self.BATCH_SIZE)
@@ -1,9 +1,18 @@
-from django.urls import path
+from django.urls import path, re_path
 from .views import *
 
 urlpatterns = [
     path('', home, name='home'),
+    path('cache/stats', cache_stats, name='cache_stats'),
+    path('metrics', metrics, name='metrics'),
+    path('jobs/<uuid:job_id>', job_status, name='job_status'),
     path('strings', strings, name='strings'),
+    path('strings/batch', strings_batch, name='strings_batch'),
+    path('strings/stats', strings_stats, name='strings_stats'),
     path('strings/filter-by-natural-language', natural_language_filter, name='natural_language_filter'),
+    path('strings/search', strings_search, name='strings_search'),
+    re_path(r'^strings/(?P<sha256_hash>[0-9a-f]{64})/similar$', strings_similar, name='strings_similar'),
+    re_path(r'^strings/id/(?P<sha256_hash>[0-9a-f]{64})$', get_remove_string_by_id, name='get_remove_string_by_id'),
+    # values that equal one of the routes above are only reachable through strings/id/<sha256>
     path('strings/<path:specific_string>', get_remove_string, name='get_remove_string'),
 ]
\ No newline at end of file
@@ -0,0 +1,563 @@
+import math
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import repeat
+from operator import mul, sub
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from . import frequency
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, only safe with a single process
+    fcntl = None
+
+COSINE = 'cosine'
+L1 = 'l1'
+METRICS = (COSINE, L1)
+
+DIMS = 64
+# Room of a new index file, it grows by half again when full
+INITIAL_CAPACITY = 1024
+BUILD_BATCH_SIZE = 5000
+# The vectors are split into inverted lists of about LIST_SIZE strings
+# around k-means centroids. A query scans the PROBES lists with the closest
+# centroids, plus the strings added since the lists were last sorted.
+LIST_SIZE = 1000
+MAX_LISTS = 4096
+PROBES = 32
+TRAIN_ROWS_PER_LIST = 40
+TRAIN_ITERATIONS = 10
+# Index neighbours re-ranked by their exact maps, per requested neighbour and at least
+CANDIDATE_FACTOR = 10
+MIN_CANDIDATES = 100
+# Rows compared with the centroids at once, bounds the score matrix
+ASSIGN_BLOCK_ROWS = 16384
+
+# File header: magic, dimensions, capacity, rows used, lists, rows sorted into the lists
+_MAGIC = 0x5844495443455653
+_HEADER_BYTES = 6 * 8
+# Record of the pending log: a string's id and vector, or minus the id of a removed string
+_PENDING_RECORD = np.dtype([('id', '<i8'), ('vector', '<f4', DIMS)])
+
+
+class IndexNotBuilt(Exception):
+    pass
+
+
+@lru_cache(maxsize=65536)
+def bucket(character):
+    """
+    Vector dimension of a character: ASCII letters case-folded, digits and
+    the space get their own, every other character is hashed into the rest
+    """
+    if character.isascii() and character.isalpha():
+        return ord(character.lower()) - ord('a')
+    if character.isascii() and character.isdigit():
+        return 26 + ord(character) - ord('0')
+    if character == ' ':
+        return 36
+    return 37 + ord(character) % (DIMS - 37)
+
+
+def vectors(frequency_maps):
+    """
+    Character distributions of the maps in DIMS dimensions, each row summing to 1
+    """
+    counts = []
+    for frequency_map in frequency_maps:
+        row = [0] * DIMS
+        for character, count in frequency_map.items():
+            row[bucket(character)] += count
+        counts.append(row)
+    matrix = np.array(counts, dtype=np.float32).reshape(-1, DIMS)
+    totals = matrix.sum(axis=1, keepdims=True)
+    return np.divide(matrix, totals, out=np.zeros_like(matrix), where=totals > 0)
+
+
+def _inverse_norms(matrix):
+    norms = np.linalg.norm(matrix, axis=1)
+    return np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+
+
+def _lists_for(count):
+    return min(MAX_LISTS, max(1, count // LIST_SIZE))
+
+
+def _assign(matrix, centroids):
+    """
+    The list of every row: the centroid with the highest cosine similarity
+    """
+    assignments = np.zeros(len(matrix), dtype=np.int64)
+    if len(centroids) > 1:
+        for start in range(0, len(matrix), ASSIGN_BLOCK_ROWS):
+            block = matrix[start:start + ASSIGN_BLOCK_ROWS]
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def _train(matrix, lists):
+    """
+    lists centroids from spherical k-means over a sample of the rows
+    """
+    if lists == 1:
+        return np.zeros((1, DIMS), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    sample = matrix[rng.choice(len(matrix), min(len(matrix), lists * TRAIN_ROWS_PER_LIST), replace=False)]
+    sample = sample * _inverse_norms(sample)[:, None]
+    centroids = sample[rng.choice(len(sample), lists, replace=False)]
+    for _ in range(TRAIN_ITERATIONS):
+        assignments = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        filled = np.bincount(assignments, minlength=lists) > 0
+        # a list that attracted no rows keeps its centroid
+        centroids[filled] = sums[filled] * _inverse_norms(sums[filled])[:, None]
+    return centroids
+
+
+def _layout(capacity, lists):
+    """
+    Byte offsets of the centroids, list offsets, ids, inverse L2 norms and vectors, and the file size
+    """
+    centroids = _HEADER_BYTES
+    offsets = centroids + 4 * DIMS * lists
+    ids = offsets + 8 * (lists + 1)
+    norms = ids + 8 * capacity
+    rows = norms + 4 * capacity
+    return centroids, offsets, ids, norms, rows, rows + 4 * DIMS * capacity
+
+
+def _capacity_for(count):
+    return max(INITIAL_CAPACITY, count + count // 2)
+
+
+class _MappedFile:
+    """
+    Views into one memory-mapped index file. Rows up to sorted are grouped
+    by list, list i spanning offsets[i] to offsets[i + 1]. Slots past the
+    used count, and slots of removed strings, have id 0.
+    """
+    def __init__(self, path, inode):
+        self.inode = inode
+        # a plain ndarray view of the mapping, np.memmap wraps every slice in Python
+        buffer = np.memmap(path, dtype=np.uint8, mode='r+').view(np.ndarray)
+        self.header = buffer[:_HEADER_BYTES].view(np.int64)
+        if self.header[0] != _MAGIC or self.header[1] != DIMS:
+            raise ValueError(f"{path} is not a vector index, rebuild it with python manage.py build_vector_index")
+        self.capacity, lists = int(self.header[2]), int(self.header[4])
+        centroids, offsets, ids, norms, rows, end = _layout(self.capacity, lists)
+        self.centroids = buffer[centroids:offsets].view(np.float32).reshape(lists, DIMS)
+        self.offsets = buffer[offsets:ids].view(np.int64)
+        self.ids = buffer[ids:norms].view(np.int64)
+        self.inverse_norms = buffer[norms:rows].view(np.float32)
+        self.rows = buffer[rows:end].view(np.float32).reshape(self.capacity, DIMS)
+
+    @property
+    def count(self):
+        return int(self.header[3])
+
+    @property
+    def sorted(self):
+        return int(self.header[5])
+
+    def assignments(self):
+        """
+        The list of each sorted row
+        """
+        return np.repeat(np.arange(len(self.centroids)), np.diff(self.offsets))
+
+
+class VectorIndex:
+    """
+    Character distribution vectors of every string in one memory-mapped file.
+    Each process maps it shared, so the workers read the same pages and see
+    each other's updates without loading anything. Updates take an exclusive
+    lock on path.lock. Growing, re-sorting or rebuilding writes a new file and
+    renames it over the old one, the other processes notice the new inode and remap.
+
+    Requests never write a new file: adds that do not fit, and every update
+    made while a build holds path.build.lock, are appended to the pending log
+    path.pending instead. Queries scan it too, and compact() or the next
+    build moves it into the file.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        self.pending_path = self.path + '.pending'
+        self._lock = threading.Lock()
+        self._mapped = None
+        # stands in for the build lock where there is no flock
+        self._build_running = False
+        self._build_probe = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _map(self):
+        """
+        The current file's views, None when there is no index
+        """
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+        mapped = self._mapped
+        if mapped is None or mapped.inode != inode:
+            mapped = self._mapped = _MappedFile(self.path, inode)
+        return mapped
+
+    @contextmanager
+    def _exclusive(self):
+        with self._lock, open(self.path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _building(self):
+        """
+        Whether a build holds path.build.lock, in this process or another
+        """
+        if fcntl is None:
+            return self._build_running
+        if self._build_probe is None:
+            try:
+                # kept open, a build locks its own file description of it
+                self._build_probe = open(self.path + '.build.lock', 'a')
+            except FileNotFoundError:
+                return False
+        try:
+            fcntl.flock(self._build_probe, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(self._build_probe, fcntl.LOCK_UN)
+        return False
+
+    def _append_pending(self, ids, matrix=None):
+        """
+        Logs added strings with their vectors, or removed ones without
+        """
+        records = np.zeros(len(ids), dtype=_PENDING_RECORD)
+        if matrix is None:
+            records['id'] = -np.asarray(ids, dtype=np.int64)
+        else:
+            records['id'] = ids
+            records['vector'] = matrix
+        with open(self.pending_path, 'ab') as pending:
+            pending.write(records.tobytes())
+
+    def _read_pending(self):
+        """
+        The logged (ids, vectors) still live, and the ids removed since the log was started
+        """
+        try:
+            with open(self.pending_path, 'rb') as pending:
+                data = pending.read()
+        except FileNotFoundError:
+            data = b''
+        # a reader can catch a record half written
+        records = np.frombuffer(data[:len(data) - len(data) % _PENDING_RECORD.itemsize], dtype=_PENDING_RECORD)
+        removed = -records['id'][records['id'] < 0]
+        added = records[records['id'] > 0]
+        added = added[np.sort(np.unique(added['id'], return_index=True)[1])]
+        added = added[~np.isin(added['id'], removed)]
+        return added['id'], added['vector'].reshape(-1, DIMS), removed
+
+    def _write(self, ids, matrix, centroids, assignments):
+        """
+        Replaces the index with a new file holding ids and their vectors, sorted by list
+        """
+        capacity, lists, count = _capacity_for(len(ids)), len(centroids), len(ids)
+        order = np.argsort(assignments, kind='stable')
+        centroids_at, offsets_at, ids_at, norms_at, rows_at, end = _layout(capacity, lists)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        buffer = np.memmap(temporary, dtype=np.uint8, mode='w+', shape=(end,))
+        buffer[:centroids_at].view(np.int64)[:] = (_MAGIC, DIMS, capacity, count, lists, count)
+        buffer[centroids_at:offsets_at].view(np.float32)[:] = centroids.ravel()
+        buffer[offsets_at:ids_at].view(np.int64)[1:] = np.cumsum(np.bincount(assignments, minlength=lists))
+        buffer[ids_at:norms_at].view(np.int64)[:count] = ids[order]
+        rows = buffer[rows_at:end].view(np.float32).reshape(capacity, DIMS)
+        rows[:count] = matrix[order]
+        buffer[norms_at:rows_at].view(np.float32)[:count] = _inverse_norms(rows[:count])
+        buffer.flush()
+        del buffer, rows
+        os.replace(temporary, self.path)
+
+    @contextmanager
+    def _build_lock(self):
+        with open(self.path + '.build.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._build_running = True
+            try:
+                yield
+            finally:
+                self._build_running = False
+
+    def build(self, pairs):
+        """
+        Replaces the index with the (string_id, frequency_map) pairs and
+        trains its lists, returns the number of strings. pairs is consumed
+        under the build lock only, while updates go to the pending log, and
+        the log is merged in when the new file is written. So a string
+        committed during the build is either read or logged.
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._build_lock():
+            ids, blocks, batch = [], [], []
+            for string_id, frequency_map in pairs:
+                ids.append(string_id)
+                batch.append(frequency_map)
+                if len(batch) >= BUILD_BATCH_SIZE:
+                    blocks.append(vectors(batch))
+                    batch = []
+            blocks.append(vectors(batch))
+            ids, matrix = np.array(ids, dtype=np.int64), np.concatenate(blocks)
+
+            with self._exclusive():
+                added_ids, added_matrix, removed = self._read_pending()
+                new = ~np.isin(added_ids, ids)
+                ids = np.concatenate([ids, added_ids[new]])
+                matrix = np.concatenate([matrix, added_matrix[new]])
+                live = ~np.isin(ids, removed)
+                ids, matrix = ids[live], matrix[live]
+                centroids = _train(matrix, _lists_for(len(ids)))
+                self._write(ids, matrix, centroids, _assign(matrix, centroids))
+                self._clear_pending()
+        return len(ids)
+
+    def _clear_pending(self):
+        try:
+            os.remove(self.pending_path)
+        except FileNotFoundError:
+            pass
+
+    def _rewrite(self, mapped, new_ids, new_matrix, removed=()):
+        """
+        Writes the live rows and the new ones to a new file, all sorted into
+        lists. The lists are retrained once there are twice as many strings as they were made for.
+        """
+        count, sorted_count = mapped.count, mapped.sorted
+        ids = np.concatenate([mapped.ids[:count], new_ids])
+        matrix = np.concatenate([mapped.rows[:count], new_matrix])
+        live = (ids > 0) & ~np.isin(ids, removed)
+        ids, matrix = ids[live], matrix[live]
+        if _lists_for(len(ids)) >= 2 * len(mapped.centroids):
+            centroids = _train(matrix, _lists_for(len(ids)))
+            assignments = _assign(matrix, centroids)
+        else:
+            centroids = np.array(mapped.centroids)
+            assignments = np.concatenate([
+                mapped.assignments(), _assign(mapped.rows[sorted_count:count], centroids), _assign(new_matrix, centroids)
+            ])[live]
+        self._write(ids, matrix, centroids, assignments)
+
+    def add(self, pairs):
+        """
+        Adds (string_id, frequency_map) pairs, skipping ids already indexed.
+        Rows that fit are written in place, the rest go to the pending log
+        for compact(). During a build everything is logged. Does nothing
+        when there is no index and no build, a build reads them from the database.
+        """
+        if not pairs or not (self.exists() or self._building()):
+            return
+        with self._exclusive():
+            if self._building():
+                ids = np.array([string_id for string_id, _ in pairs], dtype=np.int64)
+                self._append_pending(ids, vectors([frequency_map for _, frequency_map in pairs]))
+                return
+            mapped = self._map()
+            if mapped is None:
+                return
+            count = mapped.count
+            ids = np.array([string_id for string_id, _ in pairs], dtype=np.int64)
+            indexed = mapped.ids[:count]
+            # new strings usually have higher ids than every indexed one, which spares the lookup
+            if count and ids.min() <= indexed.max():
+                new = ~np.isin(ids, indexed)
+            else:
+                new = np.ones(len(ids), dtype=bool)
+            if not new.any():
+                return
+            ids = ids[new]
+            matrix = vectors([frequency_map for (_, frequency_map), keep in zip(pairs, new) if keep])
+
+            if count + len(ids) > mapped.capacity or os.path.exists(self.pending_path):
+                # growing the file is left to compact(), outside the request
+                self._append_pending(ids, matrix)
+                return
+            mapped.rows[count:count + len(ids)] = matrix
+            mapped.inverse_norms[count:count + len(ids)] = _inverse_norms(matrix)
+            mapped.ids[count:count + len(ids)] = ids
+            # readers only look at the new rows once the count covers them
+            mapped.header[3] = count + len(ids)
+
+    def remove(self, string_ids):
+        if not string_ids or not (self.exists() or self._building()):
+            return
+        with self._exclusive():
+            if self._building() or os.path.exists(self.pending_path):
+                # the build, or a logged add, may still hold them
+                self._append_pending(string_ids)
+            mapped = self._map()
+            if mapped is None:
+                return
+            used = mapped.ids[:mapped.count]
+            if len(string_ids) <= 16:
+                # a comparison per id beats sorting for isin() when there are few
+                for string_id in string_ids:
+                    used[used == string_id] = 0
+            else:
+                used[np.isin(used, np.array(string_ids, dtype=np.int64))] = 0
+
+    def compact(self):
+        """
+        Moves the pending log into the file, and re-sorts it once too many
+        rows sit past the lists. Writes a new file when there is anything to
+        do, so it runs in the background (process_jobs), never in a request.
+        Returns whether it wrote one.
+        """
+        if not self.exists():
+            return False
+        with self._exclusive():
+            if self._building():
+                return False
+            mapped = self._map()
+            if mapped is None:
+                return False
+            added_ids, added_matrix, removed = self._read_pending()
+            new = ~np.isin(added_ids, mapped.ids[:mapped.count])
+            unsorted = mapped.count - mapped.sorted + int(new.sum())
+            if not os.path.exists(self.pending_path) and unsorted <= max(PROBES * LIST_SIZE, mapped.sorted // 20):
+                return False
+            self._rewrite(mapped, added_ids[new], added_matrix[new], removed)
+            self._clear_pending()
+        return True
+
+    def nearest(self, frequency_map, count, metric=COSINE, exclude=None, probes=PROBES):
+        """
+        Up to count (string_id, distance) pairs closest to frequency_map
+        among the strings of the probes closest lists, the unsorted ones
+        and the pending log, nearest first. The distances are between the
+        DIMS dimensional vectors, an approximation of the exact ones.
+        """
+        mapped = self._map()
+        if mapped is None:
+            return []
+        used, sorted_count = mapped.count, mapped.sorted
+        query = vectors([frequency_map])[0]
+        if probes < len(mapped.centroids):
+            closest = np.argpartition(mapped.centroids @ query, -probes)[-probes:]
+            ranges = zip(mapped.offsets[closest].tolist(), mapped.offsets[closest + 1].tolist())
+            selected = np.concatenate([np.arange(start, end) for start, end in ranges] + [np.arange(sorted_count, used)])
+        else:
+            selected = np.arange(used)
+        ids = mapped.ids[selected]
+        rows = mapped.rows[selected]
+        inverse_norms = mapped.inverse_norms[selected]
+        if os.path.exists(self.pending_path):
+            pending_ids, pending_rows, removed = self._read_pending()
+            ids = np.concatenate([np.where(np.isin(ids, removed), 0, ids), pending_ids])
+            rows = np.concatenate([rows, pending_rows])
+            inverse_norms = np.concatenate([inverse_norms, _inverse_norms(pending_rows)])
+
+        if metric == COSINE:
+            distances = 1 - (rows @ query) * inverse_norms * _inverse_norms(query[None])[0]
+        else:
+            # |a - b| summed is 2 - 2 * sum(min(a, b)) for distributions that both sum to 1
+            distances = 2 - 2 * np.minimum(rows, query).sum(axis=1)
+        distances[ids <= 0] = np.inf
+        if exclude is not None:
+            distances[ids == exclude] = np.inf
+
+        count = min(count, len(ids))
+        if count == 0:
+            return []
+        nearest = np.argpartition(distances, count - 1)[:count]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        nearest = nearest[np.isfinite(distances[nearest])]
+        return list(zip(ids[nearest].tolist(), distances[nearest].tolist()))
+
+
+_indexes = {}
+
+
+def index():
+    """
+    The VectorIndex at STRING_VECTOR_INDEX_DIR, one per process
+    """
+    path = os.path.join(settings.STRING_VECTOR_INDEX_DIR, 'vectors.idx')
+    if path not in _indexes:
+        _indexes[path] = VectorIndex(path)
+    return _indexes[path]
+
+
+def index_strings(pairs, using='default'):
+    """
+    Adds (string_id, frequency_map) pairs to the index once the transaction commits
+    """
+    pairs = list(pairs)
+    transaction.on_commit(lambda: index().add(pairs), using=using, robust=True)
+
+
+def unindex_strings(string_ids, using='default'):
+    string_ids = list(string_ids)
+    transaction.on_commit(lambda: index().remove(string_ids), using=using, robust=True)
+
+
+def compact():
+    return index().compact()
+
+
+def build(using='default'):
+    """
+    Rebuilds the index from the stored frequency maps, returns the number of strings
+    """
+    from .models import AnalyzedString
+    rows = (
+        AnalyzedString.objects.using(using)
+        .values_list('id', *frequency.FREQUENCY_COLUMNS)
+        .iterator(chunk_size=BUILD_BATCH_SIZE)
+    )
+    return index().build((pk, frequency.frequency_map(*columns)) for pk, *columns in rows)
+
+
+def distance(first, second, metric=COSINE):
+    """
+    Exact distance between two frequency maps: cosine distance, or the L1
+    distance between the character distributions (0 to 2)
+    """
+    first_counts = list(first.values())
+    second_counts = list(map(second.get, first, repeat(0)))
+    if metric == COSINE:
+        norms = math.hypot(*first_counts) * math.hypot(*second.values())
+        return 1 - sum(map(mul, first_counts, second_counts)) / norms if norms else 1.0
+    first_total = sum(first_counts) or 1
+    second_total = sum(second.values()) or 1
+    first_shares = [count / first_total for count in first_counts]
+    second_shares = [count / second_total for count in second_counts]
+    # the characters only second has add up to whatever its shared ones leave
+    only_second = max(0.0, 1 - sum(second_shares))
+    return sum(map(abs, map(sub, first_shares, second_shares))) + only_second
+
+
+def similar(string_id, frequency_map, k, metric=COSINE):
+    """
+    The k strings whose character distributions are closest to frequency_map,
+    string_id excluded, as (string_id, distance) pairs nearest first. The
+    index proposes candidates, which are re-ranked by their exact maps.
+    Raises IndexNotBuilt when python manage.py build_vector_index has not run.
+    """
+    from .models import AnalyzedString
+    if not index().exists():
+        raise IndexNotBuilt("The similarity index is not built yet, run python manage.py build_vector_index")
+    candidates = index().nearest(frequency_map, max(k * CANDIDATE_FACTOR, MIN_CANDIDATES), metric, exclude=string_id)
+    rows = AnalyzedString.objects.filter(pk__in=[pk for pk, _ in candidates]).values_list('id', *frequency.FREQUENCY_COLUMNS)
+    ranked = sorted(
+        (distance(frequency_map, frequency.frequency_map(*columns), metric), pk) for pk, *columns in rows
+    )
+    return [(pk, value) for value, pk in ranked[:k]]
@@ -1,40 +1,226 @@
-from django.http import HttpResponse
-from rest_framework.decorators import api_view
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST
+from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from rest_framework import status
-from .models import AnalyzedString
-from .serializer import AnalyzedStringSerializer
+from .models import AnalysisJob, AnalyzedString
+from .serializer import dumps, parse_fields, payload_builder, row_position, string_payload, string_rows
+from .characters import contains_character_q
+from .instrumentation import registry as metrics_registry, timed
+from .analysis import StreamingAnalyzer, analyze
+from . import cache as response_cache
+from . import frequency
+from . import jobs
+from . import nl_query
+from . import search as string_search
+from . import stats
+from . import vectors
+from .pagination import InvalidCursor, keyset_page, parse_limit
+from .ingest import ingest
+from .parsers import InvalidLine, NDJSONParser
 import hashlib
-from collections import Counter
+from collections.abc import Iterator
 import re
 from rest_framework.parsers import JSONParser
 from io import BytesIO
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 2000
+MAX_DELETE_IDS = 10000
+SHA256_PATTERN = re.compile(r'[0-9a-f]{64}')
+UPLOAD_READ_SIZE = 1024 * 1024
+MAX_SIMILAR_K = 100
+
+
+def encode_string(row):
+    """
+    JSON bytes for one string_rows() tuple
+    """
+    with timed('serialization'):
+        return dumps(string_payload(row))
+
+
+def analyze_upload(stream):
+    """
+    Analyzes a text/plain body as it is read, see StreamingAnalyzer.
+    Returns (value, properties) and raises UnicodeDecodeError for a body that is not UTF-8.
+    """
+    with timed('analysis'), StreamingAnalyzer() as analyzer:
+        for chunk in iter(lambda: stream.read(UPLOAD_READ_SIZE), b''):
+            analyzer.feed(chunk)
+        properties = analyzer.finish()
+        return analyzer.value(), properties
+
+
+def wants_job(request):
+    return request.query_params.get('async', '').lower() in ('1', 'true')
+
+
+def job_accepted(job):
+    """
+    202 for a queued job, pointing at its /jobs/<id> status
+    """
+    url = f"/jobs/{job.id}"
+    return Response({"job_id": str(job.id), "status": job.status, "url": url},
+                    status=status.HTTP_202_ACCEPTED, headers={'Location': url})
+
+
+def json_bytes_response(content, status=status.HTTP_200_OK):
+    """
+    Response for an already encoded JSON body, skips DRF's renderer
+    """
+    return HttpResponse(content, status=status, content_type='application/json')
+
+
+def natural_language_payload(data, count, query, natural_language_filters):
+    """
+    Wraps the cached, already encoded match list in the response envelope
+    """
+    interpreted_query = dumps({"original": query, "parsed_filters": natural_language_filters})
+    return b'{"data":' + data + b',"count":' + str(count).encode() + b',"interpreted_query":' + interpreted_query + b'}'
+
+
+def filter_strings(query_params):
+    """
+    Applies the list filters from the query string.
+    Returns (queryset, applied_filters) and raises ValueError on bad input.
+    """
+    all_strings = AnalyzedString.objects.all()
+
+    is_palindrome = query_params.get('is_palindrome', None)
+    min_length = query_params.get('min_length', None)
+    max_length = query_params.get('max_length', None)
+    word_count = query_params.get('word_count', None)
+    contains_character = query_params.get('contains_character', None)
+
+    applied_filters = {}
+
+    if is_palindrome is not None:
+        if is_palindrome.lower() not in ['true', 'false']:
+            raise ValueError("is_palindrome")
+        is_palindrome_bool = is_palindrome.lower() == 'true'
+        all_strings = all_strings.filter(is_palindrome=is_palindrome_bool)
+        applied_filters['is_palindrome'] = is_palindrome_bool
+
+    if min_length is not None:
+        if not min_length.isdigit():
+            raise ValueError("min_length")
+        all_strings = all_strings.filter(length__gte=int(min_length))
+        applied_filters['min_length'] = int(min_length)
+
+    if max_length is not None:
+        if not max_length.isdigit():
+            raise ValueError("max_length")
+        all_strings = all_strings.filter(length__lte=int(max_length))
+        applied_filters['max_length'] = int(max_length)
+
+    if word_count is not None:
+        if not word_count.isdigit():
+            raise ValueError("word_count")
+        all_strings = all_strings.filter(word_count=int(word_count))
+        applied_filters['word_count'] = int(word_count)
+
+    if contains_character is not None:
+        if len(contains_character) != 1:
+            raise ValueError("contains_character")
+        all_strings = all_strings.filter(contains_character_q(contains_character))
+        applied_filters['contains_character'] = contains_character
+
+    return all_strings, applied_filters
+
+
+def delete_filters(query_params, data):
+    """
+    The strings DELETE /strings removes: the list filters, a natural language
+    ?query= and a list of ids (sha256 hashes) from ?ids=a,b or a JSON body
+    {"ids": [...]}, all of them combined.
+    Returns (queryset, applied_filters) and raises ValueError on bad input.
+    """
+    queryset, applied_filters = filter_strings(query_params)
+
+    query = query_params.get('query', None)
+    if query:
+        parsed = nl_query.parse(query.lower().strip())
+        queryset = queryset.filter(parsed.q)
+        applied_filters['query'] = parsed.filters
+
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if ids is None and query_params.get('ids', None):
+        ids = query_params['ids'].split(',')
+    if ids is not None:
+        if (not isinstance(ids, list) or len(ids) > MAX_DELETE_IDS
+                or not all(isinstance(sha256_hash, str) and SHA256_PATTERN.fullmatch(sha256_hash) for sha256_hash in ids)):
+            raise ValueError("ids")
+        queryset = queryset.filter(sha256_hash__in=ids)
+        applied_filters['ids'] = ids
+
+    return queryset, applied_filters
+
+
+def stream_strings(queryset, applied_filters, fields=None):
+    """
+    Streams every matching row as NDJSON, one object per line.
+    Rows are fetched with a server-side cursor in chunks so memory stays flat.
+    """
+    payload = payload_builder(fields)
+
+    def lines():
+        for row in string_rows(queryset.order_by('created_at', 'id'), fields).iterator(chunk_size=STREAM_CHUNK_SIZE):
+            yield dumps(payload(row)) + b"\n"
+
+    response = StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+    response['X-Filters-Applied'] = json.dumps(applied_filters)
+    return response
+
+
+HOME_FIELDS = [
+    field.name for field in AnalyzedString._meta.concrete_fields
+    if field.name not in ('char_mask', 'character_frequency_packed')
+]
 
 @api_view(['GET'])
 def home(request):
-    values = AnalyzedString.objects.all()
-    serializer = AnalyzedStringSerializer(values, many=True)
-    return Response(serializer.data)
+    rows = AnalyzedString.objects.values(*HOME_FIELDS, 'character_frequency_packed')
+    data = []
+    for row in rows:
+        row = frequency.decoded(row)
+        del row['character_frequency_packed']
+        data.append(row)
+    with timed('serialization'):
+        content = dumps(data)
+    return json_bytes_response(content)
 
-@api_view(['POST', 'GET'])
+@api_view(['POST', 'GET', 'DELETE'])
 def strings(request):
     if request.method == 'POST':
         try:            
             value = None
+            properties = None
             
-            if request.content_type == 'application/json' and isinstance(request.data, dict):
+            if request.content_type.split(';')[0] == 'text/plain':
+                # the raw body is analyzed while it is read instead of parsed whole first,
+                # a queued job only needs the value
+                try:
+                    if wants_job(request):
+                        value = (request.stream or BytesIO()).read().decode()
+                    else:
+                        value, properties = analyze_upload(request.stream or BytesIO())
+                except UnicodeDecodeError:
+                    return Response({"error": "Request body is not valid UTF-8"}, status=status.HTTP_400_BAD_REQUEST)
+            elif request.content_type == 'application/json' and isinstance(request.data, dict):
                 value = request.data.get('value')
             elif (request.content_type == 'application/x-www-form-urlencoded' and 
                   '_content' in request.data):
                 try:
                     json_content = request.data['_content']
-                    print("Found _content field:", json_content)
                     parsed_data = json.loads(json_content)
                     value = parsed_data.get('value')
-                    print("Extracted value from _content:", value)
                 except (json.JSONDecodeError, KeyError, TypeError) as e:
-                    print(f"Error parsing _content: {e}")
+                    logger.info("Invalid _content field: %s", e)
                     return Response({"error": "Invalid request body or missing 'value' field"}, status=status.HTTP_400_BAD_REQUEST)
             
             elif 'value' in request.data:
@@ -49,145 +235,134 @@ def strings(request):
             if not isinstance(value, str):
                 return Response({"error": "Invalid data type for 'value' (must be string)"}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
             
-            sha256_hash = hashlib.sha256(value.encode()).hexdigest()
+            if wants_job(request):
+                return job_accepted(jobs.enqueue_string(value))
 
-            if AnalyzedString.objects.filter(sha256_hash=sha256_hash).exists():
-                return Response({"error": "String already exists in the system"}, status=status.HTTP_409_CONFLICT)
-            
             #this is to erform analysis
-            length = len(value)
-            is_palindrome = value.lower() == value.lower()[::-1]
-            unique_characters = len(set(value))
-            word_count = len(value.split())
-            character_frequency_map = dict(Counter(value))
-
-            #and create database entry
-            analyzed_value = AnalyzedString.objects.create(
-                value=value,
-                length=length,
-                is_palindrome=is_palindrome,
-                unique_characters=unique_characters,
-                word_count=word_count,
-                sha256_hash=sha256_hash,
-                character_frequency_map=character_frequency_map
-            )
-            
+            if properties is None:
+                with timed('analysis'):
+                    properties = analyze(value)
+            sha256_hash = properties['sha256_hash']
+
+            #and create database entry, an existing hash makes the insert a no-op
+            analyzed_value = AnalyzedString.objects.create_analyzed(value=value, **properties)
+            if analyzed_value is None:
+                return Response({"error": "String already exists in the system"}, status=status.HTTP_409_CONFLICT)
+            response_cache.invalidate()
             
             return Response({
                 "id": sha256_hash, 
                 "value": value,
-                "properties": {
-                    "length": length,
-                    "is_palindrome": is_palindrome,
-                    "unique_characters": unique_characters,
-                    "word_count": word_count,
-                    "sha256_hash": sha256_hash,
-                    "character_frequency_map": character_frequency_map
-                },
+                "properties": properties,
                 "created_at": analyzed_value.created_at
             }, status=status.HTTP_201_CREATED)
             
         except Exception as e:
-            print(f"ERROR in POST: {str(e)}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
+            logger.exception("Creating a string failed")
             return Response({"error": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     
     elif request.method == 'GET':
         
         try:
-            all_strings = AnalyzedString.objects.all()
-
-            is_palindrome = request.query_params.get('is_palindrome', None)
-            min_length = request.query_params.get('min_length', None)   
-            max_length = request.query_params.get('max_length', None)
-            word_count = request.query_params.get('word_count', None)
-            contains_character = request.query_params.get('contains_character', None)
-
-            applied_filters = {}
-
-            if is_palindrome is not None:
-                if is_palindrome.lower() not in ['true', 'false']:
-                    return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
-                is_palindrome_bool = is_palindrome.lower() == 'true'
-                all_strings = all_strings.filter(is_palindrome=is_palindrome_bool)
-                applied_filters['is_palindrome'] = is_palindrome_bool
-
-            if min_length is not None:
-                if not min_length.isdigit():
-                    return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
-                all_strings = all_strings.filter(length__gte=int(min_length))
-                applied_filters['min_length'] = int(min_length)
-
-            if max_length is not None:
-                if not max_length.isdigit():
-                    return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
-                all_strings = all_strings.filter(length__lte=int(max_length))
-                applied_filters['max_length'] = int(max_length)
-
-            if word_count is not None:
-                if not word_count.isdigit():
-                    return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
-                all_strings = all_strings.filter(word_count=int(word_count))
-                applied_filters['word_count'] = int(word_count)
-
-            if contains_character is not None:
-                if len(contains_character) != 1:
-                    return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
-                all_strings = all_strings.filter(value__icontains=contains_character)
-                applied_filters['contains_character'] = contains_character
-
-            data = []
-            for string in all_strings:
-                data.append({
-                    "id": string.sha256_hash,
-                    "value": string.value,
-                    "properties": {
-                        "length": string.length,
-                        "is_palindrome": string.is_palindrome,
-                        "unique_characters": string.unique_characters,
-                        "word_count": string.word_count,
-                        "sha256_hash": string.sha256_hash,
-                        "character_frequency_map": string.character_frequency_map
-                    },
-                    "created_at": string.created_at
-                })
-            return Response({
-                "data": data,
-                "count": len(data),
-                "filters_applied": applied_filters
-            }, status=status.HTTP_200_OK)
+            try:
+                all_strings, applied_filters = filter_strings(request.query_params)
+                limit = parse_limit(request.query_params.get('limit', None))
+                fields = parse_fields(request.query_params.get('fields', None))
+            except ValueError:
+                return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
+
+            if request.query_params.get('stream', '').lower() == 'true':
+                return stream_strings(all_strings, applied_filters, fields)
+
+            cursor = request.query_params.get('cursor', None)
+
+            def build_page():
+                page, next_cursor = keyset_page(string_rows(all_strings, fields), cursor, limit, position=row_position)
+                # counting is a separate query, so only the first page pays for it
+                count = all_strings.count() if cursor is None else None
+                payload = payload_builder(fields)
+                with timed('serialization'):
+                    return dumps({
+                        "data": [payload(row) for row in page],
+                        "count": count,
+                        "next": next_cursor,
+                        "filters_applied": applied_filters
+                    })
+
+            cache_key = response_cache.filter_key(
+                'list', {**applied_filters, 'cursor': cursor, 'limit': limit, 'fields': fields}
+            )
+            try:
+                payload = response_cache.get_or_compute(cache_key, build_page)
+            except InvalidCursor:
+                return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+            return json_bytes_response(payload)
         
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['GET', 'DELETE'])
-def get_remove_string(request, specific_string):
+    elif request.method == 'DELETE':
+        try:
+            matched, applied_filters = delete_filters(request.query_params, request.data)
+        except nl_query.QueryParseError:
+            return Response({"error": "Unable to parse natural language query"}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
+        if not applied_filters:
+            return Response({"error": "At least one filter is required to delete strings"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            deleted = matched.bulk_delete_analyzed()
+        except Exception as e:
+            logger.exception("Bulk delete failed")
+            return Response({"error": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if deleted:
+            response_cache.invalidate()
+        return Response({"deleted": deleted, "filters_applied": applied_filters}, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@parser_classes([JSONParser, NDJSONParser])
+def strings_batch(request):
     """
-    Combined view for getting and deleting a specific string
+    Bulk ingest from a JSON array or an NDJSON body.
+    Items are strings or {"value": ...} objects, each gets its own status.
+    With ?async=1 the items are queued as one job instead.
     """
+    items = request.data
+    if not isinstance(items, (list, Iterator)):
+        return Response({"error": "Request body must be a JSON array or NDJSON stream"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if wants_job(request):
+        # an NDJSON line that is not JSON stays an invalid item, reported when the job runs
+        job = jobs.enqueue_batch([None if isinstance(item, InvalidLine) else item for item in items])
+        return job_accepted(job)
+
+    try:
+        result = ingest(items)
+    except Exception as e:
+        logger.exception("Batch ingest failed")
+        return Response({"error": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    if result['created']:
+        response_cache.invalidate()
+    return Response(result, status=status.HTTP_200_OK)
+
+def get_or_remove_by_hash(request, sha256_hash):
     try:
-        specific_analyzed_string = AnalyzedString.objects.get(value=specific_string)
-        
         if request.method == 'GET':
-            return Response({
-                "id": specific_analyzed_string.sha256_hash,
-                "value": specific_analyzed_string.value,
-                "properties": {
-                    "length": specific_analyzed_string.length,
-                    "is_palindrome": specific_analyzed_string.is_palindrome,
-                    "unique_characters": specific_analyzed_string.unique_characters,
-                    "word_count": specific_analyzed_string.word_count,
-                    "sha256_hash": specific_analyzed_string.sha256_hash,
-                    "character_frequency_map": specific_analyzed_string.character_frequency_map
-                },
-                "created_at": specific_analyzed_string.created_at
-            }, status=status.HTTP_200_OK)
+            payload = response_cache.get_or_compute(
+                response_cache.string_key(sha256_hash),
+                lambda: encode_string(string_rows(AnalyzedString.objects.filter(sha256_hash=sha256_hash)).get())
+            )
+            return json_bytes_response(payload)
             
         elif request.method == 'DELETE':
-            print("DELETE called for:", specific_string)
-            specific_analyzed_string.delete()
+            deleted = AnalyzedString.objects.filter(sha256_hash=sha256_hash).delete_analyzed()
+            if not deleted:
+                raise AnalyzedString.DoesNotExist
+            response_cache.invalidate()
             return Response(status=status.HTTP_204_NO_CONTENT)  
             
     except AnalyzedString.DoesNotExist:
@@ -198,6 +373,50 @@ def get_remove_string(request, specific_string):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET', 'DELETE'])
+def get_remove_string(request, specific_string):
+    """
+    Combined view for getting and deleting a specific string.
+    The value is hashed so the lookup goes through the unique sha256_hash index.
+    """
+    return get_or_remove_by_hash(request, hashlib.sha256(specific_string.encode()).hexdigest())
+
+@api_view(['GET', 'DELETE'])
+def get_remove_string_by_id(request, sha256_hash):
+    """
+    Same as get_remove_string, addressed by the string's id (its sha256 hash)
+    """
+    return get_or_remove_by_hash(request, sha256_hash)
+
+@api_view(['GET'])
+def strings_stats(request):
+    """
+    Aggregate statistics, read from the incrementally maintained summary table
+    """
+    return Response(stats.snapshot(), status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+def job_status(request, job_id):
+    """
+    State and progress of a ?async=1 job, with its result once it is done
+    """
+    job = AnalysisJob.objects.defer('payload').filter(pk=job_id).first()
+    if job is None:
+        return Response({"error": "Job does not exist"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(jobs.describe(job), status=status.HTTP_200_OK)
+
+@require_GET
+def metrics(request):
+    """
+    Per-route request histograms in the Prometheus text format, summed over
+    the worker processes when PROMETHEUS_MULTIPROC_DIR is set
+    """
+    return HttpResponse(metrics_registry.render(), content_type=CONTENT_TYPE_LATEST)
+
+@api_view(['GET'])
+def cache_stats(request):
+    return Response(response_cache.stats(), status=status.HTTP_200_OK)
+
 @api_view(['GET'])
 def natural_language_filter(request):
     try:
@@ -206,65 +425,114 @@ def natural_language_filter(request):
             return Response({"error": "Unable to parse natural language query"}, status=status.HTTP_400_BAD_REQUEST)
         
         query = query.lower().strip()
-        natural_language_filters = {}
-
-        if "palindrome" in query or "palindromic" in query:
-            natural_language_filters['is_palindrome'] = True
+        try:
+            parsed = nl_query.parse(query)
+        except nl_query.QueryParseError:
+            return Response({"error": "Unable to parse natural language query"}, status=status.HTTP_400_BAD_REQUEST)
+        natural_language_filters = parsed.filters
+        try:
+            fields = parse_fields(request.query_params.get('fields', None))
+        except ValueError:
+            return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if "single word" in query:
-            natural_language_filters['word_count'] = 1
-        elif "multiple words" in query:
-            natural_language_filters['word_count__gt'] = 1
+        def build_matches():
+            payload = payload_builder(fields)
+            rows = list(string_rows(AnalyzedString.objects.filter(parsed.q), fields))
+            with timed('serialization'):
+                return len(rows), dumps([payload(row) for row in rows])
 
-        contains_letter = re.search(r"(?:containing|have|with|including) the letter ([a-z])", query)
-        if contains_letter:
-            natural_language_filters['value__icontains'] = contains_letter.group(1)
-            
-        contains_vowel = re.search(r"(?:contain|include|have|feature).*vowel\s*([aeiou])?", query)
-        if contains_vowel:
-            vowel = contains_vowel.group(1) if contains_vowel.group(1) else "a"
-            natural_language_filters["value__icontains"] = vowel
-
-        longer_than = re.search(r"longer than (\d+)", query)
-        if longer_than:
-            natural_language_filters['length__gt'] = int(longer_than.group(1))
-            
-        shorter_than = re.search(r"shorter than (\d+)", query)
-        if shorter_than:
-            natural_language_filters['length__lt'] = int(shorter_than.group(1))
+        count, data = response_cache.get_or_compute(
+            response_cache.filter_key('natural_language', {**natural_language_filters, 'fields': fields}),
+            build_matches
+        )
 
-        if not natural_language_filters:
-            return Response({"error": "Unable to parse natural language query"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        filtered_strings = AnalyzedString.objects.filter(**natural_language_filters)
-
-        data = []
-        for string in filtered_strings:
-            data.append({
-                "id": string.sha256_hash,
-                "value": string.value,
-                "properties": {
-                    "length": string.length,
-                    "is_palindrome": string.is_palindrome,
-                    "unique_characters": string.unique_characters,
-                    "word_count": string.word_count,
-                    "sha256_hash": string.sha256_hash,
-                    "character_frequency_map": string.character_frequency_map
-                },
-                "created_at": string.created_at
-            })
-
-        if not data:
+        if not count:
             return Response({"error": "Query parsed but resulted in no matches."}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
         
-        return Response({
-            "data": data,
-            "count": len(data),
-            "interpreted_query": {
-                "original": query,
-                "parsed_filters": natural_language_filters
-            }
-        }, status=status.HTTP_200_OK)
+        return json_bytes_response(natural_language_payload(data, count, query, natural_language_filters))
     
     except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+def strings_search(request):
+    """
+    Strings matching q by trigram similarity, the ones containing q first
+    """
+    try:
+        query = request.query_params.get('q', '')
+        if not query:
+            return Response({"error": "Missing search query"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = parse_limit(request.query_params.get('limit', None))
+            offset = request.query_params.get('offset', '0')
+            if not offset.isdigit():
+                raise ValueError("offset")
+            offset = int(offset)
+            fields = parse_fields(request.query_params.get('fields', None))
+        except ValueError:
+            return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def build_page():
+            # one extra match tells whether there is a next page
+            ranked = string_search.search(query, limit + 1, offset)
+            scores = dict(ranked[:limit])
+            rows = {row[0]: row for row in string_rows(AnalyzedString.objects.filter(pk__in=scores), fields)}
+            payload = payload_builder(fields)
+            with timed('serialization'):
+                return dumps({
+                    "data": [{**payload(rows[pk]), "score": round(score, 4)} for pk, score in ranked[:limit] if pk in rows],
+                    "next_offset": offset + limit if len(ranked) > limit else None,
+                    "query": query,
+                })
+
+        cache_key = response_cache.filter_key('search', {'q': query, 'limit': limit, 'offset': offset, 'fields': fields})
+        return json_bytes_response(response_cache.get_or_compute(cache_key, build_page))
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+def strings_similar(request, sha256_hash):
+    """
+    The k strings whose character distributions are closest to this one's
+    """
+    try:
+        try:
+            k = request.query_params.get('k', '10')
+            if not k.isdigit() or not 1 <= int(k) <= MAX_SIMILAR_K:
+                raise ValueError("k")
+            k = int(k)
+            metric = request.query_params.get('metric', vectors.COSINE)
+            if metric not in vectors.METRICS:
+                raise ValueError("metric")
+            fields = parse_fields(request.query_params.get('fields', None))
+        except ValueError:
+            return Response({"error": "Invalid query parameter values or types"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def build_result():
+            target = AnalyzedString.objects.filter(sha256_hash=sha256_hash).values_list('id', *frequency.FREQUENCY_COLUMNS).first()
+            if target is None:
+                return None
+            pk, *columns = target
+            neighbours = vectors.similar(pk, frequency.frequency_map(*columns), k, metric)
+            rows = {row[0]: row for row in string_rows(AnalyzedString.objects.filter(pk__in=dict(neighbours)), fields)}
+            payload = payload_builder(fields)
+            with timed('serialization'):
+                return dumps({
+                    "data": [{**payload(rows[pk]), "distance": round(distance, 6)} for pk, distance in neighbours if pk in rows],
+                    "id": sha256_hash,
+                    "metric": metric,
+                })
+
+        cache_key = response_cache.filter_key('similar', {'id': sha256_hash, 'k': k, 'metric': metric, 'fields': fields})
+        try:
+            content = response_cache.get_or_compute(cache_key, build_result)
+        except vectors.IndexNotBuilt as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if content is None:
+            return Response({"error": "String does not exist in the system"}, status=status.HTTP_404_NOT_FOUND)
+        return json_bytes_response(content)
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)